@@ -0,0 +1,143 @@
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+import xarray as xr
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# (t, z, y, x) shapes of the synthetic datasets
+SIZES = {
+    "small": (4, 10, 90, 180),
+    "medium": (4, 20, 180, 360),
+    "large": (4, 40, 720, 1440),
+}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("pan3d benchmarks")
+    group.addoption(
+        "--pan3d-size",
+        default="small",
+        help=f"Synthetic dataset size: {', '.join(SIZES)} or t,z,y,x (default: small)",
+    )
+    group.addoption(
+        "--pan3d-chunks",
+        default=None,
+        help="Dask chunks as dim=size pairs (e.g. time=1,z=10), in memory by default",
+    )
+    group.addoption(
+        "--pan3d-dtype",
+        default="float32",
+        help="dtype of the synthetic fields (default: float32)",
+    )
+
+
+def parse_size(value):
+    if value in SIZES:
+        return SIZES[value]
+    return tuple(int(v) for v in value.split(","))
+
+
+def parse_chunks(value):
+    if not value:
+        return None
+    return {k: int(v) for k, v in (pair.split("=") for pair in value.split(","))}
+
+
+def make_dataset(shape, dtype="float32", chunks=None, n_arrays=2):
+    """Generate a (time, z, lat, lon) dataset of random fields"""
+    nt, nz, ny, nx = shape
+    rng = np.random.default_rng(0)
+    ds = xr.Dataset(
+        {
+            f"field_{i}": (
+                ("time", "z", "lat", "lon"),
+                rng.random(shape, dtype=np.float64).astype(dtype),
+            )
+            for i in range(n_arrays)
+        },
+        coords={
+            "time": np.arange(nt).astype("datetime64[D]"),
+            "z": np.linspace(0, 1000, nz),
+            "lat": np.linspace(-90, 90, ny),
+            "lon": np.linspace(-180, 180, nx),
+        },
+    )
+    if chunks:
+        ds = ds.chunk(chunks)
+    return ds
+
+
+@pytest.fixture(scope="session")
+def dataset_options(request):
+    return {
+        "shape": parse_size(request.config.getoption("--pan3d-size")),
+        "dtype": request.config.getoption("--pan3d-dtype"),
+        "chunks": parse_chunks(request.config.getoption("--pan3d-chunks")),
+    }
+
+
+@pytest.fixture(scope="session")
+def synthetic_dataset(dataset_options):
+    return make_dataset(**dataset_options)
+
+
+class PeakMemory:
+    """
+    Track the peak memory used while running some code.
+    tracemalloc covers Python/numpy allocations while the RSS (sampled when
+    psutil is available) also captures memory allocated by VTK.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.traced = 0
+        self.rss = None
+        self._running = False
+
+    def _sample_rss(self, process, baseline):
+        self.rss = 0
+        while self._running:
+            self.rss = max(self.rss, process.memory_info().rss - baseline)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread = None
+        if psutil is not None:
+            process = psutil.Process()
+            self._running = True
+            self._thread = threading.Thread(
+                target=self._sample_rss,
+                args=(process, process.memory_info().rss),
+                daemon=True,
+            )
+            self._thread.start()
+        tracemalloc.start()
+        return self
+
+    def __exit__(self, *_):
+        self.traced = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+
+
+@pytest.fixture
+def peak_memory(benchmark):
+    """Run a function once outside of the timing and record its peak memory in the benchmark extra info"""
+
+    def measure(fn, *args, **kwargs):
+        with PeakMemory() as memory:
+            fn(*args, **kwargs)
+        benchmark.extra_info["peak_traced_mb"] = memory.traced / 2**20
+        if memory.rss is not None:
+            benchmark.extra_info["peak_rss_mb"] = memory.rss / 2**20
+
+    return measure
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+import pan3d.xarray  # noqa: F401 (register the vtk accessor)
+
+
+@pytest.fixture(scope="module")
+def volume(synthetic_dataset):
+    return synthetic_dataset["field_0"].isel(time=0).load()
+
+
+@pytest.fixture(scope="module")
+def curvilinear_surface(synthetic_dataset):
+    surface = synthetic_dataset["field_0"].isel(time=0, z=0).load()
+    lon, lat = np.meshgrid(surface["lon"].values, surface["lat"].values)
+    # slightly rotated grid so the coordinates are truly 2D
+    return surface.assign_coords(
+        x=(("lat", "lon"), lon + 0.1 * lat),
+        y=(("lat", "lon"), lat + 0.1 * lon),
+    )
+
+
+def test_accessor_rectilinear(benchmark, peak_memory, volume):
+    benchmark.group = "VTKAccessor.dataset"
+    peak_memory(volume.vtk.dataset, x="lon", y="lat", z="z")
+    mesh = benchmark(volume.vtk.dataset, x="lon", y="lat", z="z")
+    assert mesh.GetNumberOfPoints() == volume.size
+
+
+def test_accessor_structured(benchmark, peak_memory, curvilinear_surface):
+    benchmark.group = "VTKAccessor.dataset"
+    peak_memory(curvilinear_surface.vtk.dataset, x="x", y="y")
+    mesh = benchmark(curvilinear_surface.vtk.dataset, x="x", y="y")
+    assert mesh.GetNumberOfPoints() == curvilinear_surface.size
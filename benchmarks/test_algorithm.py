@@ -0,0 +1,54 @@
+import pytest
+
+from pan3d.xarray.algorithm import vtkXArrayRectilinearSource
+
+SLICES = {
+    "full": None,
+    "strided": {"lat": [0, -1, 2], "lon": [0, -1, 2]},
+    "surface": {"z": 0},
+}
+
+
+def create_source(dataset, slices):
+    source = vtkXArrayRectilinearSource(
+        input=dataset,
+        x="lon",
+        y="lat",
+        z="z",
+        t="time",
+        arrays=list(dataset.data_vars),
+        cache_size=0,
+    )
+    source.slices = slices
+    return source
+
+
+@pytest.mark.parametrize("slices", SLICES)
+def test_request_data(benchmark, peak_memory, synthetic_dataset, slices):
+    source = create_source(synthetic_dataset, SLICES[slices])
+    t_size = source.t_size
+
+    def execute():
+        # new time step on every round so the mesh is generated again
+        source.t_index = (source.t_index + 1) % t_size
+        return source()
+
+    benchmark.group = "vtkXArrayRectilinearSource"
+    peak_memory(execute)
+    mesh = benchmark(execute)
+    assert mesh.GetNumberOfPoints() > 0
+
+
+def test_request_data_arrays_change(benchmark, synthetic_dataset):
+    source = create_source(synthetic_dataset, None)
+    all_arrays = list(synthetic_dataset.data_vars)
+
+    def execute():
+        # toggle the last array, other fields and coordinates are reused
+        source.arrays = (
+            all_arrays if len(source.arrays) < len(all_arrays) else all_arrays[:-1]
+        )
+        return source()
+
+    benchmark.group = "vtkXArrayRectilinearSource"
+    benchmark(execute)
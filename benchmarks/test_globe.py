@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from vtkmodules.vtkCommonDataModel import vtkImageData
+
+from pan3d.filters.globe import ProcessPoint, ProjectToSphere, project_to_sphere
+
+# 1 and 0.25 degree global grids
+RESOLUTIONS = [1.0, 0.25]
+
+
+def lon_lat_points(resolution):
+    lon = np.arange(-180, 180 + resolution, resolution)
+    lat = np.arange(-90, 90 + resolution, resolution)
+    lon, lat = np.meshgrid(lon, lat)
+    return np.stack([lon.ravel(), lat.ravel(), np.zeros(lon.size)], axis=1)
+
+
+def lon_lat_grid(resolution):
+    grid = vtkImageData()
+    grid.SetDimensions(int(360 / resolution) + 1, int(180 / resolution) + 1, 1)
+    grid.SetSpacing(resolution, resolution, 0)
+    grid.SetOrigin(-180, -90, 0)
+    return grid
+
+
+@pytest.mark.parametrize("resolution", RESOLUTIONS)
+def test_project_points_python_loop(benchmark, resolution):
+    points = lon_lat_points(resolution)
+    benchmark.group = f"project_to_sphere[{resolution}]"
+    benchmark.pedantic(
+        lambda: np.array([ProcessPoint(p, 6378, 1.0) for p in points]),
+        rounds=2,
+    )
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("resolution", RESOLUTIONS)
+def test_project_points_numpy(benchmark, resolution, dtype):
+    points = lon_lat_points(resolution)
+    out = np.empty(points.shape, dtype=dtype)
+    benchmark.group = f"project_to_sphere[{resolution}]"
+    result = benchmark(project_to_sphere, points, 6378, 1.0, out=out)
+
+    expected = np.array([ProcessPoint(p, 6378, 1.0) for p in points[::997]])
+    assert np.allclose(result[::997], expected, atol=1e-2)
+
+
+@pytest.mark.parametrize("resolution", RESOLUTIONS)
+def test_project_to_sphere_filter(benchmark, peak_memory, resolution):
+    project = ProjectToSphere()
+    project.SetInputDataObject(lon_lat_grid(resolution))
+    scales = [1.0, 1.001]
+
+    def execute():
+        # changing the scale invalidates the projected geometry
+        scales.reverse()
+        project.SetScalingFactor(scales[0])
+        project.Update()
+
+    benchmark.group = f"ProjectToSphere[{resolution}]"
+    peak_memory(execute)
+    benchmark(execute)
+
+
+@pytest.mark.parametrize("resolution", RESOLUTIONS)
+def test_project_to_sphere_filter_fields_only(benchmark, resolution):
+    grid = lon_lat_grid(resolution)
+    grid.point_data["field"] = np.zeros(grid.GetNumberOfPoints())
+    project = ProjectToSphere()
+    project.SetInputDataObject(grid)
+    project.Update()
+
+    def execute():
+        # new field values on the same geometry (i.e. time step change)
+        grid.point_data["field"] = np.ones(grid.GetNumberOfPoints())
+        project.Update()
+
+    benchmark.group = f"ProjectToSphere[{resolution}]"
+    benchmark(execute)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+import xarray as xr
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkIOXML import (
+    vtkXMLImageDataWriter,
+    vtkXMLRectilinearGridWriter,
+    vtkXMLStructuredGridWriter,
+)
+
+from pan3d.xarray.io import dataset_to_xarray
+from pan3d.xarray.io import read as vtk_read
+
+WRITERS = {
+    ".vti": vtkXMLImageDataWriter,
+    ".vtr": vtkXMLRectilinearGridWriter,
+    ".vts": vtkXMLStructuredGridWriter,
+}
+
+
+def image_data(volume):
+    nz, ny, nx = volume.shape
+    mesh = vtkImageData()
+    mesh.SetDimensions(nx, ny, nz)
+    mesh.SetOrigin(-180, -90, 0)
+    mesh.SetSpacing(360 / max(nx - 1, 1), 180 / max(ny - 1, 1), 1)
+    mesh.point_data["field"] = volume.values.ravel()
+    return mesh
+
+
+def rectilinear_grid(volume):
+    return volume.vtk.dataset(x="lon", y="lat", z="z")
+
+
+def structured_grid(volume):
+    surface = volume.isel(z=0)
+    lon, lat = np.meshgrid(surface["lon"].values, surface["lat"].values)
+    surface = surface.assign_coords(x=(("lat", "lon"), lon), y=(("lat", "lon"), lat))
+    return surface.vtk.dataset(x="x", y="y")
+
+
+MESHES = {
+    ".vti": image_data,
+    ".vtr": rectilinear_grid,
+    ".vts": structured_grid,
+}
+
+
+@pytest.fixture(scope="module")
+def vtk_files(synthetic_dataset, tmp_path_factory):
+    volume = synthetic_dataset["field_0"].isel(time=0).load().rename("field")
+    directory = tmp_path_factory.mktemp("vtk_files")
+    files = {}
+    for ext, create_mesh in MESHES.items():
+        files[ext] = str(directory / f"field{ext}")
+        writer = WRITERS[ext](file_name=files[ext])
+        writer.SetInputData(create_mesh(volume))
+        writer.Write()
+    return files
+
+
+@pytest.mark.parametrize("ext", MESHES)
+def test_dataset_to_xarray(benchmark, peak_memory, vtk_files, ext):
+    mesh = vtk_read(vtk_files[ext])
+    benchmark.group = "dataset_to_xarray"
+    peak_memory(dataset_to_xarray, mesh)
+    ds = benchmark(dataset_to_xarray, mesh)
+    assert ds["field"].size == mesh.GetNumberOfPoints()
+
+
+@pytest.mark.parametrize("ext", MESHES)
+def test_open_dataset(benchmark, peak_memory, vtk_files, ext):
+    def execute():
+        ds = xr.open_dataset(vtk_files[ext], engine="vtk")
+        return ds["field"].values
+
+    benchmark.group = "xr.open_dataset(engine=vtk)"
+    peak_memory(execute)
+    benchmark(execute)
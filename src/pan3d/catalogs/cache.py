@@ -0,0 +1,408 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, suppress
+from functools import cache
+from pathlib import Path
+from typing import Optional
+
+import xarray
+from fsspec.spec import AbstractBufferedFile, AbstractFileSystem
+from fsspec.utils import get_protocol
+
+from pan3d.catalogs.fetch import filesystem
+from pan3d.catalogs.index import cache_directory
+
+# maximum size (in bytes) of the chunk cache, 0 disables it (default: 2GB)
+DEFAULT_CACHE_SIZE = int(os.environ.get("PAN3D_CHUNK_CACHE_SIZE", str(2 * 1024**3)))
+
+# size of the blocks read from remote files (e.g. NetCDF) opened through the cache
+DEFAULT_BLOCK_SIZE = 2**20
+
+# number of cache hits after which their access times are written to the index
+ACCESS_BATCH_SIZE = 64
+
+# zarr metadata, never cached as it changes when a store grows (e.g. appended time steps)
+METADATA_KEYS = (".zmetadata", ".zgroup", ".zarray", ".zattrs", "zarr.json")
+
+
+def is_remote(url: str):
+    """return True if the url points to a remote store (http, s3, gs...)"""
+    return get_protocol(str(url)) not in ("file", "local")
+
+
+class ChunkCache:
+    """
+    Size-bounded LRU cache of remote byte ranges on disk.
+
+    Blocks are keyed by (url, start, end) and stored as files along a SQLite
+    index so the cache is shared across sessions (and processes). Remote
+    chunks are expected to be immutable, which is the case of the stores of
+    the catalogs. The least recently used blocks are evicted once the cache
+    grows beyond max_size.
+    """
+
+    def __init__(
+        self, directory: Optional[str] = None, max_size: int = DEFAULT_CACHE_SIZE
+    ):
+        """
+        Create a chunk cache
+
+        Parameters:
+            directory (str): Directory holding the blocks. (default: <cache directory>/chunks)
+            max_size (int): Maximum number of bytes kept on disk. (default: PAN3D_CHUNK_CACHE_SIZE or 2GB)
+        """
+        self.directory = Path(directory) if directory else cache_directory() / "chunks"
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._db_lock = threading.RLock()
+        self._connection = None
+        self._accessed = {}
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_fetched = 0
+
+    @contextmanager
+    def _connect(self):
+        # a single connection shared by the threads, one transaction at a time
+        with self._db_lock:
+            if self._connection is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._connection = sqlite3.connect(
+                    str(self.directory / "index.sqlite"),
+                    timeout=30,
+                    check_same_thread=False,
+                )
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS blocks (key TEXT PRIMARY KEY, url TEXT, size INTEGER, accessed REAL)"
+                )
+            with self._connection:  # commit (or rollback) the transaction
+                yield self._connection
+
+    def _write_accessed(self, connection):
+        """write the access times of the last hits (LRU order) to the index"""
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+        connection.executemany(
+            "UPDATE blocks SET accessed = ? WHERE key = ?",
+            [(accessed_time, key) for key, accessed_time in accessed.items()],
+        )
+
+    def flush(self):
+        """write the pending access times to the index"""
+        with self._connect() as connection:
+            self._write_accessed(connection)
+
+    def close(self):
+        with self._db_lock:
+            if self._connection is not None:
+                self.flush()
+                self._connection.close()
+                self._connection = None
+
+    @staticmethod
+    def _key(url, start, end):
+        range_key = f"{'' if start is None else start}-{'' if end is None else end}"
+        return hashlib.sha256(f"{url}|{range_key}".encode()).hexdigest()
+
+    def _path(self, key):
+        return self.directory / key[:2] / key
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    @property
+    def size(self):
+        """return the number of bytes stored in the cache"""
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM blocks"
+            ).fetchone()[0]
+
+    @property
+    def info(self):
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "bytes_fetched": self.bytes_fetched,
+            "size": self.size,
+            "max_size": self.max_size,
+        }
+
+    def get(self, url: str, start=None, end=None) -> Optional[bytes]:
+        """return the cached content of a byte range or None"""
+        key = self._key(url, start, end)
+        data = None
+        if self.enabled:
+            with suppress(FileNotFoundError):
+                data = self._path(key).read_bytes()
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.bytes_saved += len(data)
+            self._accessed[key] = time.time()
+            flush = len(self._accessed) >= ACCESS_BATCH_SIZE
+
+        if flush:
+            self.flush()
+        return data
+
+    def put(self, url: str, start, end, data: bytes):
+        """store the content of a byte range and evict the least recently used blocks"""
+        with self._lock:
+            self.bytes_fetched += len(data)
+        if not self.enabled or len(data) > self.max_size:
+            return
+
+        key = self._key(url, start, end)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so concurrent readers never see partial blocks
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+        with self._connect() as connection:
+            self._write_accessed(connection)
+            connection.execute(
+                "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?)",
+                (key, url, len(data), time.time()),
+            )
+            total = connection.execute("SELECT SUM(size) FROM blocks").fetchone()[0]
+            if total > self.max_size:
+                evicted = []
+                for old_key, size in connection.execute(
+                    "SELECT key, size FROM blocks ORDER BY accessed"
+                ):
+                    if total <= self.max_size:
+                        break
+                    evicted.append(old_key)
+                    total -= size
+                connection.executemany(
+                    "DELETE FROM blocks WHERE key = ?", [(k,) for k in evicted]
+                )
+                for old_key in evicted:
+                    self._path(old_key).unlink(missing_ok=True)
+
+    def clear(self):
+        """remove all the blocks and reset the metrics"""
+        with self._connect() as connection:
+            keys = [row[0] for row in connection.execute("SELECT key FROM blocks")]
+            connection.execute("DELETE FROM blocks")
+        for key in keys:
+            self._path(key).unlink(missing_ok=True)
+        with self._lock:
+            self._accessed = {}
+            self.hits = self.misses = self.bytes_saved = self.bytes_fetched = 0
+
+
+@cache
+def get_chunk_cache():
+    """return the chunk cache shared by the catalogs"""
+    return ChunkCache()
+
+
+def is_metadata(path: str):
+    """return True for zarr metadata keys (e.g. .zmetadata, .zarray, zarr.json)"""
+    return str(path).rstrip("/").rsplit("/", 1)[-1] in METADATA_KEYS
+
+
+class CachedFile(AbstractBufferedFile):
+    """file reading aligned blocks through the chunk cache"""
+
+    def _fetch_range(self, start, end):
+        # keyed by size so that the blocks of a file that grew are read again
+        return self.fs._cat_cached(
+            self.path, f"{self.fs._url(self.path)}#{self.size}", start, end
+        )
+
+
+class ChunkCacheFileSystem(AbstractFileSystem):
+    """
+    Read-only filesystem fetching the content of a target filesystem through
+    a ChunkCache. Chunks (e.g. Zarr chunks) and byte ranges are cached while
+    the metadata of the stores is always fetched. The keys of the chunks
+    include a digest of the metadata they were read with, so the chunks of
+    a store that changed (e.g. appended time steps) are read again.
+    """
+
+    protocol = "pan3dcache"
+
+    def __init__(
+        self,
+        target_protocol: Optional[str] = None,
+        target_options: Optional[dict] = None,
+        fs: Optional[AbstractFileSystem] = None,
+        chunk_cache: Optional[ChunkCache] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        **kwargs,
+    ):
+        """
+        Create a cached filesystem
+
+        Parameters:
+            target_protocol (str): Protocol of the target filesystem (e.g. https, s3, gs).
+            target_options (dict): Options of the target filesystem (e.g. storage_options of a catalog entry).
+            fs (AbstractFileSystem): Target filesystem, instead of target_protocol/options.
+            chunk_cache (ChunkCache): Cache to use. (default: shared chunk cache)
+            block_size (int): Size of the blocks read from opened files. (default: 1MB)
+        """
+        super().__init__(**kwargs)
+        self.fs = fs or filesystem(target_protocol, **(target_options or {}))
+        self.chunk_cache = chunk_cache or get_chunk_cache()
+        self.block_size = block_size
+        # directory url => {metadata key: digest} of the metadata read
+        self._versions = {}
+
+    def _url(self, path):
+        return self.fs.unstrip_protocol(self.fs._strip_protocol(path))
+
+    def _cache_url(self, path):
+        """return the url of a chunk in the cache (None for metadata, which is not cached)"""
+        if is_metadata(path):
+            return None
+        url = self._url(path)
+        digests = []
+        directory = url
+        while "/" in directory:
+            directory = directory.rsplit("/", 1)[0]
+            digests.extend(sorted(self._versions.get(directory, {}).items()))
+        if not digests:
+            return url
+        version = hashlib.sha256(repr(digests).encode()).hexdigest()[:16]
+        return f"{url}#{version}"
+
+    def _read_metadata(self, path, data):
+        url = self._url(path).rstrip("/")
+        directory, name = url.rsplit("/", 1)
+        self._versions.setdefault(directory, {})[name] = hashlib.sha256(
+            data
+        ).hexdigest()
+
+    def _cat_cached(self, path, url, start=None, end=None, **kwargs):
+        data = self.chunk_cache.get(url, start, end)
+        if data is None:
+            data = self.fs.cat_file(path, start=start, end=end, **kwargs)
+            self.chunk_cache.put(url, start, end, data)
+        return data
+
+    def cat_file(self, path, start=None, end=None, **kwargs):
+        url = self._cache_url(path)
+        if url is None:
+            data = self.fs.cat_file(path, start=start, end=end, **kwargs)
+            if start is None and end is None:
+                self._read_metadata(path, data)
+            return data
+        return self._cat_cached(path, url, start, end, **kwargs)
+
+    def cat_ranges(
+        self, paths, starts, ends, max_gap=None, on_error="return", **kwargs
+    ):
+        if not isinstance(starts, list):
+            starts = [starts] * len(paths)
+        if not isinstance(ends, list):
+            ends = [ends] * len(paths)
+
+        urls = [self._cache_url(path) for path in paths]
+        out = [
+            None if url is None else self.chunk_cache.get(url, start, end)
+            for url, start, end in zip(urls, starts, ends)
+        ]
+        # the missing ranges are fetched together (concurrently for remote stores)
+        missing = [i for i, data in enumerate(out) if data is None]
+        if missing:
+            fetched = self.fs.cat_ranges(
+                [paths[i] for i in missing],
+                [starts[i] for i in missing],
+                [ends[i] for i in missing],
+                on_error="return",
+                **kwargs,
+            )
+            for i, data in zip(missing, fetched):
+                out[i] = data
+                if isinstance(data, Exception):
+                    continue
+                if urls[i] is not None:
+                    self.chunk_cache.put(urls[i], starts[i], ends[i], data)
+                elif starts[i] is None and ends[i] is None:
+                    self._read_metadata(paths[i], data)
+
+        if on_error != "return":
+            for data in out:
+                if isinstance(data, Exception):
+                    raise data
+        return out
+
+    def cat(self, path, recursive=False, on_error="raise", **kwargs):
+        if not isinstance(path, list) or recursive:
+            return super().cat(path, recursive=recursive, on_error=on_error, **kwargs)
+
+        # e.g. the chunks requested at once by zarr
+        results = self.cat_ranges(path, None, None, on_error="return", **kwargs)
+        out = {}
+        for key, data in zip(path, results):
+            if isinstance(data, Exception):
+                if on_error == "raise":
+                    raise data
+                if on_error == "omit":
+                    continue
+            out[key] = data
+        return out
+
+    def info(self, path, **kwargs):
+        return self.fs.info(path, **kwargs)
+
+    def ls(self, path, detail=True, **kwargs):
+        return self.fs.ls(path, detail=detail, **kwargs)
+
+    def _open(self, path, mode="rb", block_size=None, **kwargs):
+        if mode != "rb":
+            msg = "The chunk cache is read-only"
+            raise NotImplementedError(msg)
+        return CachedFile(
+            self,
+            path,
+            mode,
+            block_size=block_size or self.block_size,
+            cache_type="blockcache",
+            size=self.fs.size(path),
+        )
+
+
+def cached_filesystem(
+    url: str,
+    storage_options: Optional[dict] = None,
+    chunk_cache: Optional[ChunkCache] = None,
+):
+    """return a filesystem reading the store at url through the (shared) chunk cache"""
+    return ChunkCacheFileSystem(
+        target_protocol=get_protocol(str(url)),
+        target_options=storage_options,
+        chunk_cache=chunk_cache,
+        skip_instance_cache=True,
+    )
+
+
+def open_cached_dataset(
+    url: str, engine=None, storage_options=None, chunk_cache=None, **kwargs
+):
+    """
+    open a remote dataset with its chunks read through the (shared) chunk cache
+
+    Zarr stores are opened through a mapper of the cached filesystem, other
+    files (e.g. NetCDF4/HDF5) through a file object reading cached blocks.
+    """
+    fs = cached_filesystem(url, storage_options, chunk_cache)
+    if engine == "zarr":
+        return xarray.open_dataset(fs.get_mapper(url), engine="zarr", **kwargs)
+    return xarray.open_dataset(fs.open(url), engine=engine, **kwargs)
@@ -1,9 +1,13 @@
 # https://intake-esgf.readthedocs.io/en/latest/quickstart.html
+import warnings
 from datetime import datetime
+from functools import cache
 
 from intake_esgf import ESGFCatalog
 from intake_esgf.exceptions import NoSearchResults
 
+from pan3d.catalogs.index import CatalogIndex, to_terms
+
 
 def get_catalog():
     return {
@@ -13,14 +17,38 @@ def get_catalog():
     }
 
 
-def get_search_options():
+def walk_entries():
+    """
+    return one entry per dataset id of an unfiltered search with its facets
+    (used for listing the datasets and the search options, not for filtering)
+    """
     catalog = ESGFCatalog()
-    # perform unfiltered search and get unique values for each column
     results = catalog.search()
-    search_options = {}
-    for col in results.df.columns:
-        search_options[col] = list(results.df[col].explode().unique())
-    return search_options
+    entries = {}
+    for row in results.df.to_dict("records"):
+        for id in to_terms(row.get("id")):
+            if id is not None:
+                entries.setdefault(id, {**row, "id": id})
+    return list(entries.values())
+
+
+@cache
+def get_index():
+    """return the local index of the ESGF datasets"""
+    return CatalogIndex("esgf", walk_entries, source="esgf")
+
+
+def get_search_options():
+    return get_index().search_options()
+
+
+def remote_search(**kwargs):
+    catalog = ESGFCatalog()
+    try:
+        search = catalog.search(**kwargs)
+        return list(search.df.id.explode().unique())
+    except NoSearchResults:
+        return []
 
 
 def search(**kwargs):
@@ -28,20 +56,33 @@ def search(**kwargs):
     if not group_name:
         group_name = "All ESGF Datasets"
     start = datetime.now()
-    catalog = ESGFCatalog()
-    results = []
-    try:
-        search = catalog.search(**kwargs)
-        results = [
-            {
-                "id": id,
-                "subtitle": id,
-                "value": {"source": "esgf", "id": id},
-            }
-            for id in search.df.id.explode().unique()
-        ]
-    except NoSearchResults:
-        pass
+    if not kwargs:
+        ids = [entry["id"] for entry in get_index().search()]
+    else:
+        # the index only holds a snapshot of an unfiltered search so filters
+        # go to ESGF, the index is only used when ESGF can not be reached
+        try:
+            ids = remote_search(**kwargs)
+        except Exception as e:
+            index = get_index()
+            if index.built_at is None or not set(kwargs).issubset(
+                index.search_options()
+            ):
+                raise
+            warnings.warn(
+                f"ESGF search failed, results from the local index may be incomplete: {e!s}",
+                stacklevel=2,
+            )
+            ids = [entry["id"] for entry in index.search(**kwargs)]
+
+    results = [
+        {
+            "id": id,
+            "subtitle": id,
+            "value": {"source": "esgf", "id": id},
+        }
+        for id in ids
+    ]
 
     delta = datetime.now() - start
     message = f'Found {len(results)} dataset ids \
@@ -0,0 +1,195 @@
+import asyncio
+import bisect
+import os
+import random
+from collections.abc import Iterable
+
+import aiohttp
+import fsspec
+from fsspec.implementations.http import HTTPFileSystem
+from fsspec.utils import merge_offset_ranges
+
+# maximum number of simultaneous connections to remote stores
+DEFAULT_CONCURRENCY = int(os.environ.get("PAN3D_HTTP_CONCURRENCY", "32"))
+
+# responses worth retrying (timeout, throttling, server errors)
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+async def get_pooled_client(
+    concurrency=DEFAULT_CONCURRENCY, keepalive_timeout=60, **kwargs
+):
+    """return an aiohttp session reusing up to concurrency connections"""
+    connector = aiohttp.TCPConnector(
+        limit=concurrency,
+        limit_per_host=concurrency,
+        keepalive_timeout=keepalive_timeout,
+    )
+    return aiohttp.ClientSession(connector=connector, **kwargs)
+
+
+def is_retryable(error):
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in RETRY_STATUS
+    return isinstance(
+        error,
+        (
+            aiohttp.ClientConnectionError,
+            aiohttp.ClientPayloadError,
+            asyncio.TimeoutError,
+        ),
+    )
+
+
+class PooledHTTPFileSystem(HTTPFileSystem):
+    """
+    HTTP filesystem tuned for reading many chunks of remote stores.
+
+    Requests go through a single session keeping up to concurrency
+    connections alive, failed requests (connection errors, throttling, server
+    errors) are retried with an exponential backoff and byte ranges of a file
+    that are adjacent (or close) are fetched with a single request.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_gap: int = 64 * 1024,
+        max_block: int = 16 * 1024**2,
+        keepalive_timeout: float = 60,
+        **kwargs,
+    ):
+        """
+        Create a pooled HTTP filesystem
+
+        Parameters:
+            concurrency (int): Maximum number of simultaneous connections. (default: PAN3D_HTTP_CONCURRENCY or 32)
+            retries (int): Number of retries of a failed request. (default: 3)
+            backoff (float): Delay (in seconds) before the first retry, doubled for each retry. (default: 0.5)
+            max_gap (int): Maximum number of bytes between two ranges fetched together. (default: 64KB)
+            max_block (int): Maximum number of bytes of a request of coalesced ranges. (default: 16MB)
+            keepalive_timeout (float): Number of seconds an idle connection is kept open. (default: 60)
+            **kwargs: Options of fsspec HTTPFileSystem.
+        """
+        kwargs.setdefault(
+            "get_client",
+            lambda **client_kwargs: get_pooled_client(
+                concurrency, keepalive_timeout, **client_kwargs
+            ),
+        )
+        super().__init__(**kwargs)
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_gap = max_gap
+        self.max_block = max_block
+        self.requests = 0
+        self.retried = 0
+        self.coalesced = 0
+        self.bytes_fetched = 0
+
+    @property
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retried,
+            "coalesced": self.coalesced,
+            "bytes_fetched": self.bytes_fetched,
+        }
+
+    async def _request(self, url, start=None, end=None, **kwargs):
+        kw = self.kwargs.copy()
+        kw.update(kwargs)
+        headers = kw.pop("headers", {}).copy()
+        if start is not None or end is not None:
+            if start == end:
+                return b""
+            headers["Range"] = await self._process_limits(url, start, end)
+
+        session = await self.set_session()
+        async with session.get(self.encode_url(url), headers=headers, **kw) as r:
+            self._raise_not_found_for_status(r, url)
+            data = await r.read()
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        if r.status == 200 and "Range" in headers:
+            # the server ignored the range and returned the whole file
+            data = data[start:end]
+        return data
+
+    async def _cat_file(self, url, start=None, end=None, **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._request(url, start, end, **kwargs)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+            self.retried += 1
+            await asyncio.sleep(self.backoff * 2**attempt * random.uniform(0.5, 1))
+        return None
+
+    async def _cat_ranges(
+        self, paths, starts, ends, max_gap=None, on_error="return", **kwargs
+    ):
+        if not isinstance(starts, Iterable):
+            starts = [starts] * len(paths)
+        if not isinstance(ends, Iterable):
+            ends = [ends] * len(paths)
+        paths, starts, ends = list(paths), list(starts), list(ends)
+
+        # coalesce the explicit ranges of each file, others are fetched as is
+        ranged = [
+            i
+            for i, (start, end) in enumerate(zip(starts, ends))
+            if start is not None and end is not None and 0 <= start <= end
+        ]
+        blocks = list(
+            zip(
+                *merge_offset_ranges(
+                    [paths[i] for i in ranged],
+                    [starts[i] for i in ranged],
+                    [ends[i] for i in ranged],
+                    max_gap=self.max_gap if max_gap is None else max_gap,
+                    max_block=self.max_block,
+                )
+            )
+        )
+        self.coalesced += len(ranged) - len(blocks)
+        others = sorted(set(range(len(paths))) - set(ranged))
+        requests = blocks + [(paths[i], starts[i], ends[i]) for i in others]
+        results = await asyncio.gather(
+            *[self._cat_file(p, s, e, **kwargs) for p, s, e in requests],
+            return_exceptions=True,
+        )
+
+        out = [None] * len(paths)
+        for i, result in zip(others, results[len(blocks) :]):
+            out[i] = result
+
+        # split the coalesced blocks back into the requested ranges
+        file_blocks = {}
+        for (path, start, end), result in zip(blocks, results):
+            file_blocks.setdefault(path, []).append((start, end, result))
+        for i in ranged:
+            candidates = file_blocks[paths[i]]
+            index = bisect.bisect_right([b[0] for b in candidates], starts[i]) - 1
+            block_start, _, data = candidates[index]
+            if isinstance(data, Exception):
+                out[i] = data
+            else:
+                out[i] = data[starts[i] - block_start : ends[i] - block_start]
+
+        if on_error != "return":
+            for result in out:
+                if isinstance(result, Exception):
+                    raise result
+        return out
+
+
+def filesystem(protocol, **options):
+    """return the filesystem used to read remote stores of a given protocol"""
+    if protocol in ("http", "https"):
+        return PooledHTTPFileSystem(**options)
+    return fsspec.filesystem(protocol, **options)
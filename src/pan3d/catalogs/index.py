@@ -0,0 +1,211 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+# time (in seconds) after which an index is rebuilt from its catalog
+DEFAULT_TTL = float(os.environ.get("PAN3D_CATALOG_TTL", "86400"))
+
+
+def cache_directory():
+    """return the directory holding the catalog indexes (PAN3D_CACHE_DIR or ~/.cache/pan3d)"""
+    directory = os.environ.get("PAN3D_CACHE_DIR")
+    return Path(directory) if directory else Path.home() / ".cache" / "pan3d"
+
+
+def to_terms(value):
+    """return the searchable values of an entry field"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        # keep a NULL term so a field that is present but empty can be matched
+        return [str(v) for v in value if v is not None] or [None]
+    return [str(value)]
+
+
+class CatalogIndex:
+    """
+    Local SQLite index of the entries of a (remote) catalog.
+
+    The catalog is walked once by the build function and its entries are
+    stored along the searchable terms of each field so looking up an id,
+    listing search options and filtering are answered from the index. The
+    index is rebuilt when older than its TTL or when the catalog source
+    changes. When the catalog can not be reached (e.g. offline) the last
+    index is used even if outdated.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        build,
+        source: str = "",
+        ttl: float = DEFAULT_TTL,
+        path: Optional[str] = None,
+    ):
+        """
+        Create an index
+
+        Parameters:
+            name (str): Name of the catalog, used for the file name of the index.
+            build (callable): Function returning the catalog entries as a list of dict with a unique "id".
+            source (str): Location of the catalog (e.g. url or local stand-in file). The index is rebuilt when it changes.
+            ttl (float): Number of seconds before the index is rebuilt. (default: PAN3D_CATALOG_TTL or one day)
+            path (str): Path of the SQLite file. (default: <cache directory>/catalog-<name>.sqlite)
+        """
+        self.name = name
+        self.source = str(source)
+        self.ttl = ttl
+        self.path = Path(path) if path else cache_directory() / f"catalog-{name}.sqlite"
+        self._build = build
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path))
+        try:
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS entries (id TEXT PRIMARY KEY, data TEXT);
+                CREATE TABLE IF NOT EXISTS terms (id TEXT, key TEXT, value TEXT);
+                CREATE INDEX IF NOT EXISTS terms_key_value ON terms (key, value);
+                """
+            )
+            with connection:  # commit (or rollback) the transaction
+                yield connection
+        finally:
+            connection.close()
+
+    def _meta(self, connection):
+        return dict(connection.execute("SELECT key, value FROM meta"))
+
+    @property
+    def built_at(self):
+        """return the time (seconds since epoch) at which the index was built or None"""
+        with self._connect() as connection:
+            built_at = self._meta(connection).get("built_at")
+        return float(built_at) if built_at else None
+
+    @property
+    def stale(self):
+        """return True if the index needs to be (re)built"""
+        with self._connect() as connection:
+            meta = self._meta(connection)
+        if "built_at" not in meta or meta.get("source") != self.source:
+            return True
+        return time.time() - float(meta["built_at"]) > self.ttl
+
+    def refresh(self, force: bool = False):
+        """
+        Rebuild the index from the catalog if stale (or forced).
+
+        When the catalog can not be walked, the existing index is kept (with a
+        warning) and the error is only raised if there is no index at all.
+        """
+        with self._lock:
+            if not force and not self.stale:
+                return
+
+            try:
+                entries = self._build()
+            except Exception as e:
+                if self.built_at is None:
+                    raise
+                warnings.warn(
+                    f"Could not refresh the {self.name} catalog index, using the last one: {e!s}",
+                    stacklevel=2,
+                )
+                return
+
+            self.load(entries)
+
+    def load(self, entries: list[dict]):
+        """replace the content of the index with the provided entries"""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM entries")
+            connection.execute("DELETE FROM terms")
+            connection.execute("DELETE FROM meta")
+            connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?)",
+                [
+                    (str(entry["id"]), json.dumps(entry, default=str))
+                    for entry in entries
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO terms VALUES (?, ?, ?)",
+                [
+                    (str(entry["id"]), key, term)
+                    for entry in entries
+                    for key, value in entry.items()
+                    for term in to_terms(value)
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [("built_at", str(time.time())), ("source", self.source)],
+            )
+
+    def get(self, id: str) -> Optional[dict]:
+        """return the entry matching an id or None"""
+        self.refresh()
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT data FROM entries WHERE id = ?", (str(id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def search(self, **filters) -> list[dict]:
+        """
+        return the entries matching all the filters (key => list of accepted values).
+        An empty list of values only requires the entry to have that key.
+        """
+        self.refresh()
+        query = "SELECT data FROM entries"
+        conditions, args = [], []
+        for key, selected_values in filters.items():
+            values = (
+                [selected_values]
+                if isinstance(selected_values, str)
+                else list(selected_values or [])
+            )
+            if values:
+                placeholders = ",".join("?" * len(values))
+                conditions.append(
+                    f"id IN (SELECT id FROM terms WHERE key = ? AND value IN ({placeholders}))"
+                )
+                args.extend([key, *map(str, values)])
+            else:
+                conditions.append("id IN (SELECT id FROM terms WHERE key = ?)")
+                args.append(key)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        with self._connect() as connection:
+            rows = connection.execute(query + " ORDER BY rowid", args).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def search_options(self, keys=None) -> dict:
+        """return the sorted unique values of each key (all the keys by default)"""
+        self.refresh()
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT DISTINCT key, value FROM terms WHERE value IS NOT NULL ORDER BY key, value"
+            ).fetchall()
+
+        options = {key: [] for key in keys or []}
+        for key, value in rows:
+            if keys is None or key in options:
+                options.setdefault(key, []).append(value)
+        return options
+
+    def entries(self) -> list[dict]:
+        """return all the entries of the index"""
+        return self.search()
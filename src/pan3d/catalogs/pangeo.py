@@ -1,8 +1,17 @@
+import os
 from datetime import datetime
+from functools import cache
 
 import intake
 
-CATALOG_URL = "https://raw.githubusercontent.com/pangeo-data/pangeo-datastore/master/intake-catalogs/master.yaml"
+from pan3d.catalogs.cache import get_chunk_cache, is_remote, open_cached_dataset
+from pan3d.catalogs.index import CatalogIndex
+
+# PAN3D_PANGEO_CATALOG can point to a local stand-in catalog (e.g. offline use)
+CATALOG_URL = os.environ.get(
+    "PAN3D_PANGEO_CATALOG",
+    "https://raw.githubusercontent.com/pangeo-data/pangeo-datastore/master/intake-catalogs/master.yaml",
+)
 
 
 def get_catalog():
@@ -36,9 +45,21 @@ def get_entry_info(entry):
     }
 
 
-def get_all_entries():
+def is_zarr(entry_info):
+    """return True for the entries read with the zarr driver (e.g. zarr or intake_xarray.xzarr.ZarrSource)"""
+    drivers = entry_info.get("driver") or []
+    if isinstance(drivers, str):
+        drivers = [drivers]
+    return any(
+        str(driver).rsplit(".", 1)[-1].lower() in ("zarr", "zarrsource")
+        for driver in drivers
+    )
+
+
+def walk_entries(catalog_url=CATALOG_URL):
+    """open the intake catalog and collect the information of all its (sub) entries"""
     all_entries = []
-    catalog = intake.open_catalog(CATALOG_URL)
+    catalog = intake.open_catalog(catalog_url)
     for subcatalog_name in catalog:
         subcatalog = catalog[subcatalog_name]
         for entry_name, entry_data in subcatalog._entries.items():
@@ -47,47 +68,39 @@ def get_all_entries():
                     subentry = entry_data[subentry_name]
                     subentry_info = get_entry_info(subentry)
                     subentry_info["catalog"] = f"{subcatalog_name}/{entry_name}"
+                    subentry_info["path"] = [subcatalog_name, entry_name, subentry_name]
                     all_entries.append(subentry_info)
             else:
                 entry_info = get_entry_info(entry_data)
                 entry_info["catalog"] = subcatalog_name
+                entry_info["path"] = [subcatalog_name, entry_name]
                 all_entries.append(entry_info)
+
+    # name is the unique identifier
+    for entry in all_entries:
+        entry["id"] = entry["name"]
     return all_entries
 
 
-def entry_filter_match(entry, filters):
-    for key, selected_values in filters.items():
-        # name is the unique identifier
-        filter_key = "name" if key == "id" else key
-        entry_value = entry.get(filter_key)
-        if entry_value is None:
-            return False
-        if isinstance(entry_value, str):
-            entry_value = [entry_value]
-        if len(selected_values) and not any(v in selected_values for v in entry_value):
-            return False
+@cache
+def _get_index(catalog_url):
+    return CatalogIndex("pangeo", lambda: walk_entries(catalog_url), source=catalog_url)
 
-    return True
 
+def get_index():
+    """return the local index of the catalog entries (rebuilt when CATALOG_URL changes)"""
+    return _get_index(CATALOG_URL)
 
-def get_search_options():
-    all_entries = get_all_entries()
-    search_options = {
-        "name": [],
-        "container": [],
-        "driver": [],
-        "tags": [],
-        "catalog": [],
-        "requester_pays": ["true", "false"],
-    }
-    for entry_info in all_entries:
-        for search_option, search_value in search_options.items():
-            entry_value = entry_info.get(search_option)
-            if entry_value:
-                if isinstance(entry_value, str):
-                    entry_value = [entry_value]
-                search_options[search_option] = list({*search_value, *entry_value})
 
+def get_all_entries():
+    return get_index().entries()
+
+
+def get_search_options():
+    search_options = get_index().search_options(
+        ["name", "container", "driver", "tags", "catalog"]
+    )
+    search_options["requester_pays"] = ["true", "false"]
     return search_options
 
 
@@ -96,15 +109,13 @@ def search(**kwargs):
     if not group_name:
         group_name = "All Pangeo Datasets"
     start = datetime.now()
-    all_entries = get_all_entries()
     results = [
         {
             "id": entry["name"],
             "subtitle": entry["description"],
             "value": {"source": "pangeo", "id": entry["name"]},
         }
-        for entry in all_entries
-        if entry_filter_match(entry, kwargs)
+        for entry in get_index().search(**kwargs)
     ]
 
     delta = datetime.now() - start
@@ -128,21 +139,31 @@ def informative_error(e, **kwargs):
 
 
 def load_dataset(id):
-    catalog = intake.open_catalog(CATALOG_URL)
-    for subcatalog_name in catalog:
-        subcatalog = catalog[subcatalog_name]
-        for entry_name, entry_data in subcatalog._entries.items():
-            try:
-                entry = subcatalog[entry_name]
-                if entry.container == "catalog":
-                    for subentry_name in entry:
-                        if subentry_name == id:
-                            subentry = entry[subentry_name]
-                            return subentry.to_dask()
-                elif entry_name == id:
-                    return entry.to_dask()
-            except Exception as e:
-                raise ValueError(
-                    informative_error(e, dataset=entry_data.describe())
-                ) from e
-    return None
+    entry_info = get_index().get(id)
+    if entry_info is None:
+        return None
+
+    # go straight to the entry instead of walking the catalog
+    entry = intake.open_catalog(CATALOG_URL)
+    try:
+        for name in entry_info["path"]:
+            entry = entry[name]
+
+        # read the chunks of zarr stores through the local chunk cache
+        urlpath = getattr(entry, "urlpath", None)
+        if (
+            is_zarr(entry_info)
+            and isinstance(urlpath, str)
+            and is_remote(urlpath)
+            and get_chunk_cache().enabled
+        ):
+            return open_cached_dataset(
+                urlpath,
+                engine="zarr",
+                storage_options=getattr(entry, "storage_options", None),
+                chunks={},
+            )
+
+        return entry.to_dask()
+    except Exception as e:
+        raise ValueError(informative_error(e, dataset=entry_info)) from e
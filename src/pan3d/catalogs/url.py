@@ -1,5 +1,9 @@
+import contextlib
+
 import xarray
 
+from pan3d.catalogs.cache import get_chunk_cache, is_remote, open_cached_dataset
+
 
 def get_catalog():
     return {
@@ -26,4 +30,14 @@ def load_dataset(id):
         engine = "zarr"
     if ".nc" in id:
         engine = "netcdf4"
+
+    if is_remote(id) and get_chunk_cache().enabled:
+        if engine == "zarr":
+            return open_cached_dataset(id, engine="zarr", chunks={})
+        # NetCDF4 files are HDF5 files that h5netcdf reads by blocks, others
+        # (e.g. OPeNDAP endpoint or NetCDF3 file) are opened by netcdf4 below
+        if engine == "netcdf4":
+            with contextlib.suppress(OSError, ValueError):
+                return open_cached_dataset(id, engine="h5netcdf", chunks={})
+
     return xarray.open_dataset(id, engine=engine, chunks={})
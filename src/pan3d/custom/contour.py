@@ -2,6 +2,9 @@ from pathlib import Path
 
 import vtkmodules.vtkRenderingOpenGL2  # noqa: F401
 import xarray as xr
+from trame.app import TrameApp
+from trame.decorators import change
+from trame.ui.vuetify3 import VAppLayout
 from vtkmodules.vtkCommonCore import vtkLookupTable
 from vtkmodules.vtkCommonDataModel import vtkDataObject, vtkDataSetAttributes
 from vtkmodules.vtkFiltersCore import vtkAssignAttribute, vtkCellDataToPointData
@@ -25,12 +28,10 @@ from vtkmodules.vtkRenderingCore import (
 )
 
 from pan3d.ui.css import base, preview
-from pan3d.utils.convert import to_float, to_image
-from pan3d.utils.presets import PRESETS, set_preset
+from pan3d.utils.convert import to_float
+from pan3d.utils.presets import PRESETS, get_preset_image, set_preset
 from pan3d.widgets.pan3d_view import Pan3DView
-from trame.app import TrameApp
-from trame.decorators import change
-from trame.ui.vuetify3 import VAppLayout
+from pan3d.xarray.statistics import RangeStatistics
 from trame.widgets import html
 from trame.widgets import vuetify3 as v3
 
@@ -75,7 +76,8 @@ class ContourExplorer(TrameApp):
         # setup
         self.last_field = None
         self.last_preset = None
-        self.xr = xr.open_dataset(fields_file, engine="netcdf4")
+        self.xr = xr.open_dataset(fields_file, engine="netcdf4", chunks={})
+        self.statistics = RangeStatistics(self.xr)
         self.mesh = vtkDataSetReader(file_name=str(mesh_file))()
         self._setup_vtk()
         self._build_ui()
@@ -463,7 +465,7 @@ class ContourExplorer(TrameApp):
         if self.last_preset != color_preset:
             self.last_preset = color_preset
             set_preset(self.lut, color_preset)
-            self.state.preset_img = to_image(self.lut, 255)
+            self.state.preset_img = get_preset_image(color_preset)
 
         self.mapper.SetScalarRange(color_min, color_max)
         self.bands.GenerateValues(nb_contours, [color_min, color_max])
@@ -473,10 +475,11 @@ class ContourExplorer(TrameApp):
         if self.state.field is None:
             return
 
-        field_array = self.xr[self.state.field].values
+        # range over all the time steps, computed chunk by chunk and cached
+        color_min, color_max = self.statistics.range(self.state.field)
         with self.state:
-            self.state.color_min = float(field_array.min())
-            self.state.color_max = float(field_array.max())
+            self.state.color_min = color_min
+            self.state.color_max = color_max
 
 
 def main():
@@ -1,12 +1,18 @@
+import hashlib
 import math
 
 import numpy as np
-from vtkmodules.numpy_interface import dataset_adapter as dsa
 from vtkmodules.util import numpy_support, vtkConstants
 from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
 from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkUnstructuredGrid
 from vtkmodules.vtkFiltersCore import vtkAppendFilter
 
+VTK_POINTS_TYPES = {
+    np.dtype(np.float32): vtkConstants.VTK_FLOAT,
+    np.dtype(np.float64): vtkConstants.VTK_DOUBLE,
+}
+
 
 def ProcessPoint(point, radius, scale):
     theta = point[0]
@@ -18,6 +24,78 @@ def ProcessPoint(point, radius, scale):
     return [x, y, z]
 
 
+def project_to_sphere(points, radius, scale, out=None, dtype=np.float32):
+    """
+    Project (longitude, latitude, elevation) points onto a sphere.
+
+    Parameters:
+        points (np.ndarray): (n, 3) array of lon/lat in degrees and elevation.
+        radius (float): Radius of the sphere.
+        scale (float): Scaling applied to the elevation before adding it to the radius.
+        out (np.ndarray): Optional (n, 3) array to write the result into (e.g. a vtkPoints buffer).
+        dtype: Precision of the computation when `out` is not provided. (default: float32)
+
+    Returns:
+        np.ndarray: (n, 3) array of x, y, z coordinates.
+    """
+    if out is None:
+        out = np.empty(points.shape, dtype=dtype)
+    dtype = out.dtype
+
+    lon = np.radians(points[:, 0], dtype=dtype)
+    lat = np.radians(points[:, 1], dtype=dtype)
+    rho = points[:, 2].astype(dtype)
+    rho *= scale
+    rho += radius
+
+    # polar angle phi = 90 - lat => sin(phi) = cos(lat) and cos(phi) = sin(lat)
+    np.multiply(rho, np.sin(lat), out=out[:, 2])
+    np.cos(lat, out=lat)
+    rho *= lat
+    np.multiply(rho, np.cos(lon), out=out[:, 0])
+    np.sin(lon, out=lon)
+    np.multiply(rho, lon, out=out[:, 1])
+
+    return out
+
+
+def coordinates_hash(dataset):
+    """
+    Compute a digest of the geometry (not the fields) of a VTK dataset.
+
+    Regular datasets are hashed using their origin/spacing/extent or their
+    axis coordinates while other datasets need to hash all their points.
+    """
+    digest = hashlib.blake2b(dataset.GetClassName().encode(), digest_size=16)
+    digest.update(np.array(dataset.GetNumberOfCells()).tobytes())
+    if dataset.IsA("vtkImageData"):
+        digest.update(np.array(dataset.GetOrigin()).tobytes())
+        digest.update(np.array(dataset.GetSpacing()).tobytes())
+        digest.update(np.array(dataset.GetExtent()).tobytes())
+        digest.update(np.array(dataset.GetDirectionMatrix().GetData()).tobytes())
+        return digest.hexdigest()
+
+    if dataset.IsA("vtkRectilinearGrid"):
+        digest.update(np.array(dataset.GetExtent()).tobytes())
+        coords = [
+            dataset.GetXCoordinates(),
+            dataset.GetYCoordinates(),
+            dataset.GetZCoordinates(),
+        ]
+    else:
+        points = dataset.GetPoints()
+        coords = [points.GetData()] if points is not None else []
+        if dataset.IsA("vtkStructuredGrid"):
+            digest.update(np.array(dataset.GetExtent()).tobytes())
+
+    for array in coords:
+        values = np.ascontiguousarray(numpy_support.vtk_to_numpy(array))
+        digest.update(str((values.dtype, values.shape)).encode())
+        digest.update(values.data)
+
+    return digest.hexdigest()
+
+
 class ProjectToSphere(VTKPythonAlgorithmBase):
     def __init__(self):
         super().__init__(
@@ -28,6 +106,9 @@ class ProjectToSphere(VTKPythonAlgorithmBase):
         self.radius = 6378
         self.scale = 1.0
         self._bump_radius = 10
+        self._dtype = np.dtype(np.float32)
+        self._geometry_cache = None
+        self._geometry_cache_key = None
 
     def SetDataLayer(self, isData_):
         if self.isData != isData_:
@@ -49,31 +130,73 @@ class ProjectToSphere(VTKPythonAlgorithmBase):
             self._bump_radius = v
             self.Modified()
 
+    @property
+    def dtype(self):
+        """Precision of the projected points (float32 or float64)"""
+        return self._dtype
+
+    @dtype.setter
+    def dtype(self, v):
+        v = np.dtype(v)
+        if v not in VTK_POINTS_TYPES:
+            msg = f"Unsupported points type {v}, use float32 or float64"
+            raise ValueError(msg)
+        if v != self._dtype:
+            self._dtype = v
+            self.Modified()
+
+    def _project(self, dataset):
+        """Return a new vtkPoints with the projection of the dataset points"""
+        in_points = dataset.GetPoints()
+        vtk_coords = vtkPoints()
+        vtk_coords.SetDataType(VTK_POINTS_TYPES[self._dtype])
+        if in_points is None:
+            return vtk_coords
+
+        # Write projected coordinates directly into the vtkPoints buffer
+        vtk_coords.SetNumberOfPoints(in_points.GetNumberOfPoints())
+        pRadius = (self.radius + self._bump_radius) if self.isData else self.radius
+        project_to_sphere(
+            numpy_support.vtk_to_numpy(in_points.GetData()),
+            pRadius,
+            self.scale,
+            out=numpy_support.vtk_to_numpy(vtk_coords.GetData()),
+        )
+        vtk_coords.Modified()
+        return vtk_coords
+
+    def _geometry_key(self, dataset):
+        pRadius = (self.radius + self._bump_radius) if self.isData else self.radius
+        return (coordinates_hash(dataset), pRadius, self.scale, self._dtype)
+
     def RequestData(self, request, inInfo, outInfo):
         inData = self.GetInputData(inInfo, 0, 0)
         outData = self.GetOutputData(outInfo, 0)
-        if not inData.IsA("vtkUnstructuredGrid"):
-            afilter = vtkAppendFilter()
-            afilter.AddInputData(inData)
-            afilter.Update()
-            outData.DeepCopy(afilter.GetOutput())
-        else:
-            outData.DeepCopy(inData)
-
-        outWrap = dsa.WrapDataObject(outData)
-        try:
-            inPoints = np.array(outWrap.Points)
-            pRadius = (self.radius + self._bump_radius) if self.isData else self.radius
-            outPoints = np.array(
-                [ProcessPoint(x, pRadius, self.scale) for x in inPoints]
-            )
-        except Exception as e:
-            print(e)
-        _coords = numpy_support.numpy_to_vtk(
-            outPoints, deep=True, array_type=vtkConstants.VTK_FLOAT
-        )
-        vtk_coords = vtkPoints()
-        vtk_coords.SetData(_coords)
-        outWrap.SetPoints(vtk_coords)
+
+        # Reuse the projected geometry when only the fields have changed
+        # (i.e. time step update)
+        key = self._geometry_key(inData)
+        if key != self._geometry_cache_key:
+            geometry = vtkUnstructuredGrid()
+            if not inData.IsA("vtkUnstructuredGrid"):
+                afilter = vtkAppendFilter()
+                afilter.AddInputData(inData)
+                afilter.Update()
+                geometry.ShallowCopy(afilter.GetOutput())
+            else:
+                geometry.ShallowCopy(inData)
+
+            geometry.SetPoints(self._project(geometry))
+            geometry.GetPointData().Initialize()
+            geometry.GetCellData().Initialize()
+            geometry.GetFieldData().Initialize()
+
+            self._geometry_cache = geometry
+            self._geometry_cache_key = key
+
+        outData.ShallowCopy(self._geometry_cache)
+        outData.GetPointData().ShallowCopy(inData.GetPointData())
+        outData.GetCellData().ShallowCopy(inData.GetCellData())
+        outData.GetFieldData().ShallowCopy(inData.GetFieldData())
 
         return 1
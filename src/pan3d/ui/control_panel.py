@@ -63,7 +63,10 @@ class ControlPanel(v3.VCard):
             ):
                 v3.VProgressLinear(
                     v_if=toggle,
-                    indeterminate=("trame__busy",),
+                    indeterminate=(
+                        "trame__busy || (data_loading && !data_loading_progress)",
+                    ),
+                    model_value=("data_loading_progress", 0),
                     bg_color="rgba(0,0,0,0)",
                     absolute=True,
                     color="primary",
@@ -73,7 +76,10 @@ class ControlPanel(v3.VCard):
                 v3.VProgressCircular(
                     v_else=True,
                     bg_color="rgba(0,0,0,0)",
-                    indeterminate=("trame__busy",),
+                    indeterminate=(
+                        "trame__busy || (data_loading && !data_loading_progress)",
+                    ),
+                    model_value=("data_loading_progress", 0),
                     style="position: absolute; top: 0; left: 0; width: 100%; height: 100%;",
                     color="primary",
                     width=3,
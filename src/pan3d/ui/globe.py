@@ -13,6 +13,7 @@ class GlobeRenderingSettings(RenderingSettingsBasic):
 
         self.source = source
         self.state.setdefault("dataset_bounds", [0, 1, 0, 1, 0, 1])
+        self.state.setdefault("read_plan", None)
 
         with self.content:
             v3.VDivider()
@@ -125,6 +126,11 @@ class GlobeRenderingSettings(RenderingSettingsBasic):
                 step_vars=["slice_x_step", "slice_y_step", "slice_z_step"],
                 ctx_name="clip_slice",
             )
+            html.Div(
+                "{{ read_plan.summary }}",
+                v_if="read_plan",
+                classes="text-caption text-medium-emphasis px-4 pb-1",
+            )
             v3.VDivider()
 
             # Level of detail / Slice steps
@@ -1,6 +1,7 @@
 from pan3d.ui.rendering_settings import RenderingSettingsBasic
 from pan3d.utils.constants import XYZ
 from pan3d.widgets import ClipSliceControl, TimeNavigation, VectorPropertyControl
+from trame.widgets import html
 from trame.widgets import vuetify3 as v3
 
 
@@ -15,6 +16,7 @@ class RenderingSettings(RenderingSettingsBasic):
         self.state.setdefault("max_time_width", 0)
         self.state.setdefault("max_time_index_width", 0)
         self.state.setdefault("dataset_bounds", [0, 1, 0, 1, 0, 1])
+        self.state.setdefault("read_plan", None)
 
         with self.content:
             v3.VDivider()
@@ -29,6 +31,11 @@ class RenderingSettings(RenderingSettingsBasic):
                 step_vars=["slice_x_step", "slice_y_step", "slice_z_step"],
                 ctx_name="clip_slice",
             )
+            html.Div(
+                "{{ read_plan.summary }}",
+                v_if="read_plan",
+                classes="text-caption text-medium-emphasis px-4 pb-1",
+            )
 
             v3.VDivider()
 
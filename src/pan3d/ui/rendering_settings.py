@@ -1,5 +1,7 @@
 """Basic rendering settings UI component for Pan3D explorers."""
 
+import asyncio
+
 import numpy as np
 
 from pan3d.ui.collapsible import CollapsableSection
@@ -19,17 +21,21 @@ class RenderingSettingsBasic(CollapsableSection):
     - Color preset and range controls
     """
 
-    def __init__(self, source=None, update_rendering=None, **kwargs):
+    def __init__(
+        self, source=None, update_rendering=None, global_color_range=False, **kwargs
+    ):
         """
         Initialize the RenderingSettingsBasic component.
 
         Parameters:
             source: VTK source object for data
             update_rendering: Callback function to update rendering
+            global_color_range: Use the range of the arrays over all time steps
             **kwargs: Additional arguments passed to CollapsableSection
         """
         super().__init__("Rendering", "show_rendering", **kwargs)
         self.source = source
+        self.global_color_range = global_color_range
 
         with self.content:
             v3.VSelect(
@@ -56,26 +62,80 @@ class RenderingSettingsBasic(CollapsableSection):
                 reset_color_range=self.reset_color_range,
             )
 
+    def data_range(self, array_name):
+        """Return the (min, max) of an input array from the source statistics (None if not available)."""
+        data_range = getattr(self.source, "data_range", None)
+        if data_range is None:
+            return None
+        return data_range(array_name, global_time=self.global_color_range)
+
     def reset_color_range(self):
         """Reset the color range to the min and max values of the selected data array."""
         color_by = self.color_by.color_by
-        ds = self.source()
-        array = (
-            ds.point_data[color_by]
-            if color_by in ds.point_data.keys()
-            else ds.cell_data[color_by]
-            if color_by in ds.cell_data.keys()
-            else None
-        )
-        if array is not None:
-            self.color_by.color_min = float(np.min(array))
-            self.color_by.color_max = float(np.max(array))
+        array_range = self.data_range(color_by) if color_by else None
+        if array_range is None:
+            ds = self.source()
+            array = (
+                ds.point_data[color_by]
+                if color_by in ds.point_data.keys()
+                else ds.cell_data[color_by]
+                if color_by in ds.cell_data.keys()
+                else None
+            )
+            if array is not None:
+                array_range = np.min(array), np.max(array)
+
+        if array_range is not None:
+            self.color_by.color_min = float(array_range[0])
+            self.color_by.color_max = float(array_range[1])
         else:
             self.color_by.color_min = 0.0
             self.color_by.color_max = 1.0
 
         self.ctrl.view_update()
 
+    def request_histogram(self):
+        """
+        Compute the histogram of the color_by array in the background and stream
+        it to the color widgets as it refines.
+
+        Returns:
+            The future computing the histogram or None when not available (no
+            running event loop, no array or computed array)
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+        color_by = self.color_by.color_by
+        fetch_histogram = getattr(self.source, "fetch_histogram", None)
+        future = None
+        if color_by and fetch_histogram is not None:
+
+            def on_update(histogram):
+                loop.call_soon_threadsafe(self._on_histogram, color_by, histogram)
+
+            future = fetch_histogram(
+                color_by, global_time=self.global_color_range, callback=on_update
+            )
+
+        if future is None:
+            self._on_histogram(color_by, None)
+        return future
+
+    def _on_histogram(self, array_name, histogram):
+        if array_name != self.color_by.color_by:
+            return
+
+        self.color_by.histogram = histogram
+        if self.ctx.has("scalar_bar"):
+            self.ctx.scalar_bar.histogram = histogram
+
+    @change("color_by")
+    def _on_color_by(self, **_):
+        self.request_histogram()
+
     @change("data_arrays")
     def _on_array_selection(self, data_arrays, **_):
         # if self.state.import_pending:
@@ -87,7 +147,9 @@ class RenderingSettingsBasic(CollapsableSection):
         if self.source is None or self.source.input is None:
             self.color_by.data_arrays = []
         else:
-            self.color_by.set_data_arrays_from_vtk(self.source())
+            self.color_by.set_data_arrays_from_vtk(
+                self.source(), data_range=self.data_range
+            )
 
     def update_from_source(self, source=None):
         raise NotImplementedError(
@@ -1,13 +1,18 @@
+import asyncio
 import json
+import threading
 import traceback
+from concurrent.futures import wait
 from pathlib import Path
 
+from trame.app import TrameApp, asynchronous
+from trame.decorators import change
+
 from pan3d import catalogs as pan3d_catalogs
 from pan3d.utils.constants import SLICE_VARS, XYZ
 from pan3d.utils.convert import update_camera
 from pan3d.xarray.algorithm import vtkXArrayRectilinearSource
-from trame.app import TrameApp, asynchronous
-from trame.decorators import change
+from pan3d.xarray.planner import plan_summary
 
 
 class Explorer(TrameApp):
@@ -87,6 +92,16 @@ class Explorer(TrameApp):
         self.state.can_load = True
         self.state.load_button_text = "Load"
 
+        # Background data loading
+        self.state.data_loading = False
+        self.state.data_loading_progress = 0
+        self.state.read_plan = None
+        self._data_request = 0
+        self._data_task = None
+        self._data_future = None
+        self._load_task = None
+        self._load_lock = threading.Lock()
+
         self.ui = None
 
         # Initialize source
@@ -118,17 +133,17 @@ class Explorer(TrameApp):
         elif args.xarray_file:
             self.state.import_pending = True
             with self.state:
-                self.load_dataset("file", args.xarray_file)
+                task = self.load_dataset("file", args.xarray_file)
                 self.state.data_origin_id = str(Path(args.xarray_file).resolve())
-            self.state.import_pending = False
+            self._end_import(task)
 
         # load xarray (url)
         elif args.xarray_url:
             self.state.import_pending = True
             with self.state:
-                self.load_dataset("url", args.xarray_url)
+                task = self.load_dataset("url", args.xarray_url)
                 self.state.data_origin_id = args.xarray_url
-            self.state.import_pending = False
+            self._end_import(task)
 
         # Load given XArray
         elif self.xarray is not None:
@@ -232,18 +247,122 @@ class Explorer(TrameApp):
                 slices[axis_name] = self.state[f"slice_{axis}_cut"]
 
         source.slices = slices
-        ds = source()
-        self.state.dataset_bounds = ds.bounds
+        self.update_read_plan()
+        self.request_data_update()
 
-        self.ctrl.view_reset_clipping_range()
-        self.ctrl.view_update()
+    @change("data_arrays")
+    def _on_data_arrays(self, data_arrays, **_):
+        self.update_read_plan(data_arrays)
+
+    def update_read_plan(self, array_names=None):
+        """Estimate the data read for the current slices before loading them"""
+        plan = None
+        if hasattr(self.source, "read_plan"):
+            plan = self.source.read_plan(array_names)
+
+        if not plan or not plan["bytes_used"]:
+            self.state.read_plan = None
+            return
+
+        self.state.read_plan = {
+            "summary": plan_summary(plan),
+            "strategy": plan["strategy"],
+            "bytes_read": plan["bytes_read"],
+            "bytes_used": plan["bytes_used"],
+            "amplification": round(plan["amplification"], 2),
+        }
 
     @change("slice_t")
     def _on_slice_t(self, slice_t, **_):
         if self.state.import_pending:
             return
 
+        # data update handled by on_change
         self.source.t_index = slice_t
+
+    def request_data_update(self):
+        """
+        Load the data for the current source selection without blocking the
+        event loop and update the view once available.
+
+        Only the latest request is processed: requests that have not started
+        loading yet are cancelled when a new one comes in. When the source use
+        a point budget, the view is then progressively refined. While a dataset
+        is being loaded, its loading task is returned instead as it updates the
+        view once done.
+
+        Returns:
+            The asyncio task handling the update or None when no event loop is running
+            (in which case the update is done synchronously).
+        """
+        if self._load_task is not None and not self._load_task.done():
+            return self._load_task
+
+        self._data_request += 1
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._update_data()
+            return None
+
+        if not hasattr(self.source, "fetch"):
+            self._update_data()
+            return None
+
+        if self._data_task is not None and not self._data_task.done():
+            self._data_task.cancel()
+
+        self._data_task = asynchronous.create_task(self._fetch_data(self._data_request))
+        return self._data_task
+
+    async def _fetch_data(self, request_id):
+        loop = asyncio.get_running_loop()
+
+        def on_progress(fraction):
+            loop.call_soon_threadsafe(self._on_data_progress, request_id, fraction)
+
+        with self.state:
+            self.state.data_loading = True
+            self.state.data_loading_progress = 0
+
+        try:
+            while True:
+                future = self.source.fetch(progress=on_progress)
+                self._data_future = future
+                try:
+                    await asyncio.shield(asyncio.wrap_future(future))
+                finally:
+                    if request_id != self._data_request:
+                        future.cancel()
+
+                if request_id != self._data_request:
+                    return
+
+                self._update_data()
+                if not self.source.refine():
+                    break
+        except Exception:
+            print(traceback.format_exc())
+        finally:
+            if request_id == self._data_request:
+                with self.state:
+                    self.state.data_loading = False
+                    self.state.data_loading_progress = 0
+
+    def _on_data_progress(self, request_id, fraction):
+        if request_id != self._data_request:
+            return
+
+        with self.state:
+            self.state.data_loading_progress = round(100 * fraction)
+
+    def _update_data(self):
+        ds = self.source()
+        self.state.dataset_bounds = ds.bounds
+        if self.ctx.has("rendering"):
+            self.ctx.rendering.request_histogram()
+
+        self.ctrl.view_reset_clipping_range()
         self.ctrl.view_update()
 
     def extend_pipeline(self, head=None, pipeline=None):
@@ -301,6 +420,16 @@ class Explorer(TrameApp):
             self.import_state(json.loads(file_path.read_text("utf-8")))
 
     def load_dataset(self, source, id, order="C", config=None):
+        """
+        Load a dataset into the source and update the UI accordingly.
+
+        When an event loop is running, the dataset is opened and its first
+        mesh is loaded in a background thread so the UI stays responsive.
+
+        Returns:
+            The asyncio task handling the loading or None when no event loop is running
+            (in which case the dataset is loaded synchronously).
+        """
         self.state.data_origin_source = source
         self.state.data_origin_id = id
         self.state.load_button_text = "Loaded"
@@ -313,34 +442,108 @@ class Explorer(TrameApp):
                 "slices": {},
             }
 
+        data_info = {
+            "data_origin": {
+                "source": source,
+                "id": id,
+                "order": order,
+            },
+            "dataset_config": config,
+        }
+
         try:
-            self.source.load(
-                {
-                    "data_origin": {
-                        "source": source,
-                        "id": id,
-                        "order": order,
-                    },
-                    "dataset_config": config,
-                }
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._data_request += 1
+            try:
+                self._load_source(data_info, self._data_request)
+                self._on_dataset_loaded()
+            except Exception as e:
+                self._on_dataset_error(e)
+            return None
+
+        self._data_request += 1
+        self._load_task = asynchronous.create_task(
+            self._load_dataset(data_info, self._data_request)
+        )
+        return self._load_task
+
+    def _load_source(self, data_info, request_id, pending=None):
+        """load the source unless a newer request came in, one load at a time"""
+        with self._load_lock:
+            # don't change the source while its data is being read
+            if pending is not None:
+                wait([pending])
+
+            if request_id != self._data_request:
+                return False
+
+            self.source.load(data_info)
+            return True
+
+    async def _load_dataset(self, data_info, request_id):
+        loop = asyncio.get_running_loop()
+
+        # the data being fetched belongs to the previous dataset
+        if self._data_task is not None and not self._data_task.done():
+            self._data_task.cancel()
+
+        with self.state:
+            self.state.data_loading = True
+            self.state.data_loading_progress = 0
+
+        try:
+            loaded = await loop.run_in_executor(
+                None, self._load_source, data_info, request_id, self._data_future
             )
+            if loaded and hasattr(self.source, "fetch"):
+                await asyncio.wrap_future(self.source.fetch())
 
-            # Extract UI
-            self.ctrl.xr_update_info(self.source.input, self.source.available_arrays)
-            self.ctx.rendering.update_from_source(self.source)
+            if request_id != self._data_request:
+                return
 
-            # no error
-            self.state.data_origin_error = False
+            # let the UI updates request the data
+            self._load_task = None
+            with self.state:
+                self._on_dataset_loaded()
         except Exception as e:
-            self.state.data_origin_error = (
-                f"Error occurred while trying to load data. {e}"
-            )
-            self.state.data_origin_id_error = True
-            self.state.load_button_text = "Load"
-            self.state.can_load = True
-            self.state.show_data_information = False
+            if request_id == self._data_request:
+                with self.state:
+                    self._on_dataset_error(e)
+        finally:
+            if request_id == self._data_request:
+                with self.state:
+                    self.state.data_loading = False
+                    self.state.data_loading_progress = 0
+
+    def _on_dataset_loaded(self):
+        # Extract UI
+        self.ctrl.xr_update_info(self.source.input, self.source.available_arrays)
+        self.ctx.rendering.update_from_source(self.source)
+
+        # no error
+        self.state.data_origin_error = False
+
+    def _on_dataset_error(self, e):
+        self.state.data_origin_error = f"Error occurred while trying to load data. {e}"
+        self.state.data_origin_id_error = True
+        self.state.load_button_text = "Load"
+        self.state.can_load = True
+        self.state.show_data_information = False
 
-            print(traceback.format_exc())
+        print(traceback.format_exc())
+
+    def _end_import(self, task=None):
+        """clear the pending import once the given loading task (if any) is done"""
+        if task is None:
+            self.state.import_pending = False
+            return
+
+        def on_done(_):
+            with self.state:
+                self.state.import_pending = False
+
+        task.add_done_callback(on_done)
 
     def update_rendering(self, reset_camera=False):
         raise NotImplementedError(
@@ -386,8 +589,13 @@ class Explorer(TrameApp):
 
         Parameters:
             - data_state (dict): reader (+viewer) state to reset to
+
+        Returns:
+            The asyncio task handling the import or None when no event loop is running
+            (in which case the import is done synchronously).
         """
         self.state.import_pending = True
+        task = None
         try:
             data_origin = data_state.get("data_origin")
             source = data_origin.get("source")
@@ -399,18 +607,32 @@ class Explorer(TrameApp):
 
             # load data and initial rendering setup
             with self.state:
-                self.load_dataset(source, id, order, config)
+                task = self.load_dataset(source, id, order, config)
                 self.state.update(rendering_state)
 
-            # override computed color range using state values
-            with self.state:
-                self.state.update(rendering_state)
-
-            # update camera and render
-            update_camera(self.renderer.active_camera, camera_state)
-            self.update_rendering()
+            if task is None:
+                self._apply_rendering_state(rendering_state, camera_state)
+            else:
+                task = asynchronous.create_task(
+                    self._import_rendering_state(task, rendering_state, camera_state)
+                )
         finally:
-            self.state.import_pending = False
+            self._end_import(task)
+
+        return task
+
+    async def _import_rendering_state(self, load_task, rendering_state, camera_state):
+        await load_task
+        self._apply_rendering_state(rendering_state, camera_state)
+
+    def _apply_rendering_state(self, rendering_state, camera_state):
+        # override computed color range using state values
+        with self.state:
+            self.state.update(rendering_state)
+
+        # update camera and render
+        update_camera(self.renderer.active_camera, camera_state)
+        self.update_rendering()
 
     async def _save_dataset(self, file_path):
         output_path = Path(file_path).resolve()
@@ -1,7 +1,9 @@
 import base64
 import math
 
-from vtkmodules.vtkCommonCore import vtkUnsignedCharArray
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import VTK_RGB
 from vtkmodules.vtkCommonDataModel import vtkImageData
 from vtkmodules.vtkIOImage import vtkPNGWriter
 
@@ -28,26 +30,19 @@ def update_camera(camera, props):
 
 
 def to_image(lut, samples=255):
-    colorArray = vtkUnsignedCharArray()
-    colorArray.SetNumberOfComponents(3)
-    colorArray.SetNumberOfTuples(samples)
+    """return the colors of a lookup table over its range as a base64 PNG image"""
+    data_range = lut.GetRange()
+    delta = (data_range[1] - data_range[0]) / float(samples)
+    values = data_range[0] + np.arange(samples, dtype=np.double) * delta
 
-    dataRange = lut.GetRange()
-    delta = (dataRange[1] - dataRange[0]) / float(samples)
+    # Map all the samples at once
+    colors = np.zeros(samples * 3, dtype=np.uint8)
+    lut.MapScalarsThroughTable(numpy_support.numpy_to_vtk(values), colors, VTK_RGB)
 
     # Add the color array to an image data
     imgData = vtkImageData()
     imgData.SetDimensions(samples, 1, 1)
-    imgData.GetPointData().SetScalars(colorArray)
-
-    # Loop over all presets
-    rgb = [0, 0, 0]
-    for i in range(samples):
-        lut.GetColor(dataRange[0] + float(i) * delta, rgb)
-        r = int(round(rgb[0] * 255))
-        g = int(round(rgb[1] * 255))
-        b = int(round(rgb[2] * 255))
-        colorArray.SetTuple3(i, r, g, b)
+    imgData.GetPointData().SetScalars(numpy_support.numpy_to_vtk(colors.reshape(-1, 3)))
 
     writer = vtkPNGWriter()
     writer.WriteToMemoryOn()
@@ -55,7 +50,28 @@ def to_image(lut, samples=255):
     writer.SetCompressionLevel(6)
     writer.Write()
 
-    writer.GetResult()
-
     base64_img = base64.standard_b64encode(writer.GetResult()).decode("utf-8")
     return f"data:image/png;base64,{base64_img}"
+
+
+def to_histogram_bars(histogram, color_min, color_max, bins=64):
+    """
+    Re-bin a histogram ({"counts", "edges"}) over the color range and return
+    the heights (0-1) of its bars, or an empty list when not available.
+    """
+    if not histogram or histogram.get("edges") is None:
+        return []
+    try:
+        color_min, color_max = float(color_min), float(color_max)
+    except (TypeError, ValueError):
+        return []
+    if not color_min < color_max:
+        return []
+
+    cumulative = np.concatenate([[0], np.cumsum(histogram["counts"])])
+    edges = np.linspace(color_min, color_max, bins + 1)
+    counts = np.diff(np.interp(edges, histogram["edges"], cumulative))
+    if counts.max() <= 0:
+        return []
+
+    return np.round(counts / counts.max(), 3).tolist()
@@ -1,77 +1,177 @@
 import json
+import threading
+from collections import OrderedDict
+from functools import cache
 from pathlib import Path
 
 import numpy as np
 from vtkmodules.vtkCommonCore import vtkLookupTable
 from vtkmodules.vtkRenderingCore import vtkColorTransferFunction
 
+from pan3d.utils.convert import to_image
+
 PRESETS = {
     item.get("Name"): item
     for item in json.loads(Path(__file__).with_name("presets.json").read_text())
 }
 
-LUTS = {}
+# number of (preset, range) color transfer functions kept by get_preset
+LUTS_MAX_SIZE = 32
+
+LUTS = OrderedDict()
+LUTS_LOCK = threading.Lock()
+
+COLOR_SPACES = {
+    "Diverging": "SetColorSpaceToDiverging",
+    "HSV": "SetColorSpaceToHSV",
+    "Lab": "SetColorSpaceToLab",
+    "RGB": "SetColorSpaceToRGB",
+    "CIELAB": "SetColorSpaceToLabCIEDE2000",
+}
+
+
+def get_nodes(lut: vtkColorTransferFunction) -> np.ndarray:
+    """return the nodes of a color transfer function as (x, r, g, b, midpoint, sharpness) rows"""
+    nodes = np.zeros((lut.GetSize(), 6))
+    for i in range(lut.GetSize()):
+        lut.GetNodeValue(i, nodes[i])
+    return nodes
+
+
+def set_nodes(lut: vtkColorTransferFunction, nodes: np.ndarray):
+    """replace the nodes of a color transfer function ((x, r, g, b[, midpoint, sharpness]) rows)"""
+    nodes = np.asarray(nodes, dtype=np.double)
+    if nodes.shape[1] == 4 or (np.all(nodes[:, 4] == 0.5) and np.all(nodes[:, 5] == 0)):
+        # default midpoint/sharpness, fill all the nodes at once
+        lut.FillFromDataPointer(len(nodes), np.ascontiguousarray(nodes[:, :4]).ravel())
+    else:
+        lut.RemoveAllPoints()
+        for node in nodes.tolist():
+            lut.AddRGBPoint(*node)
 
 
 def update_range(lut: vtkColorTransferFunction, data_range):
+    """rescale the nodes of a color transfer function to data_range (in place)"""
     prev_min, prev_max = lut.GetRange()
     prev_delta = prev_max - prev_min
 
     if prev_delta < 0.001:
         return
 
-    node = [0, 0, 0, 0, 0, 0]
+    nodes = get_nodes(lut)
     next_delta = data_range[1] - data_range[0]
-    next_nodes = []
+    nodes[:, 0] = next_delta * (nodes[:, 0] - prev_min) / prev_delta + data_range[0]
+    set_nodes(lut, nodes)
+
+
+@cache
+def get_preset_points(preset_name: str) -> np.ndarray:
+    """
+    return the (memoized, read-only) control points of a preset as (x, r, g, b)
+    rows where x is normalized to [0, 1]
+    """
+    if preset_name not in PRESETS:
+        err_msg = f"Preset '{preset_name}' not found."
+        raise ValueError(err_msg)
+
+    points = np.array(PRESETS[preset_name]["RGBPoints"], dtype=np.double)
+    points = points.reshape(-1, 4)
+    x_min, x_max = get_preset_range(preset_name)
+    points[:, 0] = (points[:, 0] - x_min) / ((x_max - x_min) or 1)
+    points.flags.writeable = False
+    return points
+
+
+def get_preset_range(preset_name: str):
+    """return the (min, max) of the control points of a preset as defined in presets.json"""
+    x = PRESETS[preset_name]["RGBPoints"][::4]
+    return float(min(x)), float(max(x))
+
+
+def create_preset(preset_name: str, data_range=None) -> vtkColorTransferFunction:
+    """
+    return a new color transfer function for a preset with its control points
+    rescaled to data_range (preset range by default). Unlike get_preset, the
+    caller owns it and can modify it.
+    """
+    points = get_preset_points(preset_name).copy()
+    preset = PRESETS[preset_name]
+    lut = vtkColorTransferFunction()
 
-    for i in range(lut.GetSize()):
-        lut.GetNodeValue(i, node)
-        node[0] = next_delta * (node[0] - prev_min) / prev_delta + data_range[0]
-        next_nodes.append(list(node))
+    color_space = COLOR_SPACES.get(preset["ColorSpace"])
+    if color_space is not None:
+        getattr(lut, color_space)()
 
-    lut.RemoveAllPoints()
-    for n in next_nodes:
-        lut.AddRGBPoint(*n)
+    if "NanColor" in preset:
+        lut.SetNanColor(preset["NanColor"])
 
+    # Always RGB points
+    if data_range is None:
+        points = np.reshape(preset["RGBPoints"], (-1, 4))
+    else:
+        points[:, 0] = data_range[0] + points[:, 0] * (data_range[1] - data_range[0])
+    set_nodes(lut, points)
 
-def get_preset(preset_name: str) -> vtkColorTransferFunction:
-    if preset_name in LUTS:
-        return LUTS[preset_name]
+    return lut
 
-    lut = LUTS.setdefault(preset_name, vtkColorTransferFunction())
-    preset = PRESETS[preset_name]
-    srgb = np.array(preset["RGBPoints"])
-    color_space = preset["ColorSpace"]
-
-    if color_space == "Diverging":
-        lut.SetColorSpaceToDiverging()
-    elif color_space == "HSV":
-        lut.SetColorSpaceToHSV()
-    elif color_space == "Lab":
-        lut.SetColorSpaceToLab()
-    elif color_space == "RGB":
-        lut.SetColorSpaceToRGB()
-    elif color_space == "CIELAB":
-        lut.SetColorSpaceToLabCIEDE2000()
 
-    if "NanColor" in preset:
-        lut.SetNanColor(preset["NanColor"])
+def get_preset(preset_name: str, data_range=None) -> vtkColorTransferFunction:
+    """
+    return the color transfer function of a preset over data_range (preset
+    range by default). Instances are cached per (preset, range) and shared,
+    so they must not be modified (see create_preset).
+    """
+    key = (preset_name, None if data_range is None else tuple(map(float, data_range)))
+    with LUTS_LOCK:
+        lut = LUTS.get(key)
+        if lut is not None:
+            LUTS.move_to_end(key)
+            return lut
 
-    # Always RGB points
-    lut.RemoveAllPoints()
-    for arr in np.split(srgb, len(srgb) / 4):
-        lut.AddRGBPoint(arr[0], arr[1], arr[2], arr[3])
+    lut = create_preset(preset_name, data_range)
+
+    with LUTS_LOCK:
+        lut = LUTS.setdefault(key, lut)
+        LUTS.move_to_end(key)
+        while len(LUTS) > LUTS_MAX_SIZE:
+            LUTS.popitem(last=False)
 
     return lut
 
 
-def set_preset(lut: vtkLookupTable, preset_name: str, n_colors=255):
+@cache
+def get_preset_table(preset_name: str, n_colors=255) -> np.ndarray:
+    """return the (memoized) RGB colors of a preset sampled n_colors times over its range"""
     colors = get_preset(preset_name)
     min, max = colors.GetRange()
     delta = max - min
+    table = np.zeros(n_colors * 3)
+    colors.GetTable(min, min + (delta * (n_colors - 1) / n_colors), n_colors, table)
+    table = table.reshape(n_colors, 3)
+    table.flags.writeable = False
+    return table
+
+
+def set_preset(lut: vtkLookupTable, preset_name: str, n_colors=255):
+    table = get_preset_table(preset_name, n_colors)
     lut.SetNumberOfTableValues(n_colors)
-    for i in range(n_colors):
-        x = min + (delta * i / n_colors)
-        rgb = colors.GetColor(x)
+    for i, rgb in enumerate(table.tolist()):
         lut.SetTableValue(i, *rgb)
     lut.Build()
+
+
+@cache
+def get_preset_image(preset_name: str, samples=255) -> str:
+    """return the (memoized) base64 PNG image of a preset"""
+    if preset_name not in PRESETS:
+        err_msg = f"Preset '{preset_name}' not found."
+        raise ValueError(err_msg)
+
+    lut = vtkLookupTable()
+    set_preset(lut, preset_name, samples)
+    return to_image(lut, samples)
+
+
+def get_preset_images(samples=255) -> dict:
+    """return the images of all the presets (rendered once on first use)"""
+    return {name: get_preset_image(name, samples) for name in PRESETS}
@@ -3,8 +3,9 @@ from typing import Optional
 import numpy as np
 from vtkmodules.vtkCommonCore import vtkLookupTable
 
-from pan3d.utils.convert import to_image
-from pan3d.utils.presets import PRESETS, set_preset
+from pan3d.utils.convert import to_histogram_bars
+from pan3d.utils.presets import PRESETS, get_preset_image, set_preset
+from pan3d.xarray.statistics import histogram_percentiles
 from trame.widgets import html
 from trame.widgets import vuetify3 as v3
 
@@ -40,6 +41,8 @@ class ColorBy(html.Div):
         color_max_name=None,
         nan_color_name=None,
         reset_color_range=None,
+        percentiles=(1, 99),
+        histogram_bins=64,
         **kwargs,
     ):
         """
@@ -86,6 +89,12 @@ class ColorBy(html.Div):
         reset_color_range : callable or None, optional
             Optional callback function to reset the color range to the array's min/max.
 
+        percentiles : tuple(float, float), optional
+            Percentiles (0-100) of the histogram used by the automatic color range. Defaults to (1, 99).
+
+        histogram_bins : int, optional
+            Number of bars used to display the histogram over the color range. Defaults to 64.
+
         **kwargs : dict
             Additional keyword arguments passed to the parent `html.Div` component.
         """
@@ -105,13 +114,21 @@ class ColorBy(html.Div):
         self.__data_arrays = f"{ns}_data_arrays"
         self.__preset_image = f"{ns}_preset_img"
         self.__color_presets = f"{ns}_color_presets"
+        self.__histogram = f"{ns}_histogram"
+        self.__histogram_progress = f"{ns}_histogram_progress"
 
         # Register changes based on state update within the widget
         self.state.change(self.__color_preset)(self.set_preset)
         self.state.change(self.__color_by)(self.set_color_by)
         self.state.change(self.__nan_color)(self.set_nan_color)
+        self.state.change(self.__color_min, self.__color_max)(self._update_histogram)
 
         self.__array_infos = None
+        self._histogram = None
+        self.percentiles = percentiles
+        self.histogram_bins = histogram_bins
+        self.state[self.__histogram] = []
+        self.state[self.__histogram_progress] = 0
         self.data_arrays = data_arrays
         self.color_by = color_by
         self.preset = preset
@@ -165,7 +182,31 @@ class ColorBy(html.Div):
                         classes="mx-2",
                         click=reset_color_range,
                     )
+                with html.Div(classes="flex-0"):
+                    v3.VBtn(
+                        icon="mdi-chart-bell-curve",
+                        size="sm",
+                        density="compact",
+                        flat=True,
+                        variant="outlined",
+                        classes="mr-2",
+                        disabled=(f"!{self.__histogram}.length",),
+                        click=self.auto_range,
+                    )
             # v3.VDivider()
+            with html.Div(
+                v_if=(f"{self.__histogram}.length",),
+                classes="d-flex align-end mx-2 mt-1",
+                style=(
+                    f"`height: 1.5rem; opacity: ${{{self.__histogram_progress} < 1 ? 0.5 : 1}}`",
+                ),
+            ):
+                html.Div(
+                    v_for=f"(height, i) in {self.__histogram}",
+                    key="i",
+                    classes="bg-primary flex-grow-1",
+                    style=("`height: ${100 * height}%`",),
+                )
             with html.Div(classes="mx-2"):
                 html.Img(
                     src=(self.__preset_image, None),
@@ -264,6 +305,8 @@ class ColorBy(html.Div):
     def color_by(self, value):
         """Set the array to color by."""
         with self.state:
+            if value != self.state[self.__color_by]:
+                self._histogram = None
             self.state[self.__color_by] = value
             if self.__array_infos:
                 info = next(
@@ -297,7 +340,7 @@ class ColorBy(html.Div):
         self._preset = value
         set_preset(self._lut, value)
         with self.state:
-            self.state[self.__preset_image] = to_image(self._lut)
+            self.state[self.__preset_image] = get_preset_image(value)
 
     @property
     def preset_image_name(self):
@@ -353,8 +396,14 @@ class ColorBy(html.Div):
         nan_color = nan_colors[self.state[self.__nan_color]]
         self._lut.SetNanColor(nan_color)
 
-    def set_data_arrays_from_vtk(self, dataset, associations=None):
-        """Inspect dataset to extract arrays metadata. Only works with scalar fields."""
+    def set_data_arrays_from_vtk(self, dataset, associations=None, data_range=None):
+        """
+        Inspect dataset to extract arrays metadata. Only works with scalar fields.
+
+        data_range is an optional function returning the (min, max) of an array
+        from its name (or None) so the range does not need to be computed from
+        the dataset values (e.g. vtkXArrayRectilinearSource.data_range).
+        """
         if dataset is None:
             self.data_arrays = []
             return
@@ -374,16 +423,62 @@ class ColorBy(html.Div):
                         array = inst  # VTK 9.4 returns array instances
                         array_name = array.GetName()
                     # Now array is guaranteed to be the actual array object
+                    array_range = data_range(array_name) if data_range else None
+                    if array_range is None:
+                        array_range = np.min(array), np.max(array)
                     array_info.append(
                         {
                             "name": array_name,
-                            "min": np.min(array),
-                            "max": np.max(array),
+                            "min": array_range[0],
+                            "max": array_range[1],
                             "assoc": association,
                         }
                     )
         self.data_arrays = array_info
 
+    @property
+    def histogram(self):
+        return self._histogram
+
+    @histogram.setter
+    def histogram(self, value):
+        """
+        Set the histogram of the color_by array (None to clear) as
+        {"counts", "edges", "progress"} (see vtkXArrayRectilinearSource.fetch_histogram).
+        """
+        self._histogram = value
+        self._update_histogram()
+
+    @property
+    def histogram_name(self):
+        return self.__histogram
+
+    def _update_histogram(self, **_):
+        with self.state:
+            self.state[self.__histogram] = to_histogram_bars(
+                self._histogram, self.color_min, self.color_max, self.histogram_bins
+            )
+            self.state[self.__histogram_progress] = (self._histogram or {}).get(
+                "progress", 0
+            )
+
+    def auto_range(self):
+        """
+        Set the color range to the percentiles of the histogram so outliers do not
+        flatten the color mapping. Returns False if no histogram is available.
+        """
+        if not self._histogram or self._histogram.get("edges") is None:
+            return False
+
+        low, high = histogram_percentiles(
+            self._histogram["counts"], self._histogram["edges"], self.percentiles
+        )
+        if not (np.isfinite(low) and np.isfinite(high)):
+            return False
+
+        self.set_color_range(float(low), float(high))
+        return True
+
     def configure_mapper(self, mapper):
         """Configure the color mapper with the current settings for any data association."""
         # Find the association type for the selected array
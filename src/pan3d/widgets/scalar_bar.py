@@ -1,8 +1,8 @@
 from vtkmodules.vtkCommonCore import vtkLookupTable
 
 from pan3d.ui.css import base, vtk_view
-from pan3d.utils.convert import to_image
-from pan3d.utils.presets import PRESETS, set_preset
+from pan3d.utils.convert import to_histogram_bars
+from pan3d.utils.presets import PRESETS, get_preset_image, set_preset
 from trame.widgets import html
 from trame.widgets import vuetify3 as v3
 
@@ -21,9 +21,19 @@ class ScalarBar(v3.VTooltip):
         return f"pan3d_scalarbar{cls._next_id}"
 
     def __init__(
-        self, preset="Fast", color_min=0.0, color_max=1.0, ctx_name=None, **kwargs
+        self,
+        preset="Fast",
+        color_min=0.0,
+        color_max=1.0,
+        histogram_bins=64,
+        ctx_name=None,
+        **kwargs,
     ):
-        """Scalar bar for the XArray Explorers."""
+        """
+        Scalar bar for the XArray Explorers.
+
+        When a histogram is provided, its bars are drawn over the color range.
+        """
         self._lut = vtkLookupTable()
         super().__init__(location="top", ctx_name=ctx_name)
         # Activate CSS
@@ -34,11 +44,15 @@ class ScalarBar(v3.VTooltip):
         self.__preset_image = f"{ns}_preset"
         self.__color_min = f"{ns}_color_min"
         self.__color_max = f"{ns}_color_max"
+        self.__histogram = f"{ns}_histogram"
         # Probe enables mouse events for scalar bar
         self.__probe_location = f"{ns}_probe_location"
         self.__probe_enabled = f"{ns}_probe_enabled"
 
         # Initialize state
+        self._histogram = None
+        self.histogram_bins = histogram_bins
+        self.state[self.__histogram] = []
         self.preset = preset
         self.set_color_range(color_min, color_max)
         self.state[self.__probe_location] = []
@@ -70,6 +84,15 @@ class ScalarBar(v3.VTooltip):
                         mouseleave=f"{self.__probe_enabled} = 0",
                         __events=["mousemove", "mouseenter", "mouseleave"],
                     )
+                    with html.Div(
+                        v_if=(f"{self.__histogram}.length",),
+                        classes="scalarbar-histogram",
+                    ):
+                        html.Div(
+                            v_for=f"(height, i) in {self.__histogram}",
+                            key="i",
+                            style=("`height: ${100 * height}%`",),
+                        )
                     html.Div(
                         v_show=(self.__probe_enabled, False),
                         classes="scalar-cursor",
@@ -97,7 +120,7 @@ class ScalarBar(v3.VTooltip):
         self._preset = value
         set_preset(self._lut, value)
         with self.state:
-            self.state[self.__preset_image] = to_image(self._lut)
+            self.state[self.__preset_image] = get_preset_image(value)
 
     @property
     def preset_image_name(self):
@@ -111,6 +134,7 @@ class ScalarBar(v3.VTooltip):
     def color_min(self, value):
         with self.state:
             self.state[self.__color_min] = value
+            self._update_histogram()
 
     @property
     def color_min_name(self):
@@ -124,6 +148,7 @@ class ScalarBar(v3.VTooltip):
     def color_max(self, value):
         with self.state:
             self.state[self.__color_max] = value
+            self._update_histogram()
 
     @property
     def color_max_name(self):
@@ -133,3 +158,20 @@ class ScalarBar(v3.VTooltip):
         """Set the color range for the scalar bar."""
         self.state[self.__color_min] = color_min
         self.state[self.__color_max] = color_max
+        self._update_histogram()
+
+    @property
+    def histogram(self):
+        return self._histogram
+
+    @histogram.setter
+    def histogram(self, value):
+        """Set the histogram ({"counts", "edges"}) displayed over the color range (None to clear)."""
+        self._histogram = value
+        with self.state:
+            self._update_histogram()
+
+    def _update_histogram(self):
+        self.state[self.__histogram] = to_histogram_bars(
+            self._histogram, self.color_min, self.color_max, self.histogram_bins
+        )
@@ -17,6 +17,10 @@ class TimeNavigation(html.Div):
     - Time labels display with tooltip
     - Index display (current/total)
 
+    When there are more labels than `window`, only the labels around the
+    current index are sent to the client as an {index: label} mapping, so
+    `labels[index]` keeps working in client expressions.
+
     Usage:
         time_nav = TimeNavigation(
             labels=["2020-01-01", "2020-01-02", ...],
@@ -33,6 +37,7 @@ class TimeNavigation(html.Div):
         index_name=None,
         labels_name=None,
         labels=None,
+        window=500,
         **kwargs,
     ):
         """
@@ -46,6 +51,8 @@ class TimeNavigation(html.Div):
             State variable name for labels array
         labels : list, optional
             Initial list of time labels (strings)
+        window : int, optional
+            Maximum number of labels sent to the client (None to send them all)
         """
         super().__init__(**kwargs)
 
@@ -63,10 +70,16 @@ class TimeNavigation(html.Div):
         self.__labels = labels_name or f"{ns}_labels"
         self.__max_index = f"{ns}_max_index"
 
+        # Full list of labels, only a window of it may live in the state
+        self._labels = list(labels) if labels else []
+        self._window = window
+        self._window_range = None
+
         # Set default state
         self.state[self.__index] = 0
-        self.state[self.__labels] = labels if labels is not None else []
-        self.state[self.__max_index] = len(labels) - 1 if labels else 0
+        self.state[self.__max_index] = len(self._labels) - 1 if self._labels else 0
+        self._update_window()
+        self.state.change(self.__index)(self._on_index_change)
 
         # Build UI directly in __init__
         with self:
@@ -109,13 +122,15 @@ class TimeNavigation(html.Div):
     @property
     def labels(self):
         """Get the time labels."""
-        return self.state[self.__labels]
+        return self._labels
 
     @labels.setter
     def labels(self, value):
         """Set the time labels and update max index."""
         with self.state:
-            self.state[self.__labels] = list(value) if value else []
+            self._labels = list(value) if value else []
+            self._window_range = None
+            self._update_window()
             max_index = len(value) - 1 if value else 0
             self.state[self.__max_index] = max_index
 
@@ -132,3 +147,43 @@ class TimeNavigation(html.Div):
                 )
             else:
                 self.state.max_time_index_width = 0
+
+    @property
+    def window(self):
+        """Get the maximum number of labels sent to the client."""
+        return self._window
+
+    @window.setter
+    def window(self, value):
+        """Set the maximum number of labels sent to the client (None for all)."""
+        with self.state:
+            self._window = value
+            self._window_range = None
+            self._update_window()
+
+    def _on_index_change(self, **_):
+        self._update_window()
+
+    def _update_window(self):
+        """Send the labels around the current index to the client when needed."""
+        n_labels = len(self._labels)
+        if self._window is None or n_labels <= self._window:
+            if self._window_range != (0, n_labels):
+                self._window_range = (0, n_labels)
+                self.state[self.__labels] = self._labels
+            return
+
+        index = self.state[self.__index] or 0
+        if self._window_range is not None:
+            start, end = self._window_range
+            # keep the current window while the index is away from its edges
+            margin = self._window // 4
+            if (start == 0 or index - start >= margin) and (
+                end == n_labels or end - index > margin
+            ):
+                return
+
+        start = min(max(0, index - self._window // 2), n_labels - self._window)
+        end = start + self._window
+        self._window_range = (start, end)
+        self.state[self.__labels] = {i: self._labels[i] for i in range(start, end)}
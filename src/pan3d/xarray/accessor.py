@@ -162,6 +162,7 @@ class VTKAccessor:
         t: Optional[str] = None,
         arrays: Optional[list[str]] = None,
         order: str = "C",
+        mesh_type: str = "rectilinear",
     ):
         return algorithm.vtkXArrayRectilinearSource(
             input=self._xarray,
@@ -171,4 +172,5 @@ class VTKAccessor:
             t=t,
             arrays=arrays,
             order=order,
+            mesh_type=mesh_type,
         )
@@ -1,21 +1,59 @@
 import json
+import os
+import threading
 import traceback
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional
 
 import numpy as np
 import pandas as pd
 import xarray as xr
+from vtkmodules.util import numpy_support
 from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
-from vtkmodules.vtkCommonDataModel import vtkRectilinearGrid
-from vtkmodules.vtkFiltersCore import vtkArrayCalculator
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import (
+    vtkDataObject,
+    vtkRectilinearGrid,
+    vtkStructuredGrid,
+)
+
+from pan3d.xarray.expressions import COORDINATES, Calculator, Vector, to_values
+from pan3d.xarray.planner import plan_selection
+from pan3d.xarray.statistics import HISTOGRAM_BINS, RangeStatistics
 
 # -----------------------------------------------------------------------------
 # Helper functions
 # -----------------------------------------------------------------------------
 
+MESH_TYPES = {
+    "rectilinear": vtkRectilinearGrid,
+    "structured": vtkStructuredGrid,
+}
+
+# number of computed arrays kept in memory
+DERIVED_CACHE_SIZE = 32
+
+# minimum number of points per chunk when splitting in-memory computed field
+# inputs across the dask threads
+DERIVED_CHUNK_POINTS = 2**16
+
+# maximum memory (in bytes) of the cached meshes (default: 512MB)
+DEFAULT_CACHE_MEMORY = int(
+    os.environ.get("PAN3D_MESH_CACHE_MEMORY", str(512 * 1024**2))
+)
+
+# axis => (CF standard_name, CF units, name prefix) of curvilinear coordinates
+CURVILINEAR_AXES = {
+    "x": ("longitude", "degrees_east", "lon"),
+    "y": ("latitude", "degrees_north", "lat"),
+}
+
 
 def get_time_labels(times):
-    return [pd.to_datetime(time).strftime("%Y-%m-%d %H:%M:%S") for time in times]
+    """format datetime64 values as labels in a single vectorized pass"""
+    labels = pd.DatetimeIndex(times).strftime("%Y-%m-%d %H:%M:%S")
+    return labels.fillna("NaT").tolist()
 
 
 def is_time_type(dtype):
@@ -53,13 +91,473 @@ def to_isel(slices_info, *array_names):
     return slices if slices else None
 
 
+def axis_dims(metadata, x, y, z):
+    """
+    return the dimension along which each of the X, Y, Z coordinates is sliced.
+
+    1D coordinates use their own dimension while multi dimensional ones are
+    expected to follow the (z, y, x) convention (i.e. a 2D longitude mapped
+    to X is sliced along its last dimension).
+    """
+    result = {}
+    for i, name in enumerate((x, y, z)):
+        if name is None:
+            continue
+        dims = metadata.variables[name]["dims"]
+        if len(dims) == 1:
+            result[name] = dims[0]
+        elif len(dims) > i:
+            result[name] = dims[-1 - i]
+    return result
+
+
+def dim_slices(metadata, slices, x, y, z, t):
+    """return the slices of the X, Y, Z coordinates and time keyed by dimension name"""
+    dims = axis_dims(metadata, x, y, z)
+    if t is not None:
+        dims[t] = t
+    return {dims[name]: info for name, info in slices.items() if name in dims}
+
+
+def find_curvilinear_coord(metadata, array_name, axis):
+    """return the name of a multi dimensional longitude (x) or latitude (y) coordinate of an array"""
+    standard_name, units, prefix = CURVILINEAR_AXES[axis]
+    for name in metadata.variables[array_name]["coords"]:
+        coord = metadata.variables[name]
+        if len(coord["dims"]) < 2:
+            continue
+        if (
+            coord["attrs"].get("standard_name") == standard_name
+            or coord["attrs"].get("units") == units
+            or str(name).lower().startswith(prefix)
+        ):
+            return name
+    return None
+
+
+def structured_coords(dataset, coords, indexing):
+    """
+    Select the X, Y, Z coordinates of a structured grid.
+
+    Parameters:
+        dataset (xr.Dataset): dataset holding the coordinates
+        coords (list[str]): names of the X, Y, Z coordinates (None for a flat axis)
+        indexing (dict): isel() selection to apply on the coordinates
+
+    Returns:
+        (list[xr.DataArray], dict): the selected X, Y, Z coordinates and the sizes of the grid dimensions in (z, y, x) order
+    """
+    arrays = [None, None, None]
+    for i, name in enumerate(coords):
+        if name is None:
+            continue
+        coord = dataset[name]
+        selection = {k: v for k, v in (indexing or {}).items() if k in coord.dims}
+        arrays[i] = coord.isel(selection) if selection else coord
+
+    sizes = {}
+    for array in reversed(arrays):
+        if array is not None:
+            sizes.update(array.sizes)
+    if len(sizes) > 3:
+        msg = f"Structured grid can not have more than 3 dimensions {list(sizes)}"
+        raise ValueError(msg)
+
+    return arrays, sizes
+
+
+def structured_points(arrays, sizes, order):
+    """
+    Generate the (n, 3) points of a structured grid by broadcasting its 1D,
+    2D or 3D coordinates (see structured_coords) over the grid dimensions.
+    """
+    grid_dims = list(sizes)
+    shape = list(sizes.values())
+    dtype = np.result_type(np.float32, *[a.dtype for a in arrays if a is not None])
+    points = np.zeros((int(np.prod(shape)), 3), dtype=dtype)
+    for i, array in enumerate(arrays):
+        if array is None:
+            continue
+        values = array.transpose(*[d for d in grid_dims if d in array.dims])
+        # view of the i-th component with the grid shape
+        column = points[:, i].reshape(shape, order=order)
+        column[...] = values.to_numpy().reshape(
+            [array.sizes.get(d, 1) for d in grid_dims]
+        )
+
+    return points
+
+
+def structured_dimensions(shape, order):
+    """return the VTK dimensions (x varying the fastest) of a grid of a given numpy shape"""
+    dims = list(shape[::-1] if order == "C" else shape)
+    return dims + [1] * (3 - len(dims))
+
+
+def axis_size(slice_info, size):
+    """return the number of values selected by slice_info on an axis of a given size"""
+    if slice_info is None:
+        return size
+    if isinstance(slice_info, int):
+        return 1
+    return len(range(*slice(*slice_info).indices(size)))
+
+
+def compute_lod_strides(sizes, budget):
+    """
+    Compute per axis strides so the product of the strided sizes fits in budget.
+
+    Parameters:
+        sizes (dict): axis name => number of values along that axis
+        budget (int): maximum number of points
+
+    Returns:
+        dict: axis name => stride
+    """
+    strides = dict.fromkeys(sizes, 1)
+
+    def strided_size(name):
+        return -(-sizes[name] // strides[name])
+
+    def total():
+        return int(np.prod([strided_size(name) for name in sizes]))
+
+    while total() > budget:
+        # coarsen the axis that currently has the most values
+        name = max(sizes, key=strided_size)
+        if strided_size(name) <= 1:
+            break
+        strides[name] += 1
+
+    return strides
+
+
+def to_hashable(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, to_hashable(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(to_hashable(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value))
+    return value
+
+
+def mesh_changes(previous_key, key):
+    """
+    return which parts of a mesh need to be regenerated between two mesh keys
+    (see vtkXArrayRectilinearSource._mesh_key) as a set of "coords", "slices"
+    and "fields".
+    """
+    if previous_key is None:
+        return {"coords", "slices", "fields"}
+
+    x, y, z, t, slices, _, order, mesh_type = key
+    prev_x, prev_y, prev_z, prev_t, prev_slices, _, prev_order, prev_type = previous_key
+    slices, prev_slices = dict(slices), dict(prev_slices)
+
+    changes = set()
+    if (x, y, z, mesh_type) != (prev_x, prev_y, prev_z, prev_type) or (
+        mesh_type == "structured" and order != prev_order
+    ):
+        changes.add("coords")
+    if any(slices.get(name) != prev_slices.get(name) for name in (x, y, z)):
+        changes.add("slices")
+    if changes or t != prev_t or slices != prev_slices or order != prev_order:
+        changes.add("fields")
+
+    return changes
+
+
+def vtk_array_type(dtype):
+    """return the VTK type to store values of a given dtype or None if VTK can not hold them"""
+    if np.issubdtype(dtype, np.complexfloating):
+        return None
+    try:
+        return numpy_support.get_vtk_array_type(dtype)
+    except TypeError:
+        return None
+
+
+def is_contiguous(array, order):
+    """return True if raveling the array in the given order does not copy"""
+    if order == "F":
+        return array.flags.f_contiguous
+    return array.flags.c_contiguous
+
+
+class ArrayBufferPool:
+    """
+    Thread safe pool of VTK arrays used to materialize xarray data that can
+    not be handed to VTK as is (strided slices, dask arrays, non native byte
+    order). An array is reused once no VTK object references it anymore,
+    unless it was handed out (see release) as numpy views of it can not be
+    tracked.
+    """
+
+    def __init__(self, max_free: int = 4):
+        self._lock = threading.Lock()
+        self._arrays = []
+        self.max_free = max_free
+        self.stats = {}
+
+    @staticmethod
+    def _is_free(array, buffer_refs):
+        # only the pool holds the array and nothing shares its buffer
+        return (
+            array.GetReferenceCount() == 1
+            and array.GetBuffer().GetReferenceCount() == buffer_refs
+        )
+
+    def add_array(self, attributes, name, size, dtype):
+        """
+        Add a VTK array of the given size and dtype to the provided dataset
+        attributes and return a numpy view of its memory for filling it.
+        """
+        vtk_type = vtk_array_type(dtype)
+        with self._lock:
+            array = None
+            free = [entry for entry in self._arrays if self._is_free(*entry)]
+            for entry in free:
+                candidate = entry[0]
+                if (
+                    candidate.GetDataType() == vtk_type
+                    and candidate.GetNumberOfTuples() == size
+                ):
+                    array = candidate
+                    free.remove(entry)
+                    break
+
+            # release idle arrays we are unlikely to need
+            for entry in free[: max(0, len(free) - self.max_free)]:
+                self._arrays.remove(entry)
+
+            if array is None:
+                array = numpy_support.create_vtk_array(vtk_type)
+                array.SetNumberOfTuples(size)
+                self._arrays.append((array, array.GetBuffer().GetReferenceCount()))
+
+            array.SetName(name)
+            attributes.AddArray(array)
+
+        return numpy_support.vtk_to_numpy(array)
+
+    def release(self, dataset):
+        """
+        Stop tracking the arrays of a dataset handed out to the caller so
+        their memory is never reused: the numpy views the caller may hold
+        do not show in the reference counts.
+        """
+        attributes = dataset.GetPointData()
+        exposed = [
+            attributes.GetAbstractArray(i)
+            for i in range(attributes.GetNumberOfArrays())
+        ]
+        with self._lock:
+            self._arrays = [
+                entry
+                for entry in self._arrays
+                if not any(entry[0] is array for array in exposed)
+            ]
+
+    def record(self, name, copied_bytes=0):
+        """keep track of how an array was transferred to VTK"""
+        with self._lock:
+            stats = self.stats.setdefault(
+                name, {"zero_copy": 0, "copies": 0, "bytes_copied": 0}
+            )
+            if copied_bytes:
+                stats["copies"] += 1
+                stats["bytes_copied"] += copied_bytes
+            else:
+                stats["zero_copy"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._arrays = []
+
+
+class DatasetIndex:
+    """
+    Metadata of a xarray Dataset (dims, shapes, dtypes, chunks and coordinate
+    ranges) extracted once so it can be queried without going back to the
+    dataset, which may require fetching remote metadata.
+    """
+
+    def __init__(self, dataset: xr.Dataset):
+        self.sizes = dict(dataset.sizes)
+        self.coords = list(dataset.coords.keys())
+        self.data_vars = list(dataset.data_vars.keys())
+        self.variables = {}
+        for name, array in dataset.variables.items():
+            self.variables[name] = {
+                "dims": array.dims,
+                "shape": array.shape,
+                "size": int(array.size),
+                "dtype": array.dtype,
+                "chunks": array.chunks or array.encoding.get("chunks"),
+                "attrs": array.attrs,
+                "coords": [],
+                "range": None,
+            }
+        for name in self.data_vars:
+            # same coordinates as dataset[name].coords without creating the DataArray
+            dims = set(self.variables[name]["dims"])
+            self.variables[name]["coords"] = [
+                c for c in self.coords if set(self.variables[c]["dims"]) <= dims
+            ]
+        for name in self.coords:
+            info = self.variables[name]
+            if len(info["dims"]) == 1 and info["size"] > 1:
+                first, last = dataset[name].isel({info["dims"][0]: [0, -1]}).to_numpy()
+                info["range"] = [first, last]
+
+        # mesh type => result
+        self._available_coords = {}
+        self._available_arrays = {}
+
+    def available_coords(self, mesh_type="rectilinear"):
+        """return the coordinates that can be used as X, Y, Z or T for a given mesh type"""
+        result = self._available_coords.get(mesh_type)
+        if result is None:
+            max_dims = 3 if mesh_type == "structured" else 1
+            result = [
+                name
+                for name in self.coords
+                if 1 <= len(self.variables[name]["dims"]) <= max_dims
+            ]
+            self._available_coords[mesh_type] = result
+        return list(result)
+
+    def available_arrays(self, mesh_type="rectilinear"):
+        """return the data arrays defined on the available coordinates with the most dimensions"""
+        result = self._available_arrays.get(mesh_type)
+        if result is None:
+            coords = set(self.available_coords(mesh_type))
+            if mesh_type == "structured":
+                # curvilinear coordinates are defined on dimensions without coordinate
+                coords.update(
+                    d for name in list(coords) for d in self.variables[name]["dims"]
+                )
+
+            filtered_arrays = []
+            max_dim = 0
+            for name in set(self.data_vars) - set(self.coords):
+                if name.endswith(("_bnds", "_bounds")):
+                    continue
+
+                dims = set(self.variables[name]["dims"])
+                max_dim = max(max_dim, len(dims))
+                if dims.issubset(coords):
+                    filtered_arrays.append(name)
+
+            result = [
+                n for n in filtered_arrays if len(self.variables[n]["shape"]) == max_dim
+            ]
+            self._available_arrays[mesh_type] = result
+        return list(result)
+
+
+class MeshCache:
+    """
+    Thread safe LRU cache of generated VTK meshes bounded by a number of
+    meshes and by their memory (the most recent mesh is always kept).
+    """
+
+    def __init__(self, max_size: int = 4, max_memory: int = DEFAULT_CACHE_MEMORY):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._memory = {}
+        self.max_size = max_size
+        self.max_memory = max_memory
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def peek(self, key):
+        """return the cached mesh without affecting the LRU order or statistics"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def memory(self):
+        """return the memory (in bytes) of the cached meshes"""
+        with self._lock:
+            return sum(self._memory.values())
+
+    @property
+    def capacity(self):
+        """return the number of meshes (like the cached ones) that fit in the cache"""
+        with self._lock:
+            if not self._memory:
+                return self.max_size
+            mesh_memory = max(1, sum(self._memory.values()) // len(self._memory))
+        return max(1, min(self.max_size, self.max_memory // mesh_memory))
+
+    def get(self, key):
+        with self._lock:
+            mesh = self._entries.get(key)
+            if mesh is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return mesh
+
+    def put(self, key, mesh, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return  # stale result computed before a clear()
+            if self.max_size <= 0:
+                return
+
+            self._entries[key] = mesh
+            self._entries.move_to_end(key)
+            # shared arrays (e.g. coordinates) are counted for each mesh
+            self._memory[key] = mesh.GetActualMemorySize() * 1024
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_size
+                or sum(self._memory.values()) > self.max_memory
+            ):
+                old_key, _ = self._entries.popitem(last=False)
+                self._memory.pop(old_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._memory.clear()
+            self.generation += 1
+
+    @property
+    def info(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "memory": self.memory,
+            "max_memory": self.max_memory,
+        }
+
+
 # -----------------------------------------------------------------------------
 # VTK Algorithms
 # -----------------------------------------------------------------------------
 
 
 class vtkXArrayRectilinearSource(VTKPythonAlgorithmBase):
-    """vtkRectilinearGridAlgoritm for converting XArray as input"""
+    """
+    vtkRectilinearGridAlgoritm for converting XArray as input.
+    With mesh_type="structured" a vtkStructuredGrid is produced instead so
+    curvilinear (2D/3D) coordinates can be used.
+    """
 
     def __init__(
         self,
@@ -70,6 +568,12 @@ class vtkXArrayRectilinearSource(VTKPythonAlgorithmBase):
         t: Optional[str] = None,
         arrays: Optional[list[str]] = None,
         order: str = "C",
+        cache_size: int = 4,
+        prefetch: int = 0,
+        point_budget: Optional[int] = None,
+        lod_levels: int = 3,
+        mesh_type: str = "rectilinear",
+        cache_memory: int = DEFAULT_CACHE_MEMORY,
     ):
         """
         Create vtkXArrayRectilinearSource
@@ -82,18 +586,33 @@ class vtkXArrayRectilinearSource(VTKPythonAlgorithmBase):
             t (str): Name of the dimension to use for time. The dimension needs to work with the selected arrays.
             arrays (list[str]): List of field to load onto the generated VTK mesh.
             order (str): C or F for the convention order (C or Fortran). (default: C)
+            cache_size (int): Maximum number of generated meshes to keep in memory so revisited time steps don't reload data, within cache_memory. (default: 4)
+            prefetch (int): Number of time steps around t_index to load in the background. (default: 0)
+            point_budget (int): Maximum number of points of the generated mesh. When provided, strides are automatically added to the slices. (default: None)
+            lod_levels (int): Number of progressive levels of detail used to reach the point budget. (default: 3)
+            mesh_type (str): rectilinear or structured for curvilinear coordinates. (default: rectilinear)
+            cache_memory (int): Maximum memory (in bytes) of the cached meshes, the current one is always kept. (default: PAN3D_MESH_CACHE_MEMORY or 512MB)
         """
+        if mesh_type not in MESH_TYPES:
+            msg = f"mesh_type={mesh_type} is not one of [{', '.join(MESH_TYPES)}]"
+            raise ValueError(msg)
+
         VTKPythonAlgorithmBase.__init__(
             self,
             nInputPorts=0,
             nOutputPorts=1,
-            outputType="vtkRectilinearGrid",
+            outputType="vtkDataSet",
         )
         # Data source
         self._input = input
+        self._metadata = None
+        self._t_labels = {}
+        self._statistics = RangeStatistics(input)
         self._xarray_mesh = None
-        self._pipeline = None
         self._computed = {}
+        self._calculator = Calculator({})
+        self._derived = OrderedDict()
+        self._derived_lock = threading.Lock()
         self._data_origin = None
 
         # Array name selectors
@@ -110,6 +629,29 @@ class vtkXArrayRectilinearSource(VTKPythonAlgorithmBase):
         # Data order
         self._order = order
 
+        # Generated mesh type
+        self._mesh_type = mesh_type
+
+        # Mesh cache / time prefetching
+        self._cache = MeshCache(cache_size, cache_memory)
+        self._prefetch = prefetch
+        self._prefetch_executor = None
+        self._prefetch_tasks = {}
+
+        # Reusable memory for fields that can not be handed to VTK as is
+        self._buffers = ArrayBufferPool()
+
+        # (cache generation, key, mesh) of the last generated mesh for
+        # incremental updates, shared with the prefetch thread
+        self._last_mesh = None
+        self._last_mesh_lock = threading.Lock()
+
+        # Level of detail
+        self._point_budget = point_budget
+        self._lod_levels = max(1, lod_levels)
+        self._lod_level = 0
+        self._lod_base_key = None
+
         # Auto apply coords if none provided
         if all(v is None for v in (x, y, z, t)):
             self.apply_coords()
@@ -128,6 +670,7 @@ all:    {self.available_arrays}
 slices: {json.dumps(self.slices, indent=2)}
 computed: {json.dumps(self.computed, indent=2)}
 order: {self._order}
+mesh_type: {self._mesh_type}
 """
 
     # -------------------------------------------------------------------------
@@ -143,9 +686,20 @@ order: {self._order}
     def input(self, xarray_dataset: xr.Dataset):
         """update input with a new XArray"""
         self._input = xarray_dataset
+        self._metadata = None
+        self._t_labels = {}
+        self._statistics.dataset = xarray_dataset
         self._xarray_mesh = None
+        self.clear_cache()
         self.Modified()
 
+    @property
+    def metadata(self):
+        """return the metadata index of the input, built once per input (None without input)"""
+        if self._metadata is None and self._input is not None:
+            self._metadata = DatasetIndex(self._input)
+        return self._metadata
+
     # -------------------------------------------------------------------------
     # Array selectors
     # -------------------------------------------------------------------------
@@ -177,9 +731,7 @@ order: {self._order}
     @property
     def x_size(self):
         """return the size of the coordinate used for the X axis"""
-        if self._x is None:
-            return 0
-        return int(self._input[self._x].size)
+        return self._axis_size(self._x)
 
     @property
     def y(self):
@@ -208,9 +760,7 @@ order: {self._order}
     @property
     def y_size(self):
         """return the size of the coordinate used for the Y axis"""
-        if self._y is None:
-            return 0
-        return int(self._input[self._y].size)
+        return self._axis_size(self._y)
 
     @property
     def z(self):
@@ -239,9 +789,7 @@ order: {self._order}
     @property
     def z_size(self):
         """return the size of the coordinate used for the Z axis"""
-        if self._z is None:
-            return 0
-        return int(self._input[self._z].size)
+        return self._axis_size(self._z)
 
     @property
     def t(self):
@@ -267,13 +815,26 @@ order: {self._order}
             self._xarray_mesh = None
             self.Modified()
 
+    @property
+    def axis_dims(self):
+        """return the dimension along which each of the X, Y, Z coordinates is sliced"""
+        if self._input is None:
+            return {}
+        return axis_dims(self.metadata, self._x, self._y, self._z)
+
+    def _axis_size(self, coord_name):
+        """return the number of values along the dimension of an X, Y, Z coordinate"""
+        dim = self.axis_dims.get(coord_name)
+        if dim is None:
+            return 0
+        return int(self.metadata.sizes[dim])
+
     @property
     def slice_extents(self):
         """return a dictionary for the X, Y, Z dimensions with the corresponding extent [0, size-1]"""
         return {
-            coord_name: [0, self.input[coord_name].size - 1]
-            for coord_name in [self.x, self.y, self.z]
-            if coord_name is not None
+            coord_name: [0, self._axis_size(coord_name) - 1]
+            for coord_name in self.axis_dims
         }
 
     def apply_coords(self):
@@ -282,7 +843,10 @@ order: {self._order}
             return
 
         array_name = self.available_arrays[0]
-        coords = self._input[array_name].dims
+        dims = self.metadata.variables[array_name]["dims"]
+        coords = dims
+        if self._mesh_type == "structured":
+            coords = self._curvilinear_coords(array_name, dims)
 
         # reset coords arrays
         self.x = None
@@ -302,8 +866,8 @@ order: {self._order}
                 setattr(self, key, value)
         elif len(coords) == 3:
             # Is it 2D dataset with time or 3D dataset ?
-            outer_dtype = self._input[array_name][coords[0]].dtype
-            if is_time_type(outer_dtype):
+            outer = self.metadata.variables.get(dims[0])
+            if outer is not None and is_time_type(outer["dtype"]):
                 axes.remove("z")
                 for key, value in zip(axes, coords):
                     setattr(self, key, value)
@@ -312,13 +876,22 @@ order: {self._order}
                 for key, value in zip(axes, coords):
                     setattr(self, key, value)
 
+    def _curvilinear_coords(self, array_name, dims):
+        """replace the dimensions of an array that are not coordinates with its longitude/latitude"""
+        coords = set(self.available_coords)
+        result = list(dims)
+        for axis, index in (("x", -1), ("y", -2)):
+            if len(result) >= -index and result[index] not in coords:
+                result[index] = find_curvilinear_coord(self.metadata, array_name, axis)
+        return [name if name in coords else None for name in result]
+
     @property
     def available_coords(self):
-        """List available coordinates arrays that have are 1D"""
+        """List available coordinates arrays that have are 1D (up to 3D for structured meshes)"""
         if self._input is None:
             return []
 
-        return [k for k, v in self._input.coords.items() if len(v.shape) == 1]
+        return self.metadata.available_coords(self._mesh_type)
 
     # -------------------------------------------------------------------------
     # Data sub-selection
@@ -342,7 +915,7 @@ order: {self._order}
         """return the size of the coordinate used for the time"""
         if self._t is None:
             return 0
-        return int(self._input[self._t].size)
+        return self.metadata.variables[self._t]["size"]
 
     @property
     def t_labels(self):
@@ -350,11 +923,16 @@ order: {self._order}
         if self._t is None:
             return []
 
-        t_array = self._input[self._t]
-        t_type = t_array.dtype
-        if np.issubdtype(t_type, np.datetime64):
-            return get_time_labels(t_array.to_numpy())
-        return [str(t) for t in t_array.to_numpy()]
+        labels = self._t_labels.get(self._t)
+        if labels is None:
+            t_array = self._input[self._t].to_numpy()
+            if np.issubdtype(t_array.dtype, np.datetime64):
+                labels = get_time_labels(t_array)
+            else:
+                labels = [str(t) for t in t_array]
+            self._t_labels[self._t] = labels
+
+        return list(labels)
 
     @property
     def arrays(self):
@@ -376,19 +954,7 @@ order: {self._order}
         if self._input is None:
             return []
 
-        filtered_arrays = []
-        max_dim = 0
-        coords = set(self.available_coords)
-        for name in set(self._input.data_vars.keys()) - set(self._input.coords.keys()):
-            if name.endswith(("_bnds", "_bounds")):
-                continue
-
-            dims = set(self._input[name].dims)
-            max_dim = max(max_dim, len(dims))
-            if dims.issubset(coords):
-                filtered_arrays.append(name)
-
-        return [n for n in filtered_arrays if len(self._input[n].shape) == max_dim]
+        return self.metadata.available_arrays(self._mesh_type)
 
     @property
     def slices(self):
@@ -422,6 +988,305 @@ order: {self._order}
         self._xarray_mesh = None
         self.Modified()
 
+    @property
+    def mesh_type(self):
+        """return the type of mesh generated (rectilinear or structured)"""
+        return self._mesh_type
+
+    @mesh_type.setter
+    def mesh_type(self, mesh_type: str):
+        """update the type of mesh to generate (rectilinear or structured)"""
+        if mesh_type not in MESH_TYPES:
+            msg = f"mesh_type={mesh_type} is not one of [{', '.join(MESH_TYPES)}]"
+            raise ValueError(msg)
+        if mesh_type != self._mesh_type:
+            self._mesh_type = mesh_type
+            self._xarray_mesh = None
+            self.Modified()
+
+    @property
+    def cache_size(self):
+        """return the maximum number of meshes kept in the cache"""
+        return self._cache.max_size
+
+    @cache_size.setter
+    def cache_size(self, size: int):
+        """update the maximum number of meshes kept in the cache (0 to disable)"""
+        self._cache.max_size = size
+        if size <= 0:
+            self.clear_cache()
+
+    @property
+    def cache_memory(self):
+        """return the maximum memory (in bytes) of the cached meshes"""
+        return self._cache.max_memory
+
+    @cache_memory.setter
+    def cache_memory(self, max_memory: int):
+        """update the maximum memory (in bytes) of the cached meshes"""
+        self._cache.max_memory = max_memory
+
+    @property
+    def prefetch(self):
+        """return the number of time steps loaded in the background around t_index"""
+        return self._prefetch
+
+    @prefetch.setter
+    def prefetch(self, n_steps: int):
+        """update the number of time steps to load in the background around t_index"""
+        self._prefetch = n_steps
+
+    @property
+    def cache_info(self):
+        """return hits/misses/size/max_size/pending statistics of the mesh cache"""
+        return {
+            **self._cache.info,
+            "pending": sum(not f.done() for f in self._prefetch_tasks.values()),
+        }
+
+    @property
+    def statistics(self):
+        """return the service computing (and caching) the statistics of the input arrays"""
+        return self._statistics
+
+    def read_plan(self, array_names: Optional[list[str]] = None):
+        """
+        return the expected cost of loading arrays over the current slices
+        given the chunking of their data (see pan3d.xarray.planner), without
+        reading any data.
+
+        Parameters:
+            array_names (list[str]): Names of the arrays. (default: the loaded arrays)
+
+        Returns:
+            dict: {"bytes_read", "bytes_used", "amplification", "strategy", "arrays": {name: plan}} or None without input
+        """
+        if self._input is None:
+            return None
+
+        indexing, _ = self._field_selection(self._mesh_key())
+        names = self.arrays if array_names is None else array_names
+        plans = {
+            name: plan_selection(self._input[name], indexing)
+            for name in sorted(names)
+            if name in self._input.variables
+        }
+        bytes_read = sum(plan["bytes_read"] for plan in plans.values())
+        bytes_used = sum(plan["bytes_used"] for plan in plans.values())
+        # strategy of the array reading the most data
+        largest = max(plans.values(), key=lambda p: p["bytes_read"], default={})
+        return {
+            "bytes_read": bytes_read,
+            "bytes_used": bytes_used,
+            "amplification": bytes_read / bytes_used if bytes_used else 1.0,
+            "strategy": largest.get("strategy"),
+            "arrays": plans,
+        }
+
+    def data_range(self, array_name: str, global_time: bool = False):
+        """
+        return the (min, max) of an input array over the current slices while
+        ignoring NaN values.
+
+        Parameters:
+            array_name (str): Name of the array.
+            global_time (bool): Use all the time steps instead of the current one. (default: False)
+
+        Returns:
+            (float, float) or None if the array is not part of the input (i.e. computed)
+        """
+        if self._input is None or array_name not in self._input.data_vars:
+            return None
+
+        # in memory data already loaded at full resolution on the mesh
+        mesh = self._xarray_mesh
+        if (
+            not global_time
+            and mesh is not None
+            and self._input[array_name].chunks is None
+            and self.lod_slices() == self.slices
+            and mesh.GetPointData().HasArray(array_name)
+        ):
+            return mesh.GetPointData().GetArray(array_name).GetRange()
+
+        slices = dim_slices(
+            self.metadata, self.slices, self._x, self._y, self._z, self._t
+        )
+        return self._statistics.range(
+            array_name, slices, time=self._t if global_time else None
+        )
+
+    def fetch_histogram(
+        self,
+        array_name: str,
+        bins: int = HISTOGRAM_BINS,
+        global_time: bool = False,
+        callback=None,
+    ):
+        """
+        Compute the histogram of an input array over the current slices in a
+        background thread, chunk by chunk. Partial results are reported to
+        the callback (from the background thread) as the histogram refines and
+        the final result is cached. Only the latest request is processed.
+
+        Parameters:
+            array_name (str): Name of the array.
+            bins (int): Number of bins over the (min, max) range of the array. (default: 256)
+            global_time (bool): Use all the time steps instead of the current one. (default: False)
+            callback (callable): Function called with {"counts", "edges", "count", "progress", "percentiles"}.
+
+        Returns:
+            concurrent.futures.Future or None if the array is not part of the input (i.e. computed)
+        """
+        if self._input is None or array_name not in self._input.data_vars:
+            return None
+
+        slices = dim_slices(
+            self.metadata, self.slices, self._x, self._y, self._z, self._t
+        )
+        return self._statistics.submit_histogram(
+            array_name,
+            slices,
+            time=self._t if global_time else None,
+            bins=bins,
+            callback=callback,
+        )
+
+    @property
+    def transfer_info(self):
+        """return per array zero_copy/copies/bytes_copied statistics of the xarray to VTK transfer"""
+        return {name: dict(stats) for name, stats in self._buffers.stats.items()}
+
+    def clear_cache(self):
+        """drop all cached meshes, release idle buffers and cancel pending prefetch"""
+        for task in self._prefetch_tasks.values():
+            task.cancel()
+        self._prefetch_tasks = {}
+        self._cache.clear()
+        self._buffers.clear()
+        with self._derived_lock:
+            self._derived.clear()
+        with self._last_mesh_lock:
+            self._last_mesh = None
+
+    def close(self):
+        """cancel the background loading and stop its thread (e.g. once the source is not used anymore)"""
+        self.clear_cache()
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+            self._prefetch_executor = None
+        self._statistics.close()
+
+    def __del__(self):
+        executor = getattr(self, "_prefetch_executor", None)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # -------------------------------------------------------------------------
+    # Level of detail
+    # -------------------------------------------------------------------------
+
+    @property
+    def point_budget(self):
+        """return the maximum number of points of the generated mesh (None when LOD is disabled)"""
+        return self._point_budget
+
+    @point_budget.setter
+    def point_budget(self, budget: Optional[int]):
+        """update the maximum number of points of the generated mesh (None to disable LOD)"""
+        if budget != self._point_budget:
+            self._point_budget = budget
+            self._lod_level = 0
+            self._xarray_mesh = None
+            self.Modified()
+
+    @property
+    def lod_levels(self):
+        """return the number of progressive levels used to reach the point budget"""
+        return self._lod_levels
+
+    @lod_levels.setter
+    def lod_levels(self, n_levels: int):
+        """update the number of progressive levels used to reach the point budget"""
+        n_levels = max(1, n_levels)
+        if n_levels != self._lod_levels:
+            self._lod_levels = n_levels
+            self._lod_level = 0
+            self._xarray_mesh = None
+            self.Modified()
+
+    @property
+    def lod_level(self):
+        """return the current level of detail (0 is the coarsest, lod_levels - 1 fits the point budget)"""
+        return self._lod_level
+
+    @lod_level.setter
+    def lod_level(self, level: int):
+        """update the current level of detail"""
+        level = min(max(0, level), self._lod_levels - 1)
+        if level != self._lod_level:
+            self._lod_level = level
+            if self._point_budget is not None:
+                self._xarray_mesh = None
+                self.Modified()
+
+    @property
+    def lod_refined(self):
+        """return True when the mesh is at the finest level of detail"""
+        return self._point_budget is None or self._lod_level == self._lod_levels - 1
+
+    def refine(self):
+        """
+        Move to the next level of detail.
+
+        Returns:
+            bool: True if a finer level is now selected and the pipeline needs to be updated.
+        """
+        if self.lod_refined:
+            return False
+        self.lod_level += 1
+        return True
+
+    def lod_strides(self, lod_level=None):
+        """return the strides applied on top of the slices for each axis at a given level of detail"""
+        if self._point_budget is None or self._input is None:
+            return {}
+
+        if lod_level is None:
+            lod_level = self._lod_level
+
+        slices = self._slices or {}
+        sizes = {}
+        for name in (self._x, self._y, self._z):
+            if name is None:
+                continue
+            size = axis_size(slices.get(name), self._axis_size(name))
+            if size > 1:
+                sizes[name] = size
+
+        strides = compute_lod_strides(sizes, self._point_budget)
+        factor = 2 ** (self._lod_levels - 1 - lod_level)
+        # keep at least 2 values per axis at the coarsest levels
+        return {
+            name: min(stride * factor, max(1, sizes[name] - 1))
+            for name, stride in strides.items()
+        }
+
+    def lod_slices(self, lod_level=None):
+        """return the slices used for loading the data at a given level of detail"""
+        result = self.slices
+        for name, stride in self.lod_strides(lod_level).items():
+            if stride == 1:
+                continue
+            info = result.get(name)
+            if info is None:
+                info = [0, self._axis_size(name), 1]
+            start, stop, *step = info
+            step = step[0] if step and step[0] else 1
+            result[name] = [start, stop, step * stride]
+
+        return result
+
     # -------------------------------------------------------------------------
     # add-on logic
     # -------------------------------------------------------------------------
@@ -438,11 +1303,26 @@ order: {self._order}
 
         The layout of the dictionary provided should be as follow:
           - key: name of the field to be added
-          - value: formula to apply for the given field name. The syntax is captured in the document (https://docs.paraview.org/en/latest/UsersGuide/filteringData.html#calculator)
-
-        Then additional keys need to be provided to describe your formula dependencies:
-        `_use_scalars` and `_use_vectors` which should be a list of string matching the name of the fields you are using in your expression.
-
+          - value: formula to apply for the given field name (see pan3d.xarray.expressions)
+
+        Formulas use arithmetic operators (+ - * / ^), comparisons, and/or/not
+        (&& || !), the functions of pan3d.xarray.expressions.FUNCTIONS (sqrt,
+        atan2, mag, dot, cross...), the iHat/jHat/kHat unit vectors and the
+        coordsX/coordsY/coordsZ/coords point coordinates.
+
+        Formulas can use any variable of the input (loaded or not), which is
+        broadcast over the mesh points. Variables with an extra dimension of
+        2 or 3 components (without coordinate) are used as vectors. Formulas
+        are evaluated with vectorized operations on the selected data only
+        (lazily through dask). In-memory inputs are split along the slowest
+        axis of the mesh points so they are evaluated by the dask threads as
+        well. All the formulas are evaluated in a single pass sharing their
+        inputs and common subexpressions. Results are cached
+        per (formula, time, slices).
+
+        Keys starting with `_` are ignored (e.g. `_use_scalars` and
+        `_use_vectors` describing the dependencies of the formulas for older
+        versions).
 
         Please find below an example:
 
@@ -455,32 +1335,33 @@ order: {self._order}
         ```
         """
         if self._computed != v:
+            calculator = Calculator(
+                {name: formula for name, formula in (v or {}).items() if name[0] != "_"}
+            )
+            if self._input is not None:
+                unknown = [
+                    name
+                    for name in calculator.names
+                    if name not in self._input.variables and name not in COORDINATES
+                ]
+                if unknown:
+                    msg = f"Unknown variables in computed fields: {', '.join(unknown)}"
+                    raise ValueError(msg)
             self._computed = v or {}
-            self._pipeline = None
-            scalar_arrays = self._computed.get("_use_scalars", [])
-            vector_arrays = self._computed.get("_use_vectors", [])
-
-            for output_name, func in self._computed.items():
-                if output_name[0] == "_":
-                    continue
-                filter = vtkArrayCalculator(
-                    result_array_name=output_name,
-                    function=func,
-                )
-
-                # register array dependencies
-                for scalar_array in scalar_arrays:
-                    filter.AddScalarArrayName(scalar_array)
-                for vector_array in vector_arrays:
-                    filter.AddVectorArrayName(vector_array)
-
-                if self._pipeline is None:
-                    self._pipeline = filter
-                else:
-                    self._pipeline = self._pipeline >> filter
-
+            self._calculator = calculator
+            with self._derived_lock:
+                self._derived.clear()
             self.Modified()
 
+    @property
+    def computed_report(self):
+        """
+        return the timings (in seconds) of the last evaluation of the computed
+        fields as name => {"expression", "parse", "build", "compute"}
+        (see pan3d.xarray.expressions.Calculator)
+        """
+        return self._calculator.report
+
     def load(self, data_info):
         """
         create a new XArray input with the `data_origin` and `dataset_config` information.
@@ -513,6 +1394,8 @@ order: {self._order}
               "time": 5
             },
             "t_index": 5,    # (optional) selected time index
+            "point_budget": 1000000, # (optional) max number of points (LOD)
+            "mesh_type": "rectilinear", # (optional) or structured for curvilinear coords
             "arrays": [      # (optional) names of arrays to load onto VTK mesh.
               "analysed_sst" #            If missing no array will be loaded
             ]                #            onto the mesh.
@@ -533,6 +1416,7 @@ order: {self._order}
         self.order = self._data_origin.get("order", "C")
 
         dataset_config = data_info.get("dataset_config")
+        self.mesh_type = (dataset_config or {}).get("mesh_type", "rectilinear")
         if dataset_config is None:
             self.apply_coords()
             self.arrays = self.available_arrays
@@ -543,6 +1427,8 @@ order: {self._order}
             self.t = dataset_config.get("t")
             self.slices = dataset_config.get("slices")
             self.t_index = dataset_config.get("t_index", 0)
+            if "point_budget" in dataset_config:
+                self.point_budget = dataset_config["point_budget"]
             self.apply_coords()
             self.arrays = dataset_config.get("arrays", self.available_arrays)
 
@@ -554,18 +1440,499 @@ order: {self._order}
                 "No state available without data origin. Need to use the load method to set the data origin."
             )
 
+        dataset_config = {
+            k: getattr(self, k)
+            for k in ["x", "y", "z", "t", "slices", "t_index", "arrays"]
+        }
+        if self._point_budget is not None:
+            dataset_config["point_budget"] = self._point_budget
+        if self._mesh_type != "rectilinear":
+            dataset_config["mesh_type"] = self._mesh_type
+
         return {
             "data_origin": self._data_origin,
-            "dataset_config": {
-                k: getattr(self, k)
-                for k in ["x", "y", "z", "t", "slices", "t_index", "arrays"]
-            },
+            "dataset_config": dataset_config,
         }
 
     # -------------------------------------------------------------------------
     # Algorithm
     # -------------------------------------------------------------------------
 
+    def _mesh_key(self, t_index=None, lod_level=None):
+        """return a hashable description of the mesh for a given time index and level of detail"""
+        slices = self.lod_slices(lod_level)
+        if self._t is not None and t_index is not None:
+            slices[self._t] = t_index
+
+        return (
+            self._x,
+            self._y,
+            self._z,
+            self._t,
+            to_hashable(slices),
+            to_hashable(self._array_names),
+            self._order,
+            self._mesh_type,
+        )
+
+    def _build_mesh(self, key, progress=None):
+        """
+        generate a VTK mesh from its key description (see _mesh_key)
+
+        Coordinates and fields that did not change since the last generated
+        mesh are shared with it rather than extracted again. A mesh whose
+        generation started before the cache was cleared (e.g. new input) is
+        not kept as last mesh.
+        """
+        x, y, z, t, slices, array_names, order, mesh_type = key
+        slices = dict(slices)
+        generation = self._cache.generation
+        with self._last_mesh_lock:
+            last_generation, previous_key, previous_mesh = self._last_mesh or (
+                None,
+                None,
+                None,
+            )
+        if last_generation != generation:
+            previous_key, previous_mesh = None, None
+        changes = mesh_changes(previous_key, key)
+
+        # slices are provided per coordinate but applied on dimensions
+        slices = dim_slices(self.metadata, slices, x, y, z, t)
+        indexing = to_isel(slices, *slices) or {}
+
+        # grid
+        reuse = previous_mesh if not changes & {"coords", "slices"} else None
+        if mesh_type == "structured":
+            mesh, grid_dims = self._build_structured_grid(
+                (x, y, z), indexing, order, reuse
+            )
+        else:
+            mesh, grid_dims = self._build_rectilinear_grid(x, y, z, slices, reuse)
+
+        # fields
+        for i, field_name in enumerate(array_names):
+            if "fields" not in changes and previous_mesh.GetPointData().HasArray(
+                field_name
+            ):
+                mesh.GetPointData().AddArray(
+                    previous_mesh.GetPointData().GetArray(field_name)
+                )
+            else:
+                da = self._select_field(field_name, indexing, grid_dims)
+                self._add_point_data(mesh, field_name, da, order)
+            if progress is not None:
+                progress((i + 1) / len(array_names))
+
+        with self._last_mesh_lock:
+            if generation == self._cache.generation:
+                self._last_mesh = (generation, key, mesh)
+        return mesh
+
+    def _select_field(self, field_name, indexing, grid_dims=None):
+        """return the (lazy) selection of an input variable following the layout of the mesh points"""
+        da = self._input[field_name]
+        indexing = {k: v for k, v in (indexing or {}).items() if k in da.dims}
+        if indexing:
+            da = da.isel(indexing)
+        if grid_dims is not None:
+            # follow the layout of the points
+            da = da.transpose(*[d for d in grid_dims if d in da.dims], ...)
+        return da
+
+    def _field_selection(self, key):
+        """return the isel() indexing and the point dimensions (structured grid only) of a mesh key"""
+        x, y, z, t, slices, _, _, mesh_type = key
+        slices = dim_slices(self.metadata, dict(slices), x, y, z, t)
+        indexing = to_isel(slices, *slices) or {}
+        grid_dims = None
+        if mesh_type == "structured":
+            grid_dims = list(structured_coords(self._input, (x, y, z), indexing)[1])
+        return indexing, grid_dims
+
+    @staticmethod
+    def _derived_key(name, expression, key):
+        """return the cache key of a computed field for a mesh key"""
+        # the loaded arrays do not affect computed fields
+        return (name, expression.text, (*key[:5], *key[6:]))
+
+    def _pending_derived(self, key):
+        """return True if some computed fields of a mesh key are not evaluated yet"""
+        with self._derived_lock:
+            return any(
+                self._derived_key(name, expression, key) not in self._derived
+                for name, expression in self._calculator.expressions.items()
+            )
+
+    def _derived_arrays(self, key, mesh):
+        """
+        return the values of the computed fields for a mesh key, evaluating
+        (and caching) the ones that are not available yet in a single pass
+
+        This can be called from the prefetch thread: only the cache accesses
+        are locked so the evaluation does not block the pipeline.
+        """
+        order = key[6]
+        calculator = self._calculator
+        expressions = calculator.expressions
+        results = {}
+        missing = []
+        with self._derived_lock:
+            for name, expression in expressions.items():
+                derived_key = self._derived_key(name, expression, key)
+                if derived_key in self._derived:
+                    self._derived.move_to_end(derived_key)
+                    results[name] = self._derived[derived_key]
+                else:
+                    missing.append(name)
+
+        if missing:
+            names = {var for name in missing for var in expressions[name].names}
+            variables, shape = self._computed_variables(key, mesh, names)
+            evaluated = calculator.evaluate(variables, missing)
+            n_points = mesh.GetNumberOfPoints()
+            for name in missing:
+                values = to_values(evaluated[name], shape, order)
+                if values.shape[0] != n_points:
+                    msg = f"Computed field '{name}' has {values.shape[0]} values for {n_points} points"
+                    raise ValueError(msg)
+                results[name] = values
+            with self._derived_lock:
+                for name in missing:
+                    derived_key = self._derived_key(name, expressions[name], key)
+                    self._derived[derived_key] = results[name]
+                while len(self._derived) > DERIVED_CACHE_SIZE:
+                    self._derived.popitem(last=False)
+
+        return {name: results[name] for name in expressions}
+
+    def _point_layout(self, key, mesh, indexing, grid_dims, variables):
+        """
+        return the dimensions (name => size) of the mesh points, following
+        the order of the fields, and the point coordinates along them
+        """
+        x, y, z, _, _, _, order, mesh_type = key
+        if mesh_type == "structured":
+            # inverse of structured_dimensions
+            shape = [0, 0, 0]
+            mesh.GetDimensions(shape)
+            shape = shape[: len(grid_dims)]
+            layout = dict(zip(grid_dims, shape[::-1] if order == "C" else shape))
+            points = numpy_support.vtk_to_numpy(mesh.GetPoints().GetData())
+            coords = [
+                xr.DataArray(
+                    points[:, i].reshape(list(layout.values()), order=order),
+                    dims=list(layout),
+                )
+                for i in range(3)
+            ]
+            return layout, coords
+
+        dims = axis_dims(self.metadata, x, y, z)
+        mesh_coords = [
+            numpy_support.vtk_to_numpy(array)
+            for array in (
+                mesh.GetXCoordinates(),
+                mesh.GetYCoordinates(),
+                mesh.GetZCoordinates(),
+            )
+        ]
+        # (z, y, x) unless the fields use another order
+        layout = {}
+        for name, values in zip((z, y, x), mesh_coords[::-1]):
+            dim = dims.get(name)
+            if dim is not None and not isinstance(indexing.get(dim), int):
+                layout[dim] = values.size
+        for variable in variables:
+            if set(layout) <= set(variable.dims):
+                layout = {dim: layout[dim] for dim in variable.dims if dim in layout}
+                break
+
+        coords = []
+        for name, values in zip((x, y, z), mesh_coords):
+            dim = dims.get(name)
+            if dim in layout:
+                coords.append(xr.DataArray(values, dims=[dim]))
+            else:
+                coords.append(values[0] if values.size else 0.0)
+        return layout, coords
+
+    def _computed_variables(self, key, mesh, names):
+        """
+        return the (lazy) selection of the input variables used by computed
+        fields and the point coordinates, broadcast to the layout of the mesh
+        points, along that shape
+        """
+        indexing, grid_dims = self._field_selection(key)
+        selections = {
+            name: self._select_field(name, indexing, grid_dims)
+            for name in names
+            if name in self._input.variables
+        }
+        layout, coords = self._point_layout(
+            key,
+            mesh,
+            indexing,
+            grid_dims,
+            sorted(selections.values(), key=lambda v: -v.ndim),
+        )
+
+        variables = {}
+        for name, selection in selections.items():
+            extra = [dim for dim in selection.dims if dim not in layout]
+            components = [selection]
+            if (
+                len(extra) == 1
+                and extra[0] not in self._input.coords
+                and selection.sizes[extra[0]] in (2, 3)
+            ):
+                # vector variable
+                components = [
+                    selection.isel({extra[0]: i})
+                    for i in range(selection.sizes[extra[0]])
+                ]
+            elif extra:
+                msg = f"'{name}' does not match the dimensions of the mesh {tuple(layout)}"
+                raise ValueError(msg)
+
+            components = [self._broadcast(c, layout) for c in components]
+            variables[name] = (
+                Vector(*components) if len(components) > 1 else components[0]
+            )
+
+        if set(COORDINATES) & set(names):
+            coords = [
+                self._broadcast(c, layout) if isinstance(c, xr.DataArray) else c
+                for c in coords
+            ]
+            variables.update(zip(COORDINATES, coords))
+            variables["coords"] = Vector(*coords)
+        return variables, tuple(layout.values())
+
+    @staticmethod
+    def _broadcast(da, layout):
+        """return a (lazy) DataArray broadcast to the point layout"""
+        missing = {dim: size for dim, size in layout.items() if dim not in da.dims}
+        if missing:
+            da = da.expand_dims(missing)
+        da = da.transpose(*layout)
+        if da.chunks is not None:
+            return da
+
+        # split in-memory data along the slowest axis so the dask threads
+        # evaluate it in parallel
+        chunks = {}
+        if layout:
+            n_chunks = min(os.cpu_count() or 1, da.size // DERIVED_CHUNK_POINTS)
+            dim, size = next(iter(layout.items()))
+            chunks[dim] = -(-size // max(n_chunks, 1))
+        return da.chunk(chunks)
+
+    def _build_rectilinear_grid(self, x, y, z, slices, previous_mesh=None):
+        """return a vtkRectilinearGrid sharing the coordinates of previous_mesh when provided"""
+        mesh = vtkRectilinearGrid()
+        if previous_mesh is None:
+            mesh.x_coordinates = slice_array(x, self._input, slices.get(x))
+            mesh.y_coordinates = slice_array(y, self._input, slices.get(y))
+            mesh.z_coordinates = slice_array(z, self._input, slices.get(z))
+        else:
+            mesh.SetXCoordinates(previous_mesh.GetXCoordinates())
+            mesh.SetYCoordinates(previous_mesh.GetYCoordinates())
+            mesh.SetZCoordinates(previous_mesh.GetZCoordinates())
+        mesh.dimensions = [
+            mesh.GetXCoordinates().GetNumberOfTuples(),
+            mesh.GetYCoordinates().GetNumberOfTuples(),
+            mesh.GetZCoordinates().GetNumberOfTuples(),
+        ]
+        return mesh, None
+
+    def _build_structured_grid(self, coords, indexing, order, previous_mesh=None):
+        """
+        return a vtkStructuredGrid and the dimensions of its points in (z, y, x)
+        order. The points of previous_mesh are shared when provided.
+        """
+        arrays, sizes = structured_coords(self._input, coords, indexing)
+        mesh = vtkStructuredGrid()
+        if previous_mesh is None:
+            vtk_points = vtkPoints()
+            vtk_points.SetData(
+                numpy_support.numpy_to_vtk(structured_points(arrays, sizes, order))
+            )
+            mesh.SetPoints(vtk_points)
+        else:
+            mesh.SetPoints(previous_mesh.GetPoints())
+        mesh.SetDimensions(structured_dimensions(list(sizes.values()), order))
+        return mesh, list(sizes)
+
+    def _add_point_data(self, mesh, field_name, da, order):
+        """
+        Attach a DataArray to the mesh point data. Contiguous numpy memory is
+        shared with VTK while anything else is materialized once into a pooled
+        VTK array.
+        """
+        if vtk_array_type(da.dtype) is None:
+            # no VTK counterpart, let VTK decide what to do with it
+            mesh.point_data[field_name] = da.to_numpy().ravel(order=order)
+            self._buffers.record(field_name, da.nbytes)
+            return
+
+        values = None
+        if da.chunks is None:
+            values = da.to_numpy()
+            if is_contiguous(values, order) and values.dtype.isnative:
+                mesh.point_data[field_name] = values.ravel(order=order)
+                self._buffers.record(field_name)
+                return
+
+        target = self._buffers.add_array(
+            mesh.GetPointData(), field_name, da.size, da.dtype
+        ).reshape(da.shape, order=order)
+        if values is None:
+            # dask writes each chunk straight into the VTK memory
+            da.data.store(target, lock=False)
+        else:
+            np.copyto(target, values)
+        self._buffers.record(field_name, target.nbytes)
+
+    def _get_mesh(self, key):
+        """return the mesh for the given key using the cache when possible"""
+        mesh = self._cache.get(key)
+        if mesh is not None:
+            return mesh
+
+        # Being loaded in the background
+        task = self._prefetch_tasks.pop(key, None)
+        if task is not None and not task.cancelled():
+            mesh = task.result()
+        else:
+            mesh = self._build_mesh(key)
+
+        self._cache.put(key, mesh)
+        return mesh
+
+    def _prefetch_task(self, key, generation, progress=None):
+        mesh = self._build_mesh(key, progress)
+        self._cache.put(key, mesh, generation)
+        return mesh
+
+    def _submit_prefetch(self, key, progress=None):
+        if key in self._cache or key in self._prefetch_tasks:
+            return
+
+        self._prefetch_tasks[key] = self._get_prefetch_executor().submit(
+            self._prefetch_task, key, self._cache.generation, progress
+        )
+
+    def _get_prefetch_executor(self):
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="pan3d_prefetch"
+            )
+        return self._prefetch_executor
+
+    def _derived_task(self, key, mesh_task):
+        mesh = mesh_task.result()
+        self._derived_arrays(key, mesh)
+        return mesh
+
+    def _update_lod_level(self):
+        """
+        Start from the coarsest level of detail when the selection changes
+        unless a finer one is already available
+        """
+        if self._point_budget is None:
+            return
+
+        base_key = (id(self._input), self._mesh_key(lod_level=self._lod_levels - 1))
+        if base_key == self._lod_base_key:
+            return
+
+        self._lod_base_key = base_key
+        level = next(
+            (
+                level
+                for level in reversed(range(self._lod_levels))
+                if self._mesh_key(lod_level=level) in self._cache
+            ),
+            0,
+        )
+        if level != self._lod_level:
+            self._lod_level = level
+            self._xarray_mesh = None
+
+    def fetch(self, progress=None):
+        """
+        Load the data of the current selection and evaluate its computed fields
+        in a background thread without executing the VTK pipeline. Once the
+        returned future is done, updating the pipeline is served from memory.
+
+        Any queued (not yet started) background loading is cancelled so the
+        latest request is processed next.
+
+        Parameters:
+            progress (callable): Optional function called from the loading thread with the fraction (0-1) of loaded arrays.
+
+        Returns:
+            concurrent.futures.Future: resolve to the generated mesh
+        """
+        self._update_lod_level()
+        key = self._mesh_key()
+
+        # drop stale requests that did not start yet
+        for task_key, task in list(self._prefetch_tasks.items()):
+            if task_key != key and task.cancel():
+                self._prefetch_tasks.pop(task_key)
+
+        mesh = self._cache.peek(key)
+        if mesh is not None:
+            future = Future()
+            future.set_result(mesh)
+        else:
+            self._submit_prefetch(key, progress)
+            future = self._prefetch_tasks[key]
+
+        if self._pending_derived(key):
+            future = self._get_prefetch_executor().submit(
+                self._derived_task, key, future
+            )
+        return future
+
+    def _schedule_prefetch(self):
+        """load the next level of detail and the time steps around t_index in the background"""
+        capacity = self._cache.capacity
+        if capacity <= 1:
+            return
+
+        # forget finished tasks
+        self._prefetch_tasks = {
+            k: f for k, f in self._prefetch_tasks.items() if not f.done()
+        }
+
+        # next level of detail
+        if not self.lod_refined:
+            self._submit_prefetch(self._mesh_key(lod_level=self._lod_level + 1))
+
+        if self._prefetch <= 0 or self._t is None:
+            return
+
+        # don't prefetch more than what the cache can hold
+        n_steps = min(self._prefetch, (capacity - 1) // 2)
+        t_size = self.t_size
+        for offset in range(1, n_steps + 1):
+            for t_index in (self._t_index + offset, self._t_index - offset):
+                if t_index < 0 or t_index >= t_size:
+                    continue
+                self._submit_prefetch(self._mesh_key(t_index))
+
+    def RequestDataObject(self, request, inInfo, outInfo):
+        """create the output dataset matching the selected mesh type"""
+        mesh_class = MESH_TYPES[self._mesh_type]
+        info = outInfo.GetInformationObject(0)
+        output = info.Get(vtkDataObject.DATA_OBJECT())
+        if output is None or output.GetClassName() != mesh_class.__name__:
+            info.Set(vtkDataObject.DATA_OBJECT(), mesh_class())
+        return 1
+
     def RequestData(self, request, inInfo, outInfo):
         """implementation of the vtk algorithm for generating the VTK mesh"""
         # Use open data_array handle to fetch data at
@@ -573,39 +1940,21 @@ order: {self._order}
         try:
             pdo = self.GetOutputData(outInfo, 0)
 
+            self._update_lod_level()
+
             # Generate mesh
             if self._xarray_mesh is None:
-                # grid
-                mesh = vtkRectilinearGrid()
-                mesh.x_coordinates = slice_array(
-                    self._x, self._input, self.slices.get(self._x)
-                )
-                mesh.y_coordinates = slice_array(
-                    self._y, self._input, self.slices.get(self._y)
-                )
-                mesh.z_coordinates = slice_array(
-                    self._z, self._input, self.slices.get(self._z)
-                )
-                mesh.dimensions = [
-                    mesh.x_coordinates.size,
-                    mesh.y_coordinates.size,
-                    mesh.z_coordinates.size,
-                ]
-                # fields
-                indexing = to_isel(self.slices, self.x, self.y, self.z, self.t)
-                for field_name in self._array_names:
-                    da = self._input[field_name]
-                    if indexing is not None:
-                        da = da.isel(indexing)
-                    mesh.point_data[field_name] = da.to_numpy().ravel(order=self._order)
-
-                self._xarray_mesh = mesh
-
-            # Compute derived quantity
-            if self._pipeline is not None:
-                pdo.ShallowCopy(self._pipeline(self._xarray_mesh))
-            else:
-                pdo.ShallowCopy(self._xarray_mesh)
+                self._xarray_mesh = self._get_mesh(self._mesh_key())
+                self._schedule_prefetch()
+
+            self._buffers.release(self._xarray_mesh)
+            pdo.ShallowCopy(self._xarray_mesh)
+
+            # Attach derived quantities (the cached mesh is left untouched)
+            if self._calculator.expressions:
+                derived = self._derived_arrays(self._mesh_key(), self._xarray_mesh)
+                for name, values in derived.items():
+                    pdo.point_data[name] = values
 
         except Exception as e:
             traceback.print_exc()
@@ -2,6 +2,8 @@ import warnings
 from typing import Optional
 
 import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkPoints
 from vtkmodules.vtkCommonDataModel import vtkRectilinearGrid, vtkStructuredGrid
 
 from pan3d.xarray.errors import DataCopyWarning
@@ -13,17 +15,12 @@ def imagedata_to_rectilinear(image_data):
     origin = image_data.origin
     spacing = image_data.spacing
     extent = image_data.extent
-    coords = []
-    for axis in range(3):
-        coords.append(
-            np.array(
-                [
-                    origin[axis] + (spacing[axis] * i)
-                    for i in range(extent[axis * 2], extent[axis * 2 + 1] + 1)
-                ],
-                dtype=np.double,
-            )
-        )
+    coords = [
+        origin[axis]
+        + spacing[axis]
+        * np.arange(extent[axis * 2], extent[axis * 2 + 1] + 1, dtype=np.double)
+        for axis in range(3)
+    ]
 
     output.x_coordinates, output.y_coordinates, output.z_coordinates = coords
     output.point_data.ShallowCopy(image_data.point_data)
@@ -199,7 +196,9 @@ def structured(
 
     dataset = vtkStructuredGrid()
     dataset.SetDimensions(shape)
-    dataset.points = points
+    vtk_points = vtkPoints()
+    vtk_points.SetData(numpy_support.numpy_to_vtk(points))
+    dataset.SetPoints(vtk_points)
     dataset.point_data[accessor._xarray.name or "data"] = accessor.data.ravel(
         order=order
     )
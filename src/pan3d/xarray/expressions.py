@@ -0,0 +1,414 @@
+"""
+Derived fields expressed with a calculator syntax close to the one of
+vtkArrayCalculator (arithmetic, comparisons, and/or/not, the functions of
+FUNCTIONS, iHat/jHat/kHat vectors and the coordsX/coordsY/coordsZ/coords
+point coordinates) and evaluated with vectorized operations over xarray
+variables.
+
+Operations are applied on the (lazy) DataArrays so dask only reads and
+computes the selected chunks. Several expressions are evaluated together by a
+Calculator, sharing their common subexpressions and their inputs.
+"""
+
+import ast
+import re
+import time
+from collections import Counter
+from typing import Optional
+
+import dask
+import numpy as np
+from dask.callbacks import Callback
+
+
+def to_python(text: str):
+    """translate the calculator operators (^, &&, ||, !) into python ones"""
+    text = text.replace("^", "**").replace("&&", " and ").replace("||", " or ")
+    return re.sub(r"!(?!=)", " not ", text).strip()
+
+
+class Vector:
+    """3 components vector whose components are arrays or scalars (0 for an unused component)"""
+
+    def __init__(self, x=0, y=0, z=0):
+        self.components = (x, y, z)
+
+    @staticmethod
+    def _scale(component, value):
+        return 0 if isinstance(component, int) and component == 0 else component * value
+
+    def __add__(self, other):
+        if not isinstance(other, Vector):
+            return NotImplemented
+        return Vector(*[a + b for a, b in zip(self.components, other.components)])
+
+    def __sub__(self, other):
+        if not isinstance(other, Vector):
+            return NotImplemented
+        return Vector(*[a - b for a, b in zip(self.components, other.components)])
+
+    def __mul__(self, other):
+        if isinstance(other, Vector):
+            return NotImplemented
+        return Vector(*[self._scale(c, other) for c in self.components])
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Vector):
+            return NotImplemented
+        return Vector(*[self._scale(c, 1 / other) for c in self.components])
+
+    def __neg__(self):
+        return self * -1
+
+    def __pos__(self):
+        return self
+
+
+def dot(a, b):
+    return sum(x * y for x, y in zip(a.components, b.components))
+
+
+def cross(a, b):
+    (ax, ay, az), (bx, by, bz) = a.components, b.components
+    return Vector(ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx)
+
+
+def mag(a):
+    return np.sqrt(dot(a, a))
+
+
+def norm(a):
+    return a / mag(a)
+
+
+FUNCTIONS = {
+    "abs": np.abs,
+    "acos": np.arccos,
+    "asin": np.arcsin,
+    "atan": np.arctan,
+    "atan2": np.arctan2,
+    "ceil": np.ceil,
+    "cos": np.cos,
+    "cosh": np.cosh,
+    "cross": cross,
+    "dot": dot,
+    "exp": np.exp,
+    "floor": np.floor,
+    "ln": np.log,
+    "log": np.log,
+    "log10": np.log10,
+    "mag": mag,
+    "max": np.maximum,
+    "min": np.minimum,
+    "norm": norm,
+    "pow": np.power,
+    "sign": np.sign,
+    "sin": np.sin,
+    "sinh": np.sinh,
+    "sqrt": np.sqrt,
+    "tan": np.tan,
+    "tanh": np.tanh,
+}
+
+CONSTANTS = {
+    "iHat": Vector(1, 0, 0),
+    "jHat": Vector(0, 1, 0),
+    "kHat": Vector(0, 0, 1),
+    "PI": np.pi,
+    "E": np.e,
+}
+
+# point coordinates provided along the variables (coords is a vector)
+COORDINATES = ("coordsX", "coordsY", "coordsZ", "coords")
+
+OPERATORS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b,
+    ast.Pow: lambda a, b: a**b,
+    ast.USub: lambda a: -a,
+    ast.UAdd: lambda a: +a,
+    ast.Not: np.logical_not,
+    ast.And: np.logical_and,
+    ast.Or: np.logical_or,
+    ast.Eq: lambda a, b: a == b,
+    ast.NotEq: lambda a, b: a != b,
+    ast.Lt: lambda a, b: a < b,
+    ast.LtE: lambda a, b: a <= b,
+    ast.Gt: lambda a, b: a > b,
+    ast.GtE: lambda a, b: a >= b,
+}
+
+# operators between two vectors and between a vector and a scalar (or array)
+VECTOR_OPERATORS = (ast.Add, ast.Sub)
+SCALING_OPERATORS = (ast.Mult, ast.Div)
+
+
+class Expression:
+    """
+    Parsed calculator expression (e.g. "u*u + v*v" or "(u * iHat) + (v * jHat)")
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        try:
+            self._tree = ast.parse(to_python(text), mode="eval").body
+        except SyntaxError as e:
+            msg = f"Invalid expression '{text}': {e.msg}"
+            raise ValueError(msg) from e
+
+        self.names = []
+        self.subexpressions = []
+        self._validate(self._tree)
+
+    def _validate(self, node):
+        if isinstance(
+            node, (ast.BinOp, ast.UnaryOp, ast.Call, ast.Compare, ast.BoolOp)
+        ):
+            self.subexpressions.append(ast.dump(node))
+
+        if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+            self._validate(node.left)
+            self._validate(node.right)
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+            self._validate(node.operand)
+        elif isinstance(node, ast.BoolOp):
+            for value in node.values:
+                self._validate(value)
+        elif isinstance(node, ast.Compare) and all(
+            type(op) in OPERATORS for op in node.ops
+        ):
+            for operand in (node.left, *node.comparators):
+                self._validate(operand)
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                msg = f"Unknown function in '{self.text}': {ast.unparse(node.func)}"
+                raise ValueError(msg)
+            for arg in node.args:
+                self._validate(arg)
+        elif isinstance(node, ast.Name):
+            if node.id not in CONSTANTS and node.id not in self.names:
+                self.names.append(node.id)
+        elif not (
+            isinstance(node, ast.Constant) and isinstance(node.value, (int, float))
+        ):
+            msg = f"Unsupported syntax in '{self.text}': {ast.unparse(node)}"
+            raise ValueError(msg)
+
+    def evaluate(self, variables: dict, memo: Optional[dict] = None):
+        """
+        evaluate the expression with the provided variables (name => array)
+
+        Parameters:
+            variables (dict): name => array (or scalar) of the variables.
+            memo (dict): results of the subexpressions already evaluated with the same variables, updated with the ones of this expression.
+
+        Returns:
+            an array (or scalar) for scalar expressions, a Vector otherwise
+        """
+        missing = [name for name in self.names if name not in variables]
+        if missing:
+            msg = f"Unknown variables in '{self.text}': {', '.join(missing)}"
+            raise ValueError(msg)
+        return self._evaluate(self._tree, variables, {} if memo is None else memo)
+
+    def _binary(self, node, left, right):
+        op = type(node.op)
+        if isinstance(left, Vector) or isinstance(right, Vector):
+            # arrays would otherwise treat vectors as objects
+            if op is ast.Mult and isinstance(right, Vector):
+                left, right = right, left
+            if op in VECTOR_OPERATORS:
+                valid = isinstance(left, Vector) and isinstance(right, Vector)
+            else:
+                valid = op in SCALING_OPERATORS and not isinstance(right, Vector)
+            if not valid:
+                msg = f"Invalid vector operation in '{self.text}': {ast.unparse(node)}"
+                raise ValueError(msg)
+        return OPERATORS[op](left, right)
+
+    def _scalar(self, node, value):
+        if not isinstance(value, Vector):
+            return value
+        msg = f"Invalid vector operation in '{self.text}': {ast.unparse(node)}"
+        raise ValueError(msg)
+
+    def _compare(self, node, variables, memo):
+        operands = [
+            self._scalar(node, self._evaluate(operand, variables, memo))
+            for operand in (node.left, *node.comparators)
+        ]
+        result = True
+        for op, left, right in zip(node.ops, operands[:-1], operands[1:]):
+            result = np.logical_and(result, OPERATORS[type(op)](left, right))
+        return result
+
+    def _evaluate(self, node, variables, memo):
+        if isinstance(node, ast.Name):
+            if node.id in variables:
+                return variables[node.id]
+            return CONSTANTS[node.id]
+        if isinstance(node, ast.Constant):
+            return node.value
+
+        key = ast.dump(node)
+        if key in memo:
+            return memo[key]
+
+        if isinstance(node, ast.BinOp):
+            result = self._binary(
+                node,
+                self._evaluate(node.left, variables, memo),
+                self._evaluate(node.right, variables, memo),
+            )
+        elif isinstance(node, ast.UnaryOp):
+            operand = self._evaluate(node.operand, variables, memo)
+            if isinstance(node.op, ast.Not):
+                operand = self._scalar(node, operand)
+            result = OPERATORS[type(node.op)](operand)
+        elif isinstance(node, ast.Compare):
+            result = self._compare(node, variables, memo)
+        elif isinstance(node, ast.BoolOp):
+            values = [
+                self._scalar(node, self._evaluate(value, variables, memo))
+                for value in node.values
+            ]
+            result = values[0]
+            for value in values[1:]:
+                result = OPERATORS[type(node.op)](result, value)
+        else:
+            result = FUNCTIONS[node.func.id](
+                *[self._evaluate(arg, variables, memo) for arg in node.args]
+            )
+
+        memo[key] = result
+        return result
+
+
+class TaskTimer(Callback):
+    """dask callback recording the duration of each task"""
+
+    def __init__(self):
+        super().__init__()
+        self.durations = {}
+        self._starts = {}
+
+    def _pretask(self, key, dsk, state):
+        self._starts[key] = time.perf_counter()
+
+    def _posttask(self, key, result, dsk, state, id):
+        start = self._starts.pop(key, None)
+        if start is not None:
+            self.durations[key] = time.perf_counter() - start
+
+
+def components(result):
+    return result.components if isinstance(result, Vector) else (result,)
+
+
+class Calculator:
+    """
+    Evaluate several expressions (name => formula) in a single pass.
+
+    The formulas are parsed once and their common subexpressions are only
+    evaluated once. Lazy (dask) results of all the outputs are computed
+    together so the inputs they share are read once and their chunks are
+    processed in parallel by the dask threads.
+    """
+
+    def __init__(self, formulas: dict):
+        self.expressions = {}
+        self.report = {}
+        self.elapsed = 0.0
+        for name, formula in formulas.items():
+            start = time.perf_counter()
+            self.expressions[name] = Expression(formula)
+            self.report[name] = {
+                "expression": formula,
+                "parse": time.perf_counter() - start,
+                "build": 0.0,
+                "compute": 0.0,
+            }
+
+        counts = Counter(
+            key
+            for expression in self.expressions.values()
+            for key in expression.subexpressions
+        )
+        self.common = [key for key, count in counts.items() if count > 1]
+
+    @property
+    def names(self):
+        """return the variables used by the expressions"""
+        names = []
+        for expression in self.expressions.values():
+            names.extend(name for name in expression.names if name not in names)
+        return names
+
+    def evaluate(self, variables: dict, names=None):
+        """
+        evaluate the expressions with the provided variables (name => array)
+
+        Parameters:
+            variables (dict): name => array (or scalar) of the variables.
+            names (list[str]): Name of the expressions to evaluate. (default: all)
+
+        Returns:
+            dict: name => computed result (see Expression.evaluate)
+
+        The timings of the evaluation are captured in report (name =>
+        {"expression", "parse", "build", "compute"} in seconds) where compute
+        is the time of the dask tasks an output depends on (shared tasks are
+        counted for each output) and elapsed is the time of the whole pass.
+        """
+        names = list(self.expressions) if names is None else list(names)
+        start = time.perf_counter()
+        memo = {}
+        results = {}
+        for name in names:
+            build_start = time.perf_counter()
+            results[name] = self.expressions[name].evaluate(variables, memo)
+            self.report[name]["build"] = time.perf_counter() - build_start
+
+        lazy = {
+            id(c): c
+            for result in results.values()
+            for c in components(result)
+            if dask.is_dask_collection(c)
+        }
+        timer = TaskTimer()
+        with timer:
+            computed = dict(zip(lazy, dask.compute(*lazy.values())))
+
+        for name, result in results.items():
+            keys = set()
+            for c in components(result):
+                if id(c) in lazy:
+                    keys.update(c.__dask_graph__().keys())
+            self.report[name]["compute"] = sum(
+                timer.durations.get(key, 0.0) for key in keys
+            )
+            values = [computed.get(id(c), c) for c in components(result)]
+            results[name] = Vector(*values) if isinstance(result, Vector) else values[0]
+
+        self.elapsed = time.perf_counter() - start
+        return results
+
+
+def to_values(result, shape, order="C"):
+    """
+    convert the result of an expression into a numpy array of point values,
+    (n,) for scalars or (n, 3) for vectors (as double like the VTK calculator),
+    following the given grid shape.
+    """
+
+    def flatten(component):
+        values = np.broadcast_to(np.asarray(component, dtype=np.float64), shape)
+        return values.ravel(order=order)
+
+    if isinstance(result, Vector):
+        return np.stack([flatten(c) for c in result.components], axis=1)
+    return np.ascontiguousarray(flatten(result))
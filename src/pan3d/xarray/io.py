@@ -1,18 +1,27 @@
-import warnings
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
 import xarray as xr
+from vtkmodules.util import numpy_support
 from vtkmodules.vtkCommonDataModel import vtkDataObject
+from vtkmodules.vtkCommonExecutionModel import vtkStreamingDemandDrivenPipeline
 from vtkmodules.vtkIOLegacy import vtkDataSetReader
 from vtkmodules.vtkIOXML import (
     vtkXMLImageDataReader,
     vtkXMLRectilinearGridReader,
     vtkXMLStructuredGridReader,
 )
-from xarray.backends import BackendEntrypoint
+from xarray.backends import BackendArray, BackendEntrypoint
+from xarray.core import indexing
 
-from pan3d.xarray.errors import DataCopyWarning
+try:
+    from xarray.indexes import RangeIndex
+except ImportError:
+    RangeIndex = None
 
 READERS = {
     ".vti": vtkXMLImageDataReader,
@@ -21,6 +30,27 @@ READERS = {
     ".vtk": vtkDataSetReader,
 }
 
+# Readers able to load a sub-extent of a file
+LAZY_READERS = {
+    ".vti": vtkXMLImageDataReader,
+    ".vtr": vtkXMLRectilinearGridReader,
+}
+
+# ParaView collection of files (i.e. time series)
+COLLECTION_SUFFIX = ".pvd"
+
+_executor = None
+
+
+def read_executor():
+    """return the thread pool used to read the files of a time series"""
+    global _executor  # noqa: PLW0603
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="pan3d_io"
+        )
+    return _executor
+
 
 def read(file_path):
     reader = READERS[Path(file_path).suffix](file_name=file_path)
@@ -29,11 +59,11 @@ def read(file_path):
 
 
 def rectilinear_grid_to_dataset(mesh):
-    dims = list(mesh.dimensions)
-    dims = dims[-1:] + dims[:-1]
+    # VTK point data is ordered with x varying the fastest
+    dims = list(mesh.dimensions)[::-1]
     return xr.Dataset(
         {
-            name: (["z", "x", "y"], mesh.point_data[name].ravel().reshape(dims))
+            name: (["z", "y", "x"], mesh.point_data[name].ravel().reshape(dims))
             for name in mesh.point_data.keys()
         },
         coords={
@@ -44,55 +74,93 @@ def rectilinear_grid_to_dataset(mesh):
     )
 
 
-def image_data_to_dataset(mesh):
+def uniform_coordinates(name, origin, spacing, extent, range_index=False):
+    """
+    Create the coordinates of a uniformly spaced axis from its VTK origin,
+    spacing and (min, max) extent. The origin and spacing are kept as
+    attributes of the coordinate.
+
+    With range_index=True (requires xarray>=2025.6) the values are computed on
+    demand from a RangeIndex instead of being stored. Note that label based
+    selection on such index requires method="nearest".
+    """
+    size = extent[1] - extent[0] + 1
+    start = origin + spacing * extent[0]
+    attrs = {"origin": origin, "spacing": spacing}
+    if range_index:
+        if RangeIndex is None:
+            msg = "range_index=True requires xarray>=2025.6"
+            raise ImportError(msg)
+
+        coords = xr.Coordinates.from_xindex(
+            RangeIndex.linspace(
+                start, start + spacing * (size - 1), size, dim=name, coord_name=name
+            )
+        )
+        coords[name].attrs.update(attrs)
+        return coords
+
+    values = start + spacing * np.arange(size, dtype=np.double)
+    return xr.Coordinates({name: ([name], values, attrs)})
+
+
+def image_data_to_dataset(mesh, range_index=False):
     origin = mesh.origin
     spacing = mesh.spacing
     extent = mesh.extent
 
-    def gen_coords(i):
-        return np.array(
-            [
-                origin[i] + (spacing[i] * v)
-                for v in range(extent[i * 2], extent[i * 2 + 1] + 1)
-            ],
-            dtype=np.double,
-        )
-
-    dims = list(mesh.dimensions)
-    return xr.Dataset(
+    dims = list(mesh.dimensions)[::-1]
+    ds = xr.Dataset(
         {
-            name: (["z", "x", "y"], mesh.point_data[name].ravel().reshape(dims))
+            name: (["z", "y", "x"], mesh.point_data[name].ravel().reshape(dims))
             for name in mesh.point_data.keys()
         },
-        coords={
-            "x": (["x"], gen_coords(0)),
-            "y": (["y"], gen_coords(1)),
-            "z": (["z"], gen_coords(2)),
-        },
     )
+    for i, name in enumerate("xyz"):
+        ds = ds.assign_coords(
+            uniform_coordinates(
+                name, origin[i], spacing[i], extent[i * 2 : i * 2 + 2], range_index
+            )
+        )
+
+    return ds
+
+
+def structured_view(array, dims):
+    """
+    return a (x, y, z[, component]) view of a point array of a structured
+    dataset, x varying the fastest in memory (i.e. Fortran order)
+    """
+    values = numpy_support.vtk_to_numpy(array)
+    if values.ndim == 1:
+        return values.reshape(dims, order="F")
+
+    # components are contiguous in memory
+    return np.moveaxis(values.T.reshape((values.shape[1], *dims), order="F"), 0, -1)
 
 
 def structured_grid_to_dataset(mesh):
-    warnings.warn(
-        DataCopyWarning(
-            "StructuredGrid dataset engine duplicates data - VTK data not shared with xarray."
-        ),
-        stacklevel=2,
-    )
+    """
+    Wrap a vtkStructuredGrid into an xarray Dataset without copying memory.
+    Fields and coordinates are views onto the VTK point data and points
+    buffers, which they keep alive.
+    """
     dims = [0, 0, 0]
     mesh.GetDimensions(dims)
+    points = structured_view(mesh.GetPoints().GetData(), dims)
+
+    data_vars = {}
+    for name in mesh.point_data.keys():
+        values = structured_view(mesh.GetPointData().GetArray(name), dims)
+        data_vars[name] = (
+            ["xi", "yi", "zi", f"{name}_component"][: values.ndim],
+            values,
+        )
+
     return xr.Dataset(
-        {
-            name: (
-                ["xi", "yi", "zi"],
-                mesh.point_data[name].ravel().reshape(dims),
-            )
-            for name in mesh.point_data.keys()
-        },
+        data_vars,
         coords={
-            "x": (["xi", "yi", "zi"], mesh.x_coordinates),
-            "y": (["xi", "yi", "zi"], mesh.y_coordinates),
-            "z": (["xi", "yi", "zi"], mesh.z_coordinates),
+            name: (["xi", "yi", "zi"], points[..., i]) for i, name in enumerate("xyz")
         },
     )
 
@@ -104,8 +172,11 @@ DATASET_TO_XARRAY = {
 }
 
 
-def dataset_to_xarray(dataset):
+def dataset_to_xarray(dataset, **kwargs):
     if isinstance(dataset, vtkDataObject):
+        if dataset.IsA("vtkImageData"):
+            return image_data_to_dataset(dataset, **kwargs)
+
         for ds_type, fn in DATASET_TO_XARRAY.items():
             if dataset.IsA(ds_type):
                 return fn(dataset)
@@ -114,22 +185,353 @@ def dataset_to_xarray(dataset):
     raise TypeError(msg)
 
 
+def read_extent(file_path, extent=None, array_names=()):
+    """
+    Read only some point data arrays of a VTK XML image data or rectilinear
+    grid file over a given (x_min, x_max, y_min, y_max, z_min, z_max) extent.
+    The whole extent is read when none is provided.
+    """
+    reader = LAZY_READERS[Path(file_path).suffix](file_name=str(file_path))
+    reader.UpdateInformation()
+    reader.GetCellDataArraySelection().DisableAllArrays()
+    selection = reader.GetPointDataArraySelection()
+    selection.DisableAllArrays()
+    for name in array_names:
+        selection.EnableArray(name)
+
+    if extent is None:
+        reader.Update()
+    else:
+        reader.UpdateExtent(extent)
+    return reader.GetOutputDataObject(0)
+
+
+class VTKBackendArray(BackendArray):
+    """
+    Point data array of a VTK XML image data or rectilinear grid file.
+    Only the extent covering the requested selection is read from the file
+    so each dask chunk loads its own subvolume.
+    """
+
+    def __init__(self, file_path, array_name, extent, dtype, n_components=1):
+        self.file_path = file_path
+        self.array_name = array_name
+        self.extent = extent
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(extent[i + 1] - extent[i] + 1 for i in (4, 2, 0))
+        if n_components > 1:
+            self.shape += (n_components,)
+
+    def __getitem__(self, key):
+        return indexing.explicit_indexing_adapter(
+            key,
+            self.shape,
+            indexing.IndexingSupport.BASIC,
+            self._raw_indexing_method,
+        )
+
+    def _raw_indexing_method(self, key):
+        # z, y, x bounds of the selection and key relative to them
+        bounds = []
+        local_key = []
+        for k, size in zip(key[:3], self.shape):
+            if isinstance(k, slice):
+                selected = range(*k.indices(size))
+                if len(selected) == 0:
+                    return np.broadcast_to(np.empty((), self.dtype), self.shape)[key]
+                lo = min(selected)
+                bounds.append((lo, max(selected)))
+                local = range(selected.start - lo, selected.stop - lo, selected.step)
+                local_key.append(
+                    slice(
+                        local.start, local.stop if local.stop >= 0 else None, local.step
+                    )
+                )
+            else:
+                index = range(size)[k]
+                bounds.append((index, index))
+                local_key.append(0)
+
+        (z_min, z_max), (y_min, y_max), (x_min, x_max) = bounds
+        x_0, _, y_0, _, z_0, _ = self.extent
+        output = read_extent(
+            self.file_path,
+            (
+                x_0 + x_min,
+                x_0 + x_max,
+                y_0 + y_min,
+                y_0 + y_max,
+                z_0 + z_min,
+                z_0 + z_max,
+            ),
+            [self.array_name],
+        )
+        values = numpy_support.vtk_to_numpy(
+            output.GetPointData().GetArray(self.array_name)
+        ).reshape(
+            (z_max - z_min + 1, y_max - y_min + 1, x_max - x_min + 1, *self.shape[3:])
+        )
+        return values[(*local_key, *key[3:])]
+
+
+def open_lazy_dataset(file_path, drop_variables=None, range_index=False):
+    """
+    Open a VTK XML image data or rectilinear grid file without loading its
+    point data. The arrays are read on access, one extent at a time.
+    """
+    drop_variables = set(drop_variables or [])
+    reader = LAZY_READERS[Path(file_path).suffix](file_name=str(file_path))
+    reader.UpdateInformation()
+    info = reader.GetOutputInformation(0)
+    extent = info.Get(vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT())
+    selection = reader.GetPointDataArraySelection()
+    array_names = [
+        selection.GetArrayName(i)
+        for i in range(selection.GetNumberOfArrays())
+        if selection.GetArrayName(i) not in drop_variables
+    ]
+
+    # type and number of components from a single point
+    probe = read_extent(
+        file_path,
+        (extent[0], extent[0], extent[2], extent[2], extent[4], extent[4]),
+        array_names,
+    ).GetPointData()
+
+    data_vars = {}
+    for name in array_names:
+        array = probe.GetArray(name)
+        backend_array = VTKBackendArray(
+            file_path,
+            name,
+            extent,
+            numpy_support.get_numpy_array_type(array.GetDataType()),
+            array.GetNumberOfComponents(),
+        )
+        dims = ["z", "y", "x"]
+        if array.GetNumberOfComponents() > 1:
+            dims.append(f"{name}_component")
+        data_vars[name] = xr.Variable(dims, indexing.LazilyIndexedArray(backend_array))
+
+    ds = xr.Dataset(data_vars)
+    if reader.IsA("vtkXMLImageDataReader"):
+        origin = info.Get(vtkDataObject.ORIGIN())
+        spacing = info.Get(vtkDataObject.SPACING())
+        for i, name in enumerate("xyz"):
+            ds = ds.assign_coords(
+                uniform_coordinates(
+                    name, origin[i], spacing[i], extent[i * 2 : i * 2 + 2], range_index
+                )
+            )
+    else:
+        # coordinates only, without any field
+        grid = read_extent(file_path)
+        ds = ds.assign_coords(
+            x=numpy_support.vtk_to_numpy(grid.GetXCoordinates()),
+            y=numpy_support.vtk_to_numpy(grid.GetYCoordinates()),
+            z=numpy_support.vtk_to_numpy(grid.GetZCoordinates()),
+        )
+
+    return ds
+
+
+def read_collection(file_path):
+    """
+    return the (time values, file paths) of a ParaView .pvd collection,
+    sorted by time
+    """
+    file_path = Path(file_path)
+    steps = {}
+    for dataset in ET.parse(file_path).getroot().iter("DataSet"):
+        time = float(dataset.get("timestep", len(steps)))
+        if time in steps:
+            msg = (
+                f"{file_path} has multiple parts for time {time} which is not supported"
+            )
+            raise ValueError(msg)
+        steps[time] = str(file_path.parent / dataset.get("file"))
+
+    times = sorted(steps)
+    return np.array(times), [steps[t] for t in times]
+
+
+def natural_key(file_path):
+    return [int(v) if v.isdigit() else v for v in re.split(r"(\d+)", file_path)]
+
+
+def glob_files(pattern):
+    """return the (time indices, file paths) matching a glob pattern"""
+    pattern = Path(pattern).expanduser()
+    root = Path(pattern.anchor) if pattern.is_absolute() else Path()
+    file_paths = sorted(
+        (str(p) for p in root.glob(str(pattern)[len(pattern.anchor) :])),
+        key=natural_key,
+    )
+    if not file_paths:
+        msg = f"No file matching {pattern}"
+        raise FileNotFoundError(msg)
+    return np.arange(len(file_paths)), file_paths
+
+
+def read_header(file_path):
+    """return the whole extent and point array names of a file without reading its data"""
+    if Path(file_path).suffix not in LAZY_READERS:
+        return None
+
+    reader = LAZY_READERS[Path(file_path).suffix](file_name=str(file_path))
+    reader.UpdateInformation()
+    selection = reader.GetPointDataArraySelection()
+    return (
+        tuple(
+            reader.GetOutputInformation(0).Get(
+                vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT()
+            )
+        ),
+        sorted(selection.GetArrayName(i) for i in range(selection.GetNumberOfArrays())),
+    )
+
+
+class VTKTimeSeriesBackendArray(BackendArray):
+    """
+    Point data array over a series of VTK files, one file per time step.
+    The files covered by a selection are read in parallel on a thread pool,
+    each of them only over the requested extent when the format allows it.
+    """
+
+    def __init__(self, file_paths, array_name, shape, dtype, extent=None):
+        self.file_paths = file_paths
+        self.array_name = array_name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.extent = extent
+
+    def __getitem__(self, key):
+        return indexing.explicit_indexing_adapter(
+            key,
+            self.shape,
+            indexing.IndexingSupport.BASIC,
+            self._raw_indexing_method,
+        )
+
+    def _read_file(self, file_path, key):
+        if self.extent is not None:
+            return VTKBackendArray(
+                file_path,
+                self.array_name,
+                self.extent,
+                self.dtype,
+                self.shape[4] if len(self.shape) > 4 else 1,
+            )._raw_indexing_method(key)
+
+        return dataset_to_xarray(read(file_path))[self.array_name].values[key]
+
+    def _raw_indexing_method(self, key):
+        time_key, spatial_key = key[0], key[1:]
+        if not isinstance(time_key, slice):
+            return self._read_file(self.file_paths[time_key], spatial_key)
+
+        file_paths = self.file_paths[time_key]
+        if not file_paths:
+            return np.broadcast_to(np.empty((), self.dtype), self.shape)[key]
+
+        return np.stack(
+            list(
+                read_executor().map(
+                    lambda file_path: self._read_file(file_path, spatial_key),
+                    file_paths,
+                )
+            )
+        )
+
+
+def open_time_series(times, file_paths, drop_variables=None, range_index=False):
+    """
+    Open a series of VTK files as a single dataset with a time dimension.
+    The headers of all the files are indexed up front to make sure they
+    share the same structure while their data is only read on access.
+    """
+    headers = list(read_executor().map(read_header, file_paths))
+    for file_path, header in zip(file_paths[1:], headers[1:]):
+        if header != headers[0]:
+            msg = f"{file_path} does not have the same extent/arrays as {file_paths[0]}"
+            raise ValueError(msg)
+
+    # structure (coordinates, dims, types) from the first file
+    first = file_paths[0]
+    extent = None
+    if headers[0] is not None:
+        extent = headers[0][0]
+        template = open_lazy_dataset(first, drop_variables, range_index)
+    else:
+        template = dataset_to_xarray(read(first)).drop_vars(
+            drop_variables or [], errors="ignore"
+        )
+
+    data_vars = {}
+    for name, variable in template.data_vars.items():
+        backend_array = VTKTimeSeriesBackendArray(
+            file_paths,
+            name,
+            (len(file_paths), *variable.shape),
+            variable.dtype,
+            extent,
+        )
+        data_vars[name] = xr.Variable(
+            ("time", *variable.dims), indexing.LazilyIndexedArray(backend_array)
+        )
+
+    ds = xr.Dataset(data_vars, coords=template.coords)
+    return ds.assign_coords(time=times)
+
+
+def is_glob(filename_or_obj):
+    return isinstance(filename_or_obj, str) and any(c in filename_or_obj for c in "*?[")
+
+
 class VTKBackendEntrypoint(BackendEntrypoint):
     def open_dataset(
         self,
         filename_or_obj,
         *,
         drop_variables=None,
+        range_index=False,
+        lazy=True,
     ):
-        return dataset_to_xarray(read(filename_or_obj))
+        if Path(filename_or_obj).suffix == COLLECTION_SUFFIX:
+            return open_time_series(
+                *read_collection(filename_or_obj),
+                drop_variables=drop_variables,
+                range_index=range_index,
+            )
+
+        if is_glob(filename_or_obj):
+            return open_time_series(
+                *glob_files(filename_or_obj),
+                drop_variables=drop_variables,
+                range_index=range_index,
+            )
+
+        if lazy and Path(filename_or_obj).suffix in LAZY_READERS:
+            return open_lazy_dataset(
+                filename_or_obj,
+                drop_variables=drop_variables,
+                range_index=range_index,
+            )
+
+        return dataset_to_xarray(
+            read(filename_or_obj), range_index=range_index
+        ).drop_vars(drop_variables or [], errors="ignore")
 
     open_dataset_parameters = [
         "filename_or_obj",
         "attrs",
+        "range_index",
+        "lazy",
     ]
 
     def guess_can_open(self, filename_or_obj):
         try:
-            return Path(filename_or_obj).suffix in READERS
+            suffix = Path(filename_or_obj).suffix
+            return suffix in READERS or suffix == COLLECTION_SUFFIX
         except TypeError:
             return False
@@ -0,0 +1,149 @@
+"""
+Estimate the cost of reading a selection of a variable given the chunking
+of its data on disk (or in the object store).
+
+Compressed chunks are always read and decoded whole, so a strided selection
+may read much more data than it uses. The plan compares the candidate read
+strategies and reports the expected bytes read against the bytes used:
+
+- subsample: read the (on-disk) chunks containing the selection then subsample.
+- gather: read only the selected values, possible when the data is not
+  chunked (e.g. NetCDF3 or contiguous NetCDF4 variables).
+- rechunk: read with dask chunks aligned on the on-disk chunks, when the
+  current dask chunks split on-disk chunks that are then read several times.
+"""
+
+import math
+
+import numpy as np
+import xarray as xr
+
+STRATEGIES = ("subsample", "gather", "rechunk")
+
+
+def storage_chunks(array: xr.DataArray):
+    """return the shape of the on-disk chunks of a variable or None if not chunked"""
+    encoding = array.encoding
+    chunks = encoding.get("chunks") or encoding.get("chunksizes")
+    if chunks and len(chunks) == array.ndim:
+        return tuple(int(c) for c in chunks)
+
+    preferred = encoding.get("preferred_chunks")
+    if preferred:
+        return tuple(
+            int(preferred.get(dim, size)) for dim, size in zip(array.dims, array.shape)
+        )
+    return None
+
+
+def selected_indices(size, info):
+    """return the indices selected along a dimension by an isel() value"""
+    if info is None:
+        return np.arange(size)
+    if isinstance(info, slice):
+        return np.arange(size)[info]
+    return np.atleast_1d(np.arange(size)[info])
+
+
+def touched_blocks(indices, block_size, size):
+    """return (number of values, number of blocks) of the blocks containing the indices"""
+    blocks = np.unique(indices // block_size)
+    return int(np.minimum(block_size, size - blocks * block_size).sum()), blocks.size
+
+
+def split_read(indices, dask_chunks, block_size, size):
+    """
+    return the number of values read along a dimension when every dask chunk
+    reads the on-disk blocks it needs on its own (blocks split by dask chunks
+    are read several times)
+    """
+    total = 0
+    boundaries = np.cumsum((0, *dask_chunks))
+    for start, stop in zip(boundaries[:-1], boundaries[1:]):
+        inside = indices[(indices >= start) & (indices < stop)]
+        if inside.size:
+            total += touched_blocks(inside, block_size, size)[0]
+    return total
+
+
+def plan_selection(array: xr.DataArray, indexing=None):
+    """
+    Plan the read of a selection of a variable.
+
+    Parameters:
+        array (xr.DataArray): Variable to read (lazy).
+        indexing (dict): isel() selection, dimensions missing from the variable are ignored.
+
+    Returns:
+        dict: {"strategy", "bytes_read", "bytes_used", "amplification", "chunks_read", "chunks_total", "estimates": {strategy: bytes_read}}
+    """
+    indexing = indexing or {}
+    itemsize = array.dtype.itemsize
+    indices = [
+        selected_indices(size, indexing.get(dim))
+        for dim, size in zip(array.dims, array.shape)
+    ]
+    bytes_used = math.prod(i.size for i in indices) * itemsize
+
+    disk_chunks = storage_chunks(array)
+    estimates = {}
+    if disk_chunks is None:
+        # the backend reads the bounding box of the selection or its values
+        estimates["subsample"] = itemsize * math.prod(
+            int(i.max() - i.min() + 1) if i.size else 0 for i in indices
+        )
+        chunks_read = chunks_total = 1
+    else:
+        touched = [
+            touched_blocks(i, chunk, size)
+            for i, chunk, size in zip(indices, disk_chunks, array.shape)
+        ]
+        estimates["subsample"] = itemsize * math.prod(t[0] for t in touched)
+        chunks_read = math.prod(t[1] for t in touched)
+        chunks_total = math.prod(
+            math.ceil(size / chunk) for size, chunk in zip(array.shape, disk_chunks)
+        )
+
+        # dask chunks that are not aligned with the on-disk chunks
+        if array.chunks is not None:
+            as_opened = itemsize * math.prod(
+                split_read(i, dask_chunks, chunk, size)
+                for i, dask_chunks, chunk, size in zip(
+                    indices, array.chunks, disk_chunks, array.shape
+                )
+            )
+            if as_opened > estimates["subsample"]:
+                estimates["rechunk"] = estimates["subsample"]
+                estimates["subsample"] = as_opened
+
+    if disk_chunks is None:
+        estimates["gather"] = bytes_used
+
+    # the first strategy wins ties as it is the one dask uses as is
+    strategy = min(STRATEGIES, key=lambda s: estimates.get(s, math.inf))
+    bytes_read = estimates[strategy]
+    return {
+        "strategy": strategy,
+        "bytes_read": int(bytes_read),
+        "bytes_used": int(bytes_used),
+        "amplification": bytes_read / bytes_used if bytes_used else 1.0,
+        "chunks_read": int(chunks_read),
+        "chunks_total": int(chunks_total),
+        "estimates": {k: int(v) for k, v in estimates.items()},
+    }
+
+
+def to_human_size(nbytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(nbytes) < 1024:
+            return f"{nbytes:.0f} {unit}" if unit == "B" else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} TB"
+
+
+def plan_summary(plan):
+    """return a short description of a read plan for the UI"""
+    summary = f"Read {to_human_size(plan['bytes_read'])} for {to_human_size(plan['bytes_used'])}"
+    if plan["amplification"] > 1.05:
+        summary += f" (x{plan['amplification']:.1f}, {plan['strategy']})"
+    return summary
@@ -0,0 +1,468 @@
+import math
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import dask
+import numpy as np
+import xarray as xr
+
+# percentiles evaluated on each chunk before being merged
+PERCENTILE_GRID = np.linspace(0, 100, 101)
+
+# default number of bins of the histograms
+HISTOGRAM_BINS = 256
+
+# number of partial results reported while a histogram is computed
+HISTOGRAM_STEPS = 10
+
+
+def percentile_grid(percentiles):
+    """return the percentiles to evaluate on each chunk so the requested ones are exact for a single chunk"""
+    return np.union1d(PERCENTILE_GRID, percentiles)
+
+
+def chunk_range(values, skipna=True):
+    """return the (min, max) of a chunk, NaN when it has no (valid) value"""
+    values = np.asarray(values)
+    if values.size == 0:
+        return np.nan, np.nan
+    if not skipna:
+        return float(values.min()), float(values.max())
+    with warnings.catch_warnings():
+        # chunk full of NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return float(np.nanmin(values)), float(np.nanmax(values))
+
+
+def chunk_summary(values, grid, skipna=True):
+    """
+    return (min, max, count, percentiles over grid) of a chunk where count
+    is the number of values the percentiles were computed from.
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    if skipna:
+        values = values[~np.isnan(values)]
+    if values.size == 0:
+        return np.nan, np.nan, 0, np.full(grid.size, np.nan)
+
+    return values.min(), values.max(), values.size, np.percentile(values, grid)
+
+
+def merge_percentiles(percentiles, grid, summaries):
+    """
+    Approximate the percentiles of a whole array from the summaries of its
+    chunks. The cumulative distribution of each chunk is interpolated from
+    its percentiles and their count weighted average is inverted.
+    """
+    counts = np.array([s[2] for s in summaries], dtype=np.float64)
+    if counts.sum() == 0:
+        return [np.nan] * len(percentiles)
+
+    values = np.stack([s[3] for s in summaries])
+    weights = counts / counts.sum()
+    fractions = grid / 100
+    rows = np.arange(values.shape[0])
+
+    def cdf(value):
+        above = (values <= value).sum(axis=1)
+        lower = np.clip(above - 1, 0, grid.size - 1)
+        upper = np.clip(above, 0, grid.size - 1)
+        low, high = values[rows, lower], values[rows, upper]
+        span = np.where(high > low, high - low, 1)
+        ratio = np.clip((value - low) / span, 0, 1)
+        chunk_cdf = fractions[lower] + (fractions[upper] - fractions[lower]) * ratio
+        return weights @ np.where(above == 0, 0, chunk_cdf)
+
+    # the cumulative distribution is linear between consecutive candidates
+    candidates = np.unique(values)
+    result = []
+    for fraction in np.asarray(percentiles) / 100:
+        low, high = 0, candidates.size - 1
+        while high - low > 1:
+            middle = (low + high) // 2
+            if cdf(candidates[middle]) < fraction:
+                low = middle
+            else:
+                high = middle
+        cdf_low, cdf_high = cdf(candidates[low]), cdf(candidates[high])
+        if fraction <= cdf_low or cdf_high <= cdf_low:
+            result.append(candidates[low if fraction <= cdf_low else high])
+        else:
+            ratio = (fraction - cdf_low) / (cdf_high - cdf_low)
+            result.append(
+                candidates[low] + ratio * (candidates[high] - candidates[low])
+            )
+
+    return result
+
+
+def histogram_edges(vmin, vmax, bins):
+    """return the bin edges of a histogram over [vmin, vmax] (None if the range is not finite)"""
+    if not (np.isfinite(vmin) and np.isfinite(vmax)):
+        return None
+    if vmax <= vmin:
+        vmin, vmax = vmin - 0.5, vmax + 0.5
+    return np.linspace(vmin, vmax, bins + 1)
+
+
+def chunk_histogram(values, edges):
+    """return the number of (finite) values of a chunk within each bin"""
+    values = np.asarray(values, dtype=np.float64).ravel()
+    return np.histogram(values[np.isfinite(values)], bins=edges)[0]
+
+
+def histogram_percentiles(counts, edges, percentiles):
+    """
+    return the percentiles (0-100) of a histogram assuming the values are
+    uniformly distributed within each bin.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum()
+    if total == 0:
+        return [np.nan] * len(percentiles)
+
+    cdf = np.concatenate([[0], np.cumsum(counts)]) / total
+    return np.interp(np.asarray(percentiles) / 100, cdf, edges).tolist()
+
+
+def to_isel(slices):
+    """convert slices ({dim: index or [start, stop, step]}) into isel() arguments"""
+    return {
+        name: info if isinstance(info, int) else slice(*info)
+        for name, info in (slices or {}).items()
+        if info is not None
+    }
+
+
+def global_slices(slices, time=None):
+    """return a copy of slices without the selection along time (if provided)"""
+    slices = dict(slices or {})
+    if time is not None:
+        slices.pop(time, None)
+    return slices
+
+
+def to_key(slices):
+    return tuple(
+        sorted(
+            (name, info if isinstance(info, int) else tuple(info))
+            for name, info in (slices or {}).items()
+            if info is not None
+        )
+    )
+
+
+class RangeStatistics:
+    """
+    Thread safe service computing min/max/percentiles of dataset variables.
+
+    Reductions go through dask so chunked (and remote) data is processed out
+    of core, chunk by chunk, in a single pass. Results are cached per
+    (variable, slices) so revisiting a selection is free.
+    """
+
+    def __init__(
+        self,
+        dataset: Optional[xr.Dataset] = None,
+        percentiles=(1, 99),
+        skipna: bool = True,
+        max_size: int = 64,
+    ):
+        """
+        Create a statistics service
+
+        Parameters:
+            dataset (xr.Dataset): Dataset holding the variables.
+            percentiles (list[float]): Percentiles (0-100) computed along min/max. (default: (1, 99))
+            skipna (bool): Ignore NaN values in the reductions. (default: True)
+            max_size (int): Number of results kept in the cache. (default: 64)
+        """
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._dataset = dataset
+        self.percentiles = tuple(percentiles)
+        self.skipna = skipna
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._executor = None
+        self._histogram_request = 0
+        self._histogram_task = None
+
+    @property
+    def dataset(self):
+        """return the dataset the statistics are computed on"""
+        return self._dataset
+
+    @dataset.setter
+    def dataset(self, dataset: xr.Dataset):
+        """update the dataset and drop the cached statistics"""
+        self._dataset = dataset
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            # histograms being computed are outdated
+            self._histogram_request += 1
+            self._histogram_task = None
+
+    def close(self):
+        """cancel the histogram being computed and stop the background thread"""
+        self.clear()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def info(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+        }
+
+    def compute(self, name: str, slices: Optional[dict] = None, time=None):
+        """
+        Compute the statistics of a variable.
+
+        Parameters:
+            name (str): Name of the variable.
+            slices (dict): Selection as dimension name => index or [start, stop, step].
+            time (str): Name of the time dimension to compute the statistics over all time steps (global mode). Its selection in slices is then ignored.
+
+        Returns:
+            dict: {"min": float, "max": float, "count": int, "percentiles": {percentile: float}}
+        """
+        slices = global_slices(slices, time)
+        key = (name, to_key(slices), self.percentiles, self.skipna)
+        result = self._get(key)
+        if result is None:
+            result = self._compute(name, slices)
+            self._put(key, result)
+
+        return dict(result)
+
+    def range(self, name: str, slices: Optional[dict] = None, time=None):
+        """
+        return the (min, max) of a variable (see compute for the parameters)
+
+        Only min/max reductions are applied to the chunks, the percentiles are
+        not computed.
+        """
+        slices = global_slices(slices, time)
+        key = ("range", name, to_key(slices), self.skipna)
+        result = self._get(key)
+        if result is None:
+            result = self._range(name, slices)
+            self._put(key, result)
+
+        return result
+
+    def histogram(
+        self,
+        name: str,
+        slices: Optional[dict] = None,
+        time=None,
+        bins: int = HISTOGRAM_BINS,
+        callback=None,
+    ):
+        """
+        Compute the histogram of a variable over its (min, max) range.
+
+        The chunks are processed by batches, in random order, so the partial
+        results reported to callback are representative of the whole array.
+
+        Parameters:
+            name (str): Name of the variable.
+            slices (dict): Selection as dimension name => index or [start, stop, step].
+            time (str): Name of the time dimension to compute the histogram over all time steps (see compute).
+            bins (int): Number of bins. (default: 256)
+            callback (callable): Function called with the partial (and final) results.
+
+        Returns:
+            dict: {"counts": np.ndarray, "edges": np.ndarray, "count": int, "progress": float, "percentiles": {percentile: float}}
+        """
+        return self._histogram(name, slices, time, bins, callback)
+
+    def submit_histogram(
+        self,
+        name: str,
+        slices: Optional[dict] = None,
+        time=None,
+        bins: int = HISTOGRAM_BINS,
+        callback=None,
+    ):
+        """
+        Compute a histogram (see histogram) in a background thread.
+
+        Only the latest request is processed: a histogram being computed stops
+        as soon as a different one is submitted (or the dataset changes) and
+        its future then returns None. Submitting the histogram being computed
+        again returns its future. The callback is called from the background
+        thread.
+
+        Returns:
+            concurrent.futures.Future
+        """
+        key = (name, to_key(global_slices(slices, time)), bins)
+        with self._lock:
+            if self._histogram_task is not None:
+                task_key, task = self._histogram_task
+                if task_key == key and not task.done():
+                    return task
+
+            self._histogram_request += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="pan3d_statistics"
+                )
+            task = self._executor.submit(
+                self._histogram,
+                name,
+                slices,
+                time,
+                bins,
+                callback,
+                self._histogram_request,
+            )
+            self._histogram_task = (key, task)
+
+        return task
+
+    def _get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return result
+
+    def _put(self, key, result):
+        with self._lock:
+            if self.max_size > 0:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+    def _select(self, name, slices):
+        array = self._dataset[name]
+        isel = {k: v for k, v in to_isel(slices).items() if k in array.dims}
+        if isel:
+            array = array.isel(isel)
+        return array.data
+
+    def _histogram(self, name, slices, time, bins, callback, request=None):
+        def cancelled():
+            return request is not None and request != self._histogram_request
+
+        slices = global_slices(slices, time)
+        key = ("histogram", name, to_key(slices), bins)
+        result = self._get(key)
+        if result is not None:
+            if callback is not None:
+                callback(dict(result))
+            return dict(result)
+
+        # the range is usually cached already as it drives the color mapping
+        edges = histogram_edges(*self.range(name, slices), bins)
+        counts = np.zeros(bins, dtype=np.int64)
+        data = self._select(name, slices)
+        if edges is None:
+            blocks = []
+        elif isinstance(data, dask.array.Array):
+            blocks = data.to_delayed().ravel()
+            blocks = blocks[np.random.default_rng(0).permutation(blocks.size)]
+        else:
+            blocks = [data]
+
+        def partial(progress):
+            return {
+                "counts": counts.copy(),
+                "edges": edges,
+                "count": int(counts.sum()),
+                "progress": progress,
+                "percentiles": dict(
+                    zip(
+                        self.percentiles,
+                        histogram_percentiles(counts, edges, self.percentiles),
+                    )
+                ),
+            }
+
+        batch_size = max(1, math.ceil(len(blocks) / HISTOGRAM_STEPS))
+        for start in range(0, len(blocks), batch_size):
+            if cancelled():
+                return None
+
+            batch = blocks[start : start + batch_size]
+            if isinstance(data, dask.array.Array):
+                batch = dask.compute(
+                    *[dask.delayed(chunk_histogram)(block, edges) for block in batch]
+                )
+            else:
+                batch = [chunk_histogram(block, edges) for block in batch]
+            counts += np.sum(batch, axis=0)
+
+            done = min(start + batch_size, len(blocks))
+            if callback is not None and done < len(blocks):
+                callback(partial(done / len(blocks)))
+
+        if cancelled():
+            return None
+
+        result = partial(1.0)
+        self._put(key, result)
+        if callback is not None:
+            callback(dict(result))
+        return dict(result)
+
+    def _range(self, name, slices):
+        data = self._select(name, slices)
+        if isinstance(data, dask.array.Array):
+            ranges = dask.compute(
+                *[
+                    dask.delayed(chunk_range)(block, self.skipna)
+                    for block in data.to_delayed().ravel()
+                ]
+            )
+        else:
+            ranges = [chunk_range(data, self.skipna)]
+
+        mins, maxs = np.array(ranges, dtype=np.float64).reshape(-1, 2).T
+        if self.skipna:
+            mins, maxs = mins[~np.isnan(mins)], maxs[~np.isnan(maxs)]
+        if mins.size == 0:
+            return np.nan, np.nan
+        return float(mins.min()), float(maxs.max())
+
+    def _compute(self, name, slices):
+        grid = percentile_grid(self.percentiles)
+        data = self._select(name, slices)
+        if isinstance(data, dask.array.Array):
+            # one task per chunk, each chunk is only read once
+            summaries = dask.compute(
+                *[
+                    dask.delayed(chunk_summary)(block, grid, self.skipna)
+                    for block in data.to_delayed().ravel()
+                ]
+            )
+        else:
+            summaries = [chunk_summary(data, grid, self.skipna)]
+
+        valid = [s for s in summaries if s[2]]
+        percentiles = merge_percentiles(self.percentiles, grid, valid)
+        return {
+            "min": float(min(s[0] for s in valid)) if valid else np.nan,
+            "max": float(max(s[1] for s in valid)) if valid else np.nan,
+            "count": int(sum(s[2] for s in valid)),
+            "percentiles": dict(zip(self.percentiles, map(float, percentiles))),
+        }
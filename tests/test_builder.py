@@ -1,7 +1,13 @@
 import json
 from pathlib import Path
 
+import numpy as np
+import pytest
+import xarray as xr
+from vtkmodules.util import numpy_support
+
 from pan3d.xarray.algorithm import vtkXArrayRectilinearSource
+from pan3d.xarray.statistics import chunk_summary
 
 ROOT_PATH = Path(__file__).parent.parent.resolve()
 
@@ -10,6 +16,17 @@ def read_config(path):
     return json.loads((ROOT_PATH / path).read_text())
 
 
+def synthetic_dataset(nt=6, ny=20, nx=30):
+    return xr.Dataset(
+        {"temp": (("time", "y", "x"), np.random.default_rng(0).random((nt, ny, nx)))},
+        coords={
+            "time": np.arange(nt).astype("datetime64[D]"),
+            "y": np.linspace(-90, 90, ny),
+            "x": np.linspace(-180, 180, nx),
+        },
+    )
+
+
 def test_import_config():
     conf = read_config("examples/example_config_noaa.json")
     builder = vtkXArrayRectilinearSource()
@@ -51,3 +68,537 @@ def test_setters():
     assert builder.z == "level"
     assert builder.t == "month"
     assert builder.t_index == 1
+
+
+def test_mesh_cache():
+    xr_ds = synthetic_dataset()
+    builder = vtkXArrayRectilinearSource(input=xr_ds, cache_size=8, prefetch=2)
+    assert builder.t == "time"
+
+    builder()
+    for task in list(builder._prefetch_tasks.values()):
+        task.result()
+    assert builder.cache_info["misses"] == 1
+    assert builder.cache_info["size"] == 3
+
+    # prefetched time step served from memory
+    builder.t_index = 2
+    ds = builder()
+    assert builder.cache_info["hits"] == 1
+    assert np.array_equal(ds.point_data["temp"], xr_ds["temp"][2].values.ravel())
+
+    # new input invalidate the cache
+    builder.input = xr_ds
+    assert builder.cache_info["size"] == 0
+
+    # bounded by memory, the current mesh is always kept
+    builder = vtkXArrayRectilinearSource(
+        input=xr_ds, cache_size=8, prefetch=2, cache_memory=1
+    )
+    for t_index in range(3):
+        builder.t_index = t_index
+        builder()
+        assert builder.cache_info["size"] == 1
+        assert builder._prefetch_tasks == {}
+    assert builder.cache_info["memory"] > builder.cache_memory
+
+
+def test_level_of_detail():
+    xr_ds = synthetic_dataset(nt=2, ny=200, nx=400)
+    builder = vtkXArrayRectilinearSource(input=xr_ds, point_budget=5000, lod_levels=2)
+
+    # coarse mesh first
+    ds = builder()
+    assert builder.lod_level == 0
+    assert ds.GetNumberOfPoints() <= 5000 / 4
+
+    # refine up to the point budget
+    assert builder.refine()
+    ds = builder()
+    assert builder.lod_refined
+    assert not builder.refine()
+    assert 5000 / 4 < ds.GetNumberOfPoints() <= 5000
+    strides = builder.lod_strides()
+    assert np.array_equal(
+        ds.point_data["temp"],
+        xr_ds["temp"][0, :: strides["y"], :: strides["x"]].values.ravel(),
+    )
+
+    # disable LOD
+    builder.point_budget = None
+    assert builder().GetNumberOfPoints() == 200 * 400
+
+
+def test_zero_copy_transfer():
+    xr_ds = synthetic_dataset()
+    builder = vtkXArrayRectilinearSource(input=xr_ds, cache_size=0)
+
+    # contiguous time slice is shared with VTK
+    ds = builder()
+    assert np.shares_memory(ds.point_data["temp"], xr_ds["temp"].values)
+    assert builder.transfer_info["temp"] == {
+        "zero_copy": 1,
+        "copies": 0,
+        "bytes_copied": 0,
+    }
+
+    # strided slice is copied once
+    builder.slices = {"x": [0, 30, 2]}
+    ds = builder()
+    assert np.array_equal(
+        ds.point_data["temp"], xr_ds["temp"][0, :, ::2].values.ravel()
+    )
+    assert builder.transfer_info["temp"]["copies"] == 1
+    assert builder.transfer_info["temp"]["bytes_copied"] == 20 * 15 * 8
+
+    # dask chunks are written directly in VTK memory, reused by the meshes
+    # that were never handed out
+    builder.input = xr_ds.chunk({"time": 1, "y": 7})
+    buffers = set()
+    for t_index in range(4):
+        builder.t_index = t_index
+        mesh = builder._get_mesh(builder._mesh_key())
+        assert np.array_equal(
+            mesh.point_data["temp"], xr_ds["temp"][t_index, :, ::2].values.ravel()
+        )
+        buffers.add(np.asarray(mesh.point_data["temp"]).ctypes.data)
+        del mesh
+    assert len(buffers) == 2
+
+
+def test_returned_arrays_unchanged():
+    xr_ds = synthetic_dataset().chunk({"time": 1, "y": 7})
+    builder = vtkXArrayRectilinearSource(input=xr_ds, cache_size=1)
+    builder.slices = {"x": [0, 30, 2]}
+
+    held = builder().point_data["temp"]
+    expected = np.array(held)
+    for t_index in range(1, 5):
+        builder.t_index = t_index
+        assert np.array_equal(
+            builder().point_data["temp"],
+            xr_ds["temp"][t_index, :, ::2].values.ravel(),
+        )
+    assert np.array_equal(held, expected)
+
+
+def test_incremental_update():
+    xr_ds = synthetic_dataset()
+    xr_ds["salt"] = xr_ds["temp"] * 2
+    builder = vtkXArrayRectilinearSource(input=xr_ds, arrays=["temp"])
+    mesh = builder._get_mesh(builder._mesh_key())
+
+    # time change only reload the fields
+    builder.t_index = 1
+    next_mesh = builder._get_mesh(builder._mesh_key())
+    assert next_mesh.GetXCoordinates() is mesh.GetXCoordinates()
+    assert np.array_equal(next_mesh.point_data["temp"], xr_ds["temp"][1].values.ravel())
+
+    # new array keep the already loaded ones
+    builder.arrays = ["temp", "salt"]
+    mesh, next_mesh = next_mesh, builder._get_mesh(builder._mesh_key())
+    assert next_mesh.GetYCoordinates() is mesh.GetYCoordinates()
+    assert next_mesh.GetPointData().GetArray("temp") is mesh.GetPointData().GetArray(
+        "temp"
+    )
+    assert np.array_equal(next_mesh.point_data["salt"], xr_ds["salt"][1].values.ravel())
+
+    # slicing a coordinate regenerate it
+    builder.slices = {"x": [0, 10, 1]}
+    mesh, next_mesh = next_mesh, builder._get_mesh(builder._mesh_key())
+    assert next_mesh.GetXCoordinates() is not mesh.GetXCoordinates()
+    assert next_mesh.dimensions == (10, 20, 1)
+
+
+def test_incremental_update_new_input():
+    xr_ds = synthetic_dataset()
+    builder = vtkXArrayRectilinearSource(input=xr_ds, arrays=["temp"])
+    key = builder._mesh_key()
+    generation = builder._cache.generation
+    mesh = builder._build_mesh(key)
+
+    # a background load finishing after the cache was cleared
+    builder._build_mesh(key, progress=lambda _: builder.clear_cache())
+    assert builder._last_mesh is None
+
+    other = xr_ds.copy(deep=True)
+    other["temp"] = other["temp"] * 2
+    builder.input = other
+    builder.arrays = ["temp"]
+
+    # meshes of an outdated generation are not reused
+    builder._last_mesh = (generation, key, mesh)
+    assert np.array_equal(builder().point_data["temp"], other["temp"][0].values.ravel())
+    builder.close()
+
+
+def test_structured_mesh():
+    nt, nz, ny, nx = 3, 4, 5, 6
+    eta, xi = np.meshgrid(np.arange(ny), np.arange(nx), indexing="ij")
+    lon = -70 + 0.1 * xi + 0.02 * eta
+    lat = 40 + 0.1 * eta + 0.01 * xi
+    values = np.random.default_rng(0).random((nt, nz, ny, nx))
+    xr_ds = xr.Dataset(
+        {"temp": (("time", "s", "eta", "xi"), values)},
+        coords={
+            "time": np.arange(nt).astype("datetime64[D]"),
+            "s": np.linspace(-1, 0, nz),
+            "lon": (("eta", "xi"), lon, {"units": "degrees_east"}),
+            "lat": (("eta", "xi"), lat, {"units": "degrees_north"}),
+        },
+    )
+    builder = vtkXArrayRectilinearSource(input=xr_ds, mesh_type="structured")
+    assert (builder.x, builder.y, builder.z, builder.t) == ("lon", "lat", "s", "time")
+    assert builder.slice_extents == {"lon": [0, 5], "lat": [0, 4], "s": [0, 3]}
+
+    mesh = builder()
+    assert mesh.IsA("vtkStructuredGrid")
+    dims = [0, 0, 0]
+    mesh.GetDimensions(dims)
+    assert dims == [nx, ny, nz]
+    points = numpy_support.vtk_to_numpy(mesh.GetPoints().GetData()).reshape(
+        nz, ny, nx, 3
+    )
+    assert np.allclose(points[1, ..., 0], lon)
+    assert np.allclose(points[2, ..., 1], lat)
+    assert np.allclose(points[:, 3, 2, 2], xr_ds["s"].values)
+    assert np.array_equal(mesh.point_data["temp"], values[0].ravel())
+
+    # points are shared across time steps
+    builder.t_index = 1
+    next_mesh = builder()
+    assert next_mesh.GetPoints().GetData() is mesh.GetPoints().GetData()
+    assert np.array_equal(next_mesh.point_data["temp"], values[1].ravel())
+
+    # slices and strides follow the coordinate dimensions
+    builder.slices = {"lon": [1, 6, 2], "s": 0}
+    mesh = builder()
+    mesh.GetDimensions(dims)
+    assert dims == [3, ny, 1]
+    points = numpy_support.vtk_to_numpy(mesh.GetPoints().GetData()).reshape(ny, 3, 3)
+    assert np.allclose(points[..., 0], lon[:, 1:6:2])
+    assert np.array_equal(mesh.point_data["temp"], values[1, 0, :, 1:6:2].ravel())
+
+    builder.mesh_type = "rectilinear"
+    assert builder().IsA("vtkRectilinearGrid")
+
+
+def test_metadata_index():
+    xr_ds = synthetic_dataset()
+    xr_ds["salt"] = xr_ds["temp"].chunk({"time": 1})
+    xr_ds["depth"] = xr_ds["temp"][0]
+    builder = vtkXArrayRectilinearSource(input=xr_ds)
+    metadata = builder.metadata
+    assert builder.metadata is metadata
+    assert metadata.sizes == {"time": 6, "y": 20, "x": 30}
+    assert metadata.variables["salt"]["chunks"] == ((1,) * 6, (20,), (30,))
+    assert metadata.variables["temp"]["coords"] == ["time", "y", "x"]
+    assert metadata.variables["x"]["range"] == [-180, 180]
+    assert sorted(builder.available_arrays) == ["salt", "temp"]
+    assert builder.slice_extents == {"x": [0, 29], "y": [0, 19]}
+
+    # results are copies of the cached values
+    builder.available_coords.append("z")
+    assert builder.available_coords == ["time", "y", "x"]
+
+    # new input, new index
+    builder.input = xr_ds[["depth"]]
+    assert builder.metadata is not metadata
+    assert builder.available_arrays == ["depth"]
+
+
+def test_time_labels():
+    xr_ds = synthetic_dataset(nt=3)
+    builder = vtkXArrayRectilinearSource(input=xr_ds)
+    assert builder.t_labels == [
+        "1970-01-01 00:00:00",
+        "1970-01-02 00:00:00",
+        "1970-01-03 00:00:00",
+    ]
+
+    # labels are cached per input
+    builder.t_labels.clear()
+    assert len(builder.t_labels) == 3
+    builder.input = synthetic_dataset(nt=4)
+    assert builder.t_labels[-1] == "1970-01-04 00:00:00"
+
+
+def test_data_range(monkeypatch):
+    xr_ds = synthetic_dataset()
+    values = xr_ds["temp"].values
+    values[2, 0, :3] = np.nan
+    builder = vtkXArrayRectilinearSource(input=xr_ds.chunk({"time": 1, "y": 10}))
+    builder.slices = {"x": [0, 30, 2]}
+
+    # ranges do not evaluate the percentiles
+    summaries = []
+    monkeypatch.setattr(
+        "pan3d.xarray.statistics.chunk_summary",
+        lambda *args: summaries.append(args) or chunk_summary(*args),
+    )
+
+    builder.t_index = 2
+    assert builder.data_range("temp") == (
+        np.nanmin(values[2, :, ::2]),
+        np.nanmax(values[2, :, ::2]),
+    )
+    assert builder.data_range("temp", global_time=True) == (
+        np.nanmin(values[:, :, ::2]),
+        np.nanmax(values[:, :, ::2]),
+    )
+
+    # cached per selection
+    builder.data_range("temp", global_time=True)
+    assert builder.statistics.info["hits"] == 1
+    builder.t_index = 3
+    builder.data_range("temp", global_time=True)
+    assert builder.statistics.info["hits"] == 2
+    assert summaries == []
+
+    # percentiles merged from the chunks
+    stats = builder.statistics.compute("temp")
+    assert stats["count"] == values.size - 3
+    for percentile, value in stats["percentiles"].items():
+        assert value == pytest.approx(np.nanpercentile(values, percentile), abs=0.02)
+
+    # computed arrays are not part of the input
+    assert builder.data_range("unknown") is None
+
+    # in memory data uses the range of the loaded mesh
+    builder.input = xr_ds
+    builder.t_index = 2
+    builder()
+    misses = builder.statistics.info["misses"]
+    assert builder.data_range("temp") == (
+        np.nanmin(values[2, :, ::2]),
+        np.nanmax(values[2, :, ::2]),
+    )
+    assert builder.statistics.info["misses"] == misses
+
+
+def test_histogram():
+    xr_ds = synthetic_dataset()
+    values = xr_ds["temp"].values
+    values[2, 0, :3] = np.nan
+    builder = vtkXArrayRectilinearSource(input=xr_ds.chunk({"time": 1, "y": 5}))
+    builder.t_index = 2
+
+    updates = []
+    histogram = builder.fetch_histogram("temp", bins=32, callback=updates.append)
+    histogram = histogram.result()
+    expected, edges = np.histogram(values[2][~np.isnan(values[2])], bins=32)
+    assert np.array_equal(histogram["counts"], expected)
+    assert np.allclose(histogram["edges"], edges)
+    assert histogram["progress"] == 1
+
+    # partial results refine until the final one
+    assert len(updates) > 1
+    assert [u["progress"] for u in updates] == sorted(u["progress"] for u in updates)
+    assert updates[0]["count"] < updates[-1]["count"] == values[2].size - 3
+
+    # cached per selection
+    hits = builder.statistics.info["hits"]
+    builder.fetch_histogram("temp", bins=32).result()
+    assert builder.statistics.info["hits"] == hits + 1
+
+    # percentiles interpolated from the histogram
+    for percentile, value in histogram["percentiles"].items():
+        assert value == pytest.approx(
+            np.nanpercentile(values[2], percentile), abs=edges[1] - edges[0]
+        )
+
+    assert builder.fetch_histogram("unknown") is None
+
+
+def test_computed_fields():
+    xr_ds = synthetic_dataset()
+    xr_ds["wind"] = -xr_ds["temp"]
+    values = xr_ds["temp"].values
+    builder = vtkXArrayRectilinearSource(
+        input=xr_ds.chunk({"time": 1}), arrays=["temp"]
+    )
+    builder.slices = {"x": [0, 30, 2]}
+    builder.t_index = 2
+    builder.computed = {
+        "_use_scalars": ["temp", "wind"],
+        "square": "temp^2 + wind*wind",
+        "vector": "(temp * iHat) + (wind * jHat)",
+        "shifted": "temp + y / 90",
+    }
+
+    mesh = builder()
+    selection = values[2, :, ::2]
+    square = numpy_support.vtk_to_numpy(mesh.point_data["square"])
+    assert np.allclose(square, 2 * selection.ravel() ** 2)
+    vector = numpy_support.vtk_to_numpy(mesh.point_data["vector"])
+    assert vector.shape == (selection.size, 3)
+    assert np.allclose(vector[:, 0], selection.ravel())
+    assert np.allclose(vector[:, 1], -selection.ravel())
+    assert np.allclose(vector[:, 2], 0)
+    shifted = numpy_support.vtk_to_numpy(mesh.point_data["shifted"])
+    y = xr_ds["y"].values[:, None]
+    assert np.allclose(shifted, (selection + y / 90).ravel())
+
+    # not loaded in the cached mesh
+    assert not builder._xarray_mesh.point_data.HasArray("square")
+
+    # cached per (formula, time, slices)
+    assert len(builder._derived) == 3
+    builder.Modified()
+    builder()
+    builder.t_index = 3
+    builder()
+    assert len(builder._derived) == 6
+    builder.t_index = 2
+    builder()
+    assert len(builder._derived) == 6
+
+    # lower dimensional variables, coordinates, vectors and comparisons
+    xr_ds["flow"] = (("component", "time", "y", "x"), np.stack([values, -values]))
+    builder = vtkXArrayRectilinearSource(
+        input=xr_ds, arrays=["temp"], x="x", y="y", t="time"
+    )
+    builder.slices = {"x": [0, 30, 2]}
+    builder.t_index = 2
+    builder.computed = {
+        "twice_y": "y * 2",
+        "x_coords": "coordsX",
+        "speed": "mag(flow)",
+        "north_warm": "temp > 0.5 && coordsY > 0",
+        "angle": "atan2(temp, 1)",
+    }
+    mesh = builder()
+    y, x = np.meshgrid(xr_ds["y"].values, xr_ds["x"].values[::2], indexing="ij")
+    assert np.allclose(mesh.point_data["twice_y"], 2 * y.ravel())
+    assert np.allclose(mesh.point_data["x_coords"], x.ravel())
+    assert np.allclose(mesh.point_data["speed"], np.sqrt(2) * selection.ravel())
+    assert np.array_equal(
+        mesh.point_data["north_warm"], ((selection > 0.5) & (y > 0)).ravel()
+    )
+    assert np.allclose(mesh.point_data["angle"], np.arctan2(selection, 1).ravel())
+
+    with pytest.raises(ValueError, match="Unknown function"):
+        builder.computed = {"invalid": "unknown(temp)"}
+    with pytest.raises(ValueError, match="Unsupported syntax"):
+        builder.computed = {"invalid": "temp[0]"}
+    with pytest.raises(ValueError, match="Unknown variables"):
+        builder.computed = {"invalid": "salt * 2"}
+
+
+def test_computed_single_pass():
+    reads = []
+
+    def read(block, scale):
+        reads.append(block.shape)
+        return block * scale
+
+    xr_ds = synthetic_dataset().chunk({"time": 1, "y": 10})
+    for name, scale in (("u", 1), ("v", 2)):
+        data = xr_ds["temp"].data.map_blocks(
+            read, scale, name=f"read-{name}", meta=np.array((), dtype=float)
+        )
+        xr_ds[name] = xr_ds["temp"].copy(data=data)
+    values = xr_ds["temp"].values[2]
+
+    builder = vtkXArrayRectilinearSource(input=xr_ds, arrays=["temp"])
+    builder.t_index = 2
+    builder.computed = {
+        "m2": "u*u + v*v",
+        "vec": "(u * iHat) + (v * jHat)",
+        "magnitude": "sqrt(u * u + v * v)",
+    }
+    mesh = builder()
+
+    # each selected chunk is read once for all the outputs
+    assert len(reads) == 4
+    m2 = numpy_support.vtk_to_numpy(mesh.point_data["m2"])
+    assert np.allclose(m2, 5 * values.ravel() ** 2)
+    magnitude = numpy_support.vtk_to_numpy(mesh.point_data["magnitude"])
+    assert np.allclose(magnitude, np.sqrt(m2))
+    vec = numpy_support.vtk_to_numpy(mesh.point_data["vec"])
+    assert np.allclose(vec[:, 1], 2 * values.ravel())
+
+    # common subexpressions (u*u, v*v, u*u + v*v) are evaluated once
+    assert len(builder._calculator.common) == 3
+    report = builder.computed_report
+    assert set(report) == {"m2", "vec", "magnitude"}
+    assert report["m2"]["expression"] == "u*u + v*v"
+    assert all(report[name]["compute"] > 0 for name in report)
+
+    # fetch evaluates the computed fields in the background
+    builder.t_index = 1
+    builder.fetch().result()
+    reads.clear()
+    mesh = builder()
+    assert reads == []
+    m2 = numpy_support.vtk_to_numpy(mesh.point_data["m2"])
+    assert np.allclose(m2, 5 * xr_ds["temp"].values[1].ravel() ** 2)
+
+
+def test_computed_in_memory_threads(monkeypatch):
+    monkeypatch.setattr("pan3d.xarray.algorithm.os.cpu_count", lambda: 4)
+    xr_ds = synthetic_dataset(nt=2, ny=256, nx=1024)
+    values = xr_ds["temp"].values[0]
+    builder = vtkXArrayRectilinearSource(input=xr_ds, arrays=["temp"])
+    builder.computed = {"shifted": "temp + coordsX"}
+
+    mesh = builder()
+    shifted = numpy_support.vtk_to_numpy(mesh.point_data["shifted"])
+    assert np.allclose(shifted, (values + xr_ds["x"].values).ravel())
+
+    # in-memory inputs are split along the slowest axis, one chunk per thread
+    variables, shape = builder._computed_variables(
+        builder._mesh_key(), mesh, {"temp", "coordsX"}
+    )
+    assert shape == (256, 1024)
+    assert variables["temp"].chunks == ((64,) * 4, (1024,))
+    assert variables["coordsX"].chunks == ((64,) * 4, (1024,))
+
+
+def test_read_plan(tmp_path):
+    xr_ds = xr.Dataset(
+        {
+            "temp": (
+                ("time", "y", "x"),
+                np.random.default_rng(0).random((3, 100, 4000), dtype="float32"),
+            )
+        },
+        coords={
+            "time": np.arange(3).astype("datetime64[D]"),
+            "y": np.arange(100.0),
+            "x": np.arange(4000.0),
+        },
+    )
+    xr_ds.chunk({"time": 1, "y": 100, "x": 1000}).to_zarr(tmp_path / "data.zarr")
+    xr_ds.to_netcdf(tmp_path / "data.nc")
+
+    # strided selection: whole compressed chunks are read for 1/20 of the values
+    builder = vtkXArrayRectilinearSource(
+        input=xr.open_zarr(tmp_path / "data.zarr"), arrays=["temp"]
+    )
+    builder.slices = {"x": [0, 4000, 20]}
+    builder.t_index = 1
+    plan = builder.read_plan()
+    assert plan["strategy"] == "subsample"
+    assert plan["bytes_used"] == 100 * 200 * 4
+    assert plan["amplification"] == pytest.approx(20)
+    assert plan["arrays"]["temp"]["chunks_read"] == 4
+
+    # not chunked on disk: only the selected values are read
+    builder.input = xr.open_dataset(tmp_path / "data.nc", chunks={})
+    builder.arrays = ["temp"]
+    builder.slices = {"x": [0, 4000, 20]}
+    builder.t_index = 1
+    plan = builder.read_plan()
+    assert plan["strategy"] == "gather"
+    assert plan["amplification"] == pytest.approx(1)
+
+    # dask chunks splitting the on-disk chunks
+    builder.input = xr.open_zarr(tmp_path / "data.zarr").chunk({"x": 300})
+    builder.arrays = ["temp"]
+    builder.t_index = 1
+    plan = builder.read_plan()["arrays"]["temp"]
+    assert plan["strategy"] == "rechunk"
+    assert plan["estimates"]["subsample"] > plan["estimates"]["rechunk"]
+    # aligned dask chunks read each on-disk chunk once
+    assert plan["bytes_read"] == 100 * 4000 * 4
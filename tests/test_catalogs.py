@@ -0,0 +1,278 @@
+import functools
+import http.server
+import io
+import json
+import re
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from pan3d.catalogs.cache import METADATA_KEYS, ChunkCache, open_cached_dataset
+from pan3d.catalogs.fetch import PooledHTTPFileSystem
+from pan3d.catalogs.index import CatalogIndex
+
+ENTRIES = [
+    {"id": "sst", "driver": "zarr", "tags": ["ocean", "satellite"]},
+    {"id": "wind", "driver": "zarr", "tags": ["atmosphere"]},
+    {"id": "soil", "driver": "netcdf", "tags": []},
+]
+
+
+def test_catalog_index(tmp_path):
+    # local stand-in for a remote catalog
+    catalog_file = tmp_path / "catalog.json"
+    catalog_file.write_text(json.dumps(ENTRIES))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return json.loads(catalog_file.read_text())
+
+    index = CatalogIndex(
+        "test", build, source=str(catalog_file), path=tmp_path / "index.sqlite"
+    )
+    assert index.stale
+    assert index.get("wind") == ENTRIES[1]
+    assert index.get("unknown") is None
+
+    # filters
+    assert [e["id"] for e in index.search()] == ["sst", "wind", "soil"]
+    assert [e["id"] for e in index.search(driver=["zarr"])] == ["sst", "wind"]
+    assert [e["id"] for e in index.search(driver=["zarr"], tags=["ocean"])] == ["sst"]
+    assert [e["id"] for e in index.search(tags=[])] == ["sst", "wind", "soil"]
+    assert index.search(missing=[]) == []
+    assert index.search_options(["driver", "tags"]) == {
+        "driver": ["netcdf", "zarr"],
+        "tags": ["atmosphere", "ocean", "satellite"],
+    }
+    assert len(builds) == 1
+
+    # persisted across instances
+    index = CatalogIndex(
+        "test", build, source=str(catalog_file), path=tmp_path / "index.sqlite"
+    )
+    assert index.get("sst") == ENTRIES[0]
+    assert len(builds) == 1
+
+    # outdated index is used when the catalog is not reachable
+    catalog_file.unlink()
+    index.ttl = 0
+    with pytest.warns(UserWarning, match="Could not refresh"):
+        assert index.get("soil") == ENTRIES[2]
+
+    # rebuilt when the source changes
+    catalog_file.write_text(json.dumps(ENTRIES[:1]))
+    index.ttl = 3600
+    index.source = "other"
+    assert index.get("soil") is None
+    assert index.get("sst") == ENTRIES[0]
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """local stand-in for an object storage supporting byte ranges"""
+
+    requests = []
+    failures = 0
+    latency = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        time.sleep(self.latency)
+        if RangeRequestHandler.failures > 0:
+            RangeRequestHandler.failures -= 1
+            self.send_error(503)
+            return
+        super().do_GET()
+
+    def send_head(self):
+        path = Path(self.translate_path(self.path))
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if not path.is_file() or not match:
+            return super().send_head()
+
+        data = path.read_bytes()
+        start, end = int(match[1]), min(int(match[2]), len(data) - 1)
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.send_header("Content-Length", str(end + 1 - start))
+        self.end_headers()
+        return io.BytesIO(data[start : end + 1])
+
+
+@pytest.fixture
+def http_store(tmp_path):
+    handler = functools.partial(RangeRequestHandler, directory=str(tmp_path))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield tmp_path, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_chunk_cache(tmp_path):
+    cache = ChunkCache(tmp_path / "chunks", max_size=250)
+    cache.put("http://host/a", None, None, b"a" * 100)
+    cache.put("http://host/b", 0, 100, b"b" * 100)
+    assert cache.get("http://host/a") == b"a" * 100
+    assert cache.get("http://host/b") is None
+    assert cache.get("http://host/b", 0, 100) == b"b" * 100
+
+    # least recently used blocks are evicted
+    cache.put("http://host/c", None, None, b"c" * 100)
+    assert cache.get("http://host/a") is None
+    assert cache.size == 200
+    assert cache.info["hits"] == 2
+    assert cache.info["bytes_saved"] == 200
+
+    # shared across sessions
+    cache = ChunkCache(tmp_path / "chunks", max_size=250)
+    assert cache.get("http://host/c") == b"c" * 100
+    cache.clear()
+    assert cache.size == 0
+    assert cache.get("http://host/c") is None
+
+
+def test_cached_remote_dataset(http_store):
+    directory, base_url = http_store
+    ds = xr.Dataset(
+        {"temp": (("time", "y", "x"), np.random.default_rng(0).random((4, 20, 30)))},
+        coords={"time": np.arange(4), "y": np.arange(20.0), "x": np.arange(30.0)},
+    )
+    ds.chunk({"time": 1}).to_zarr(directory / "data.zarr")
+    ds.to_netcdf(directory / "data.nc", engine="h5netcdf")
+    cache = ChunkCache(directory / "cache")
+
+    def open_remote(name, engine):
+        return open_cached_dataset(
+            f"{base_url}/{name}", engine=engine, chunk_cache=cache, chunks={}
+        )
+
+    for name, engine in (("data.zarr", "zarr"), ("data.nc", "h5netcdf")):
+        RangeRequestHandler.requests.clear()
+        values = open_remote(name, engine)["temp"].isel(time=2).values
+        assert np.array_equal(values, ds["temp"][2])
+        cold_requests = len(RangeRequestHandler.requests)
+        fetched = cache.info["bytes_fetched"]
+
+        # revisiting the time step does not download the chunks again
+        RangeRequestHandler.requests.clear()
+        values = open_remote(name, engine)["temp"].isel(time=2).values
+        assert np.array_equal(values, ds["temp"][2])
+        assert len(RangeRequestHandler.requests) < cold_requests
+        assert cache.info["bytes_fetched"] - fetched < fetched
+
+    assert cache.info["hit_rate"] > 0
+    assert cache.info["bytes_saved"] > 0
+
+
+def test_cached_growing_store(http_store):
+    directory, base_url = http_store
+    ds = xr.Dataset(
+        {"temp": (("time", "x"), np.random.default_rng(0).random((4, 30)))},
+        coords={"time": np.arange(4), "x": np.arange(30.0)},
+    )
+    ds.isel(time=slice(0, 2)).chunk({"time": 1}).to_zarr(directory / "data.zarr")
+    cache = ChunkCache(directory / "cache")
+
+    def open_remote():
+        return open_cached_dataset(
+            f"{base_url}/data.zarr", engine="zarr", chunk_cache=cache, chunks={}
+        )
+
+    assert np.array_equal(open_remote()["temp"].values, ds["temp"][:2])
+
+    # appended time steps (and rewritten coordinates) are not hidden by the cache
+    ds.isel(time=slice(2, 4)).chunk({"time": 1}).to_zarr(
+        directory / "data.zarr", append_dim="time"
+    )
+    remote = open_remote()
+    assert np.array_equal(remote["time"].values, ds["time"])
+    assert np.array_equal(remote["temp"].values, ds["temp"])
+
+    # metadata is never cached
+    RangeRequestHandler.requests.clear()
+    open_remote()
+    assert any(path.endswith(METADATA_KEYS) for path in RangeRequestHandler.requests)
+    cache.close()
+
+
+def test_cached_pangeo_entry(http_store, monkeypatch):
+    pytest.importorskip("intake_xarray")
+    pangeo = pytest.importorskip("pan3d.catalogs.pangeo")
+
+    directory, base_url = http_store
+    ds = xr.Dataset(
+        {"temp": (("time", "x"), np.random.default_rng(0).random((4, 30)))},
+        coords={"time": np.arange(4), "x": np.arange(30.0)},
+    )
+    ds.chunk({"time": 1}).to_zarr(directory / "sst.zarr", consolidated=True)
+    (directory / "ocean.yaml").write_text(
+        "sources:\n"
+        "  noaa_sst:\n"
+        "    driver: zarr\n"
+        "    args:\n"
+        f"      urlpath: {base_url}/sst.zarr\n"
+        "      consolidated: true\n"
+    )
+    (directory / "master.yaml").write_text(
+        "sources:\n"
+        "  ocean:\n"
+        "    driver: yaml_file_cat\n"
+        f"    args:\n      path: {directory / 'ocean.yaml'}\n"
+    )
+    monkeypatch.setenv("PAN3D_CACHE_DIR", str(directory / "cache"))
+    monkeypatch.setattr(pangeo, "CATALOG_URL", str(directory / "master.yaml"))
+    cache = ChunkCache(directory / "cache" / "chunks")
+    monkeypatch.setattr("pan3d.catalogs.cache.get_chunk_cache", lambda: cache)
+    monkeypatch.setattr(pangeo, "get_chunk_cache", lambda: cache)
+
+    # the entry name is not the driver one
+    assert pangeo.is_zarr(pangeo.get_index().get("noaa_sst"))
+    values = pangeo.load_dataset("noaa_sst")["temp"].values
+    assert np.array_equal(values, ds["temp"])
+    assert cache.info["bytes_fetched"] > 0
+
+
+def test_pooled_http_fetcher(http_store):
+    directory, base_url = http_store
+    content = bytes(range(256)) * 1000
+    (directory / "blob").write_bytes(content)
+    for i in range(16):
+        (directory / f"chunk-{i}").write_bytes(content[i * 100 : (i + 1) * 100])
+    fs = PooledHTTPFileSystem(backoff=0.01, skip_instance_cache=True)
+    url = f"{base_url}/blob"
+
+    # adjacent ranges are fetched with a single request
+    RangeRequestHandler.requests.clear()
+    starts = list(range(0, 10000, 1000))
+    ends = [start + 900 for start in starts]
+    ranges = fs.cat_ranges([url] * 10, starts, ends)
+    assert ranges == [content[s:e] for s, e in zip(starts, ends)]
+    assert len(RangeRequestHandler.requests) == 1
+    assert fs.stats["coalesced"] == 9
+
+    # failed requests are retried
+    RangeRequestHandler.failures = 2
+    assert fs.cat_file(url, start=10, end=20) == content[10:20]
+    assert fs.stats["retries"] == 2
+    with pytest.raises(FileNotFoundError):
+        fs.cat_file(f"{base_url}/missing")
+    assert fs.stats["retries"] == 2
+
+    # files are fetched concurrently
+    RangeRequestHandler.latency = 0.2
+    try:
+        start = time.perf_counter()
+        urls = [f"{base_url}/chunk-{i}" for i in range(16)]
+        chunks = fs.cat(urls)
+        elapsed = time.perf_counter() - start
+    finally:
+        RangeRequestHandler.latency = 0
+    assert b"".join(chunks[url] for url in urls) == content[:1600]
+    assert elapsed < 16 * 0.2 / 2
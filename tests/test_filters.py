@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+import xarray as xr
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonDataModel import vtkImageData
+
+from pan3d.filters.globe import ProcessPoint, ProjectToSphere, project_to_sphere
+from pan3d.xarray.algorithm import vtkXArrayRectilinearSource
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_project_to_sphere(dtype):
+    rng = np.random.default_rng(0)
+    points = np.stack(
+        [
+            rng.uniform(-180, 180, 500),
+            rng.uniform(-90, 90, 500),
+            rng.uniform(0, 10, 500),
+        ],
+        axis=1,
+    )
+    expected = np.array([ProcessPoint(p, 6378, 2.0) for p in points])
+    result = project_to_sphere(points, 6378, 2.0, dtype=dtype)
+    assert result.dtype == dtype
+    assert np.allclose(result, expected, atol=1e-2 if dtype == np.float32 else 1e-8)
+
+
+def test_project_to_sphere_filter():
+    grid = vtkImageData()
+    grid.SetDimensions(37, 19, 1)
+    grid.SetSpacing(10, 10, 0)
+    grid.SetOrigin(-180, -90, 0)
+
+    project = ProjectToSphere()
+    project.dtype = np.float64
+    project.SetInputDataObject(grid)
+    project.Update()
+    output = project.GetOutputDataObject(0)
+
+    points = numpy_support.vtk_to_numpy(output.GetPoints().GetData())
+    assert points.dtype == np.float64
+    assert output.GetNumberOfPoints() == grid.GetNumberOfPoints()
+    assert np.allclose(np.linalg.norm(points, axis=1), project.radius)
+
+
+def test_project_to_sphere_reuse_geometry():
+    rng = np.random.default_rng(0)
+    xr_ds = xr.Dataset(
+        {"temp": (("time", "lat", "lon"), rng.random((3, 19, 37)))},
+        coords={
+            "time": np.arange(3).astype("datetime64[D]"),
+            "lat": np.linspace(-90, 90, 19),
+            "lon": np.linspace(-180, 180, 37),
+        },
+    )
+    source = vtkXArrayRectilinearSource(input=xr_ds)
+    project = ProjectToSphere()
+    project.input_connection = source.output_port
+    project.Update()
+    output = project.GetOutputDataObject(0)
+    points = output.GetPoints().GetData()
+
+    # time change only swap the fields
+    source.t_index = 2
+    project.Update()
+    output = project.GetOutputDataObject(0)
+    assert output.GetPoints().GetData() is points
+    assert np.array_equal(
+        numpy_support.vtk_to_numpy(output.GetPointData().GetArray("temp")),
+        xr_ds["temp"][2].values.ravel(),
+    )
+
+    # geometry parameter change trigger a new projection
+    project.SetDataLayer(True)
+    project.Update()
+    output = project.GetOutputDataObject(0)
+    assert output.GetPoints().GetData() is not points
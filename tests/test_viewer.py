@@ -1,4 +1,16 @@
+import asyncio
+import time
+
+import numpy as np
+import xarray as xr
+from trame.app import get_server
+from vtkmodules.vtkCommonCore import vtkLookupTable
+
+from pan3d.utils import presets
+from pan3d.utils.convert import to_image
+from pan3d.utils.presets import get_preset, get_preset_image, set_preset
 from pan3d.viewers.preview import XArrayViewer
+from pan3d.widgets import ColorBy, TimeNavigation
 
 
 def assert_builder_state(builder):
@@ -73,3 +85,222 @@ def test_render_options_state():
     assert_builder_state(viewer.source)
     assert viewer.actor.GetScale() == (0.1, 0.2, 0.3)
     assert viewer.mapper.array_name == "z"
+
+
+def test_async_data_update():
+    xr_ds = xr.Dataset(
+        {"temp": (("time", "y", "x"), np.zeros((10, 20, 30)))},
+        coords={
+            "time": np.arange(10).astype("datetime64[D]"),
+            "y": np.arange(20.0),
+            "x": np.arange(30.0),
+        },
+    )
+
+    async def drag_time_slider():
+        viewer = XArrayViewer(server="async_update")
+        viewer.source.input = xr_ds
+        viewer.source.apply_coords()
+        viewer.source.arrays = ["temp"]
+
+        loaded = []
+        build_mesh = viewer.source._build_mesh
+
+        def record_build(key, progress=None):
+            loaded.append(dict(key[4])["time"])
+            return build_mesh(key, progress)
+
+        viewer.source._build_mesh = record_build
+
+        tasks = []
+        for t_index in range(10):
+            viewer.source.t_index = t_index
+            tasks.append(viewer.request_data_update())
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        return viewer, loaded
+
+    viewer, loaded = asyncio.run(drag_time_slider())
+
+    # only the last requested time step get loaded
+    assert loaded == [9]
+    assert viewer.state.data_loading is False
+    assert viewer.state.dataset_bounds == (0.0, 29.0, 0.0, 19.0, 0.0, 0.0)
+
+
+def test_async_load_dataset(tmp_path):
+    file_path = tmp_path / "temp.zarr"
+    xr.Dataset(
+        {"temp": (("time", "y", "x"), np.zeros((3, 20, 30)))},
+        coords={
+            "time": np.arange(3).astype("datetime64[D]"),
+            "y": np.arange(20.0),
+            "x": np.arange(30.0),
+        },
+    ).to_zarr(file_path)
+
+    async def load():
+        viewer = XArrayViewer(server="async_load")
+        viewer.state.ready()
+        task = viewer.load_dataset("file", str(file_path))
+        assert task is not None
+        await task
+        return viewer
+
+    viewer = asyncio.run(load())
+
+    assert viewer.state.data_origin_error is False
+    assert viewer.state.data_loading is False
+    assert viewer.state.data_arrays_available == ["temp"]
+    assert viewer.source.x == "x"
+
+
+def test_load_dataset_overlap(tmp_path):
+    paths = []
+    for name in ("first", "second"):
+        paths.append(str(tmp_path / f"{name}.zarr"))
+        xr.Dataset(
+            {name: (("lat", "lon"), np.zeros((20, 30)))},
+            coords={"lat": np.arange(20.0), "lon": np.arange(30.0)},
+        ).to_zarr(paths[-1])
+
+    async def load():
+        viewer = XArrayViewer(server="load_overlap")
+        viewer.state.ready()
+        viewer.source.input = xr.Dataset(
+            {"temp": (("y", "x"), np.zeros((20, 30)))},
+            coords={"y": np.arange(20.0), "x": np.arange(30.0)},
+        )
+        viewer.source.apply_coords()
+        viewer.source.arrays = ["temp"]
+
+        build_mesh = viewer.source._build_mesh
+
+        def slow_build(key, progress=None):
+            time.sleep(0.2)
+            return build_mesh(key, progress)
+
+        viewer.source._build_mesh = slow_build
+        updates = []
+        update_data = viewer._update_data
+
+        def record_update():
+            updates.append(viewer.source.x)
+            update_data()
+
+        viewer._update_data = record_update
+
+        # the pending fetch of the previous dataset is dropped
+        fetch_task = viewer.request_data_update()
+        await asyncio.sleep(0.05)
+        tasks = [viewer.load_dataset("file", path) for path in paths]
+        await asyncio.gather(fetch_task, *tasks, return_exceptions=True)
+        return viewer, fetch_task, updates
+
+    viewer, fetch_task, updates = asyncio.run(load())
+
+    assert fetch_task.cancelled()
+    assert "x" not in updates
+
+    # the latest load wins
+    assert viewer.source.x == "lon"
+    assert viewer.state.data_arrays_available == ["second"]
+    assert viewer.state.data_origin_error is False
+    assert viewer.state.data_loading is False
+
+
+def test_time_navigation_window():
+    server = get_server("time_navigation", client_type="vue3")
+    server.state.ready()
+    labels = [f"t{i}" for i in range(2000)]
+    time_nav = TimeNavigation(
+        trame_server=server,
+        index_name="slice_t",
+        labels_name="t_labels",
+        labels=labels,
+        window=100,
+    )
+    state = server.state
+
+    # only labels around the current index are sent to the client
+    assert sorted(state.t_labels) == list(range(100))
+    time_nav.index = 1500
+    assert sorted(state.t_labels) == list(range(1450, 1550))
+    assert state.t_labels[1500] == "t1500"
+
+    # small moves do not resend labels
+    window = state.t_labels
+    time_nav.index = 1510
+    assert state.t_labels is window
+
+    assert time_nav.labels == labels
+    time_nav.labels = labels[:50]
+    assert state.t_labels == labels[:50]
+
+
+def test_color_by_histogram():
+    server = get_server("color_by_histogram", client_type="vue3")
+    server.state.nan_colors = [[0, 0, 0, 0]]
+    server.state.ready()
+    color_by = ColorBy(
+        trame_server=server,
+        color_min_name="color_min",
+        color_max_name="color_max",
+        histogram_bins=10,
+    )
+    state = server.state
+    assert not color_by.auto_range()
+
+    values = np.concatenate([np.linspace(0, 1, 1000), [100]])
+    counts, edges = np.histogram(values, bins=200)
+    color_by.histogram = {"counts": counts, "edges": edges, "progress": 1}
+    color_by.set_color_range(0, 100)
+    color_by.histogram = color_by.histogram
+    assert len(state[color_by.histogram_name]) == 10
+    assert max(state[color_by.histogram_name]) == 1
+
+    # percentiles ignore the outlier
+    assert color_by.auto_range()
+    assert state.color_max < 2
+    color_by.histogram = None
+    assert state[color_by.histogram_name] == []
+
+
+def test_preset_images():
+    lut = vtkLookupTable()
+    set_preset(lut, "Cool to Warm")
+    colors = get_preset("Cool to Warm")
+    for i in range(255):
+        assert np.allclose(
+            lut.GetTableValue(i)[:3], colors.GetColor(i / 255), atol=1 / 255
+        )
+
+    # rendered once per preset and sample count
+    image = get_preset_image("Cool to Warm")
+    assert image == to_image(lut)
+    assert get_preset_image("Cool to Warm") is image
+    assert get_preset_image("Cool to Warm", 64) != image
+
+
+def test_preset_ranges():
+    lut = get_preset("Jet")
+    assert lut.GetRange() == (-1, 1)
+
+    # one shared instance per (preset, range)
+    lut_a = get_preset("Jet", (0, 10))
+    lut_b = get_preset("Jet", (5, 6))
+    assert lut_a.GetRange() == (0, 10)
+    assert lut_b.GetRange() == (5, 6)
+    assert get_preset("Jet", (0, 10)) is lut_a
+    assert np.allclose(lut_a.GetColor(2.5), lut.GetColor(-0.5))
+
+    # private copies can be rescaled without affecting the shared ones
+    copy = presets.create_preset("Jet")
+    presets.update_range(copy, (10, 20))
+    assert copy.GetRange() == (10, 20)
+    assert np.allclose(copy.GetColor(15), lut.GetColor(0))
+    assert lut.GetRange() == (-1, 1)
+
+    for i in range(presets.LUTS_MAX_SIZE + 1):
+        get_preset("Jet", (0, i + 1))
+    assert len(presets.LUTS) == presets.LUTS_MAX_SIZE
@@ -1,4 +1,7 @@
+import shutil
+
 import numpy as np
+import pytest
 import xarray as xr
 
 from pan3d.xarray.datasets import imagedata_to_rectilinear
@@ -33,6 +36,68 @@ def test_read_vti(vti_path):
     assert ds["RTData"].vtk.dataset(x="x", y="y", z="z") == truth_r
 
 
+@pytest.mark.skipif(
+    not hasattr(xr.indexes, "RangeIndex"), reason="RangeIndex requires xarray>=2025.6"
+)
+def test_read_vti_range_index(vti_path):
+    ds = xr.open_dataset(vti_path, engine="vtk", range_index=True)
+    truth_r = imagedata_to_rectilinear(vtk_read(vti_path))
+    assert type(ds.xindexes["x"]).__name__ == "RangeIndex"
+    assert ds["x"].attrs["spacing"] == 1
+    assert np.allclose(ds["x"].values, truth_r.x_coordinates)
+    assert np.allclose(ds["z"].values, truth_r.z_coordinates)
+    assert ds["RTData"].vtk.dataset(x="x", y="y", z="z") == truth_r
+
+
+def test_lazy_read(vti_path):
+    ds = xr.open_dataset(vti_path, engine="vtk", chunks={"z": 5})
+    truth = xr.open_dataset(vti_path, engine="vtk", lazy=False)
+    assert ds["RTData"].chunks[0] == (5, 5, 5, 5, 1)
+    assert np.array_equal(ds["RTData"].values, truth["RTData"].values)
+
+    ds = xr.open_dataset(vti_path, engine="vtk")
+    assert not ds["RTData"].variable._in_memory
+    selection = {"z": 3, "y": slice(2, 15, 4), "x": slice(None, None, -2)}
+    assert np.array_equal(
+        ds["RTData"].isel(selection).values, truth["RTData"].isel(selection).values
+    )
+
+
+def test_drop_variables(vti_path, vts_path):
+    for lazy in (True, False):
+        ds = xr.open_dataset(
+            vti_path, engine="vtk", lazy=lazy, drop_variables=["RTData"]
+        )
+        assert "RTData" not in ds
+        assert "x" in ds.coords
+
+    ds = xr.open_dataset(vts_path, engine="vtk", drop_variables=["Elevation"])
+    assert "Elevation" not in ds
+
+
+def test_read_time_series(vti_path, tmp_path):
+    steps = []
+    for i, time in enumerate([0.5, 1.0, 1.5]):
+        shutil.copy(vti_path, tmp_path / f"wavelet_{i}.vti")
+        steps.append(f'<DataSet timestep="{time}" part="0" file="wavelet_{i}.vti"/>')
+    (tmp_path / "wavelet.pvd").write_text(
+        f'<VTKFile type="Collection"><Collection>{"".join(steps)}</Collection></VTKFile>'
+    )
+    truth = xr.open_dataset(vti_path, engine="vtk")
+
+    ds = xr.open_dataset(tmp_path / "wavelet.pvd", engine="vtk")
+    assert ds["RTData"].dims == ("time", "z", "y", "x")
+    assert np.array_equal(ds["time"].values, [0.5, 1.0, 1.5])
+    assert np.array_equal(
+        ds["RTData"].isel(time=slice(1, None), z=4).values,
+        np.stack([truth["RTData"].isel(z=4).values] * 2),
+    )
+
+    ds = xr.open_dataset(str(tmp_path / "wavelet_*.vti"), engine="vtk", chunks={})
+    assert ds["RTData"].shape == (3, *truth["RTData"].shape)
+    assert np.array_equal(ds["RTData"][-1].values, truth["RTData"].values)
+
+
 def test_read_vts(vts_path):
     ds = xr.open_dataset(vts_path, engine="vtk")
     truth = vtk_read(vts_path)
@@ -82,11 +147,14 @@ def test_convert_vts(vts_path):
     print("=" * 10, "test_convert_vts", "=" * 10)
     truth = vtk_read(vts_path)
     ds = dataset_to_xarray(truth)
+    # x varies the fastest in VTK memory
     assert np.array_equal(
-        ds["Elevation"].values.ravel(), truth.point_data["Elevation"].ravel()
+        ds["Elevation"].values.ravel(order="F"), truth.point_data["Elevation"].ravel()
     )
     assert np.may_share_memory(
-        ds["Elevation"].values.ravel(), truth.point_data["Elevation"].ravel()
+        ds["Elevation"].values.ravel(order="F"), truth.point_data["Elevation"].ravel()
     )
+    assert np.array_equal(ds["x"].values, truth.x_coordinates)
+    assert np.may_share_memory(ds["x"].values, truth.points.data)
     mesh = ds["Elevation"].vtk.dataset(x="x", y="y", z="z")
     assert mesh == truth